@@ -0,0 +1,140 @@
+"""归档上传基准测试
+
+在本地启动一个模拟archive-svc的HTTP服务器（按块读取并丢弃请求体），生成指定大小的临时文件，
+分别用以下方式上传到 /files，统计耗时、客户端内存峰值（tracemalloc）和服务端收到的字节数：
+    files      requests的files参数，整个multipart请求体在内存中拼好后再发送
+    streamed   archive_client.upload_file，MultipartFileStream按块读取文件边读边发
+    duplicate  ArchiveService.archive_file上传一个已归档的文件（模拟服务器的 /files/have-hashes
+               报告哈希已存在），只发送一个哈希预检请求，不传输文件内容
+
+    python benchmarks/bench_archive_upload.py --size-mb 64 --uploads 3
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+class MockArchiveHandler(BaseHTTPRequestHandler):
+    """模拟archive-svc的 /health、/api/v1/archive/files 与 /api/v1/archive/files/have-hashes"""
+
+    protocol_version = 'HTTP/1.1'
+    lock = threading.Lock()
+    bytes_received = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._send_json({'status': 'ok'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        with MockArchiveHandler.lock:
+            MockArchiveHandler.bytes_received += length
+        if self.path.endswith('/have-hashes'):
+            hashes = json.loads(self.rfile.read(length))['hashes']
+            self._send_json({
+                'success': True,
+                'existing': {hash_value: {'id': 1, 'file_path': '/archive/uploads/a.bin'} for hash_value in hashes},
+                'missing': [],
+            })
+            return
+        remaining = length
+        while remaining:
+            remaining -= len(self.rfile.read(min(remaining, 1024 * 1024)))
+        self._send_json({'success': True, 'message': '文件上传成功', 'file': {'id': 1}})
+
+
+def measure(upload, uploads):
+    """执行uploads次上传，返回 (总耗时ms, 内存峰值MB, 服务端收到的MB)"""
+    received_before = MockArchiveHandler.bytes_received
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(uploads):
+        assert upload()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    received = MockArchiveHandler.bytes_received - received_before
+    return elapsed * 1000, peak / (1024 * 1024), received / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='归档上传基准测试')
+    parser.add_argument('--size-mb', type=int, default=64, help='上传文件大小（MB）')
+    parser.add_argument('--uploads', type=int, default=3, help='每种方式的上传次数')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockArchiveHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/api/v1/archive"
+
+    os.environ.update({
+        'FLASK_ENV': 'testing',
+        'TEST_DATABASE_URL': 'sqlite://',
+        'ARCHIVE_SVC_URL': base_url,
+        'HEALTH_MONITOR_ENABLED': 'false',
+        'JOB_WORKERS': '0',
+    })
+    from src.app import create_app
+    from src.services.file_service import ArchiveService
+    from src.utils.archive_client import ArchiveClient
+
+    app = create_app()
+    client = ArchiveClient(base_url=base_url)
+    session = requests.Session()
+
+    fd, file_path = tempfile.mkstemp(suffix='.bin')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for _ in range(args.size_mb):
+                f.write(os.urandom(1024 * 1024))
+
+        def upload_files():
+            with open(file_path, 'rb') as f:
+                response = session.post(f"{base_url}/files", files={'file': f}, data={'category': 'uploads'})
+            return response.status_code == 200
+
+        def upload_streamed():
+            return client.upload_file(file_path, category='uploads').status_code == 200
+
+        def upload_duplicate():
+            with app.app_context():
+                return ArchiveService.archive_file(file_path, category='uploads')['duplicate']
+
+        results = [('files', *measure(upload_files, args.uploads)),
+                   ('streamed', *measure(upload_streamed, args.uploads)),
+                   ('duplicate', *measure(upload_duplicate, args.uploads))]
+    finally:
+        os.remove(file_path)
+        server.shutdown()
+
+    print(f"{'mode':>9} {'size_mb':>8} {'uploads':>8} {'total_ms':>9} {'MB/s':>8} {'peak_mem_mb':>12} {'sent_mb':>9}")
+    for mode, elapsed_ms, peak_mb, sent_mb in results:
+        throughput = args.size_mb * args.uploads / (elapsed_ms / 1000)
+        print(f"{mode:>9} {args.size_mb:>8} {args.uploads:>8} {elapsed_ms:>9.1f} {throughput:>8.1f} "
+              f"{peak_mb:>12.1f} {sent_mb:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
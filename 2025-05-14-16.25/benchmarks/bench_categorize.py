@@ -0,0 +1,154 @@
+"""文件分类（批量重命名）基准测试
+
+在本地启动一个模拟convert-svc的HTTP服务器（每个请求增加固定延迟，模拟网络往返），
+使用内存SQLite创建一个订单和若干转换文件，统计一次分类请求的耗时、发往转换服务的请求数
+和SQL语句总数：
+  - per_file: 逐个文件调用 FileService.categorize_converted_files（相当于旧实现逐个重命名并提交）
+  - batch:    一次调用分类全部文件（每个订单一次 /api/rename-batch，一个事务更新记录）
+
+用法:
+    python benchmarks/bench_categorize.py --files 100 --latency 20
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+LATENCY = 0.02
+CATEGORIES = ('护照首页', '申请表', '照片', '银行流水')
+
+
+class MockConvertHandler(BaseHTTPRequestHandler):
+    """模拟convert-svc的 /health 与 /api/rename-batch"""
+
+    protocol_version = 'HTTP/1.1'
+    requests = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._send_json({'status': 'ok'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        MockConvertHandler.requests += 1
+        time.sleep(LATENCY)
+
+        results = []
+        for item in payload.get('items', []):
+            new_path = f"{os.path.dirname(item['original_path'])}/{item['new_name']}"
+            results.append({
+                'original_path': item['original_path'],
+                'success': True,
+                'new_path': new_path,
+                'new_url': f"/files/{new_path}",
+            })
+        self._send_json({'success': True, 'results': results})
+
+
+def run_case(app, mode, count, base_url):
+    from src.models import db
+    from src.models.models import Order
+    from src.repositories.file_repo import FileRepository
+    from src.services.file_service import FileService
+    from src.utils.db_diagnostics import count_statements
+
+    # 每个场景在独立的应用上下文中执行，相当于一次请求
+    with app.app_context():
+        order = Order(order_number=Order.generate_order_number(), status=Order.STATUS_PENDING)
+        db.session.add(order)
+        db.session.commit()
+        file_ids = FileRepository.create_converted_files([
+            {
+                'filename': f"page_{i}.png",
+                'file_path': f"{base_url}/files/{order.order_number}/page_{i}.png",
+                'order_id': order.id,
+            }
+            for i in range(count)
+        ])
+        items = [
+            {'file_uuid': str(file_id), 'category': CATEGORIES[i % len(CATEGORIES)]}
+            for i, file_id in enumerate(file_ids)
+        ]
+
+        MockConvertHandler.requests = 0
+        started = time.perf_counter()
+        with count_statements(db.engine) as counter:
+            if mode == 'per_file':
+                results = [r for item in items for r in FileService.categorize_converted_files([item])]
+            else:
+                results = FileService.categorize_converted_files(items)
+        elapsed = time.perf_counter() - started
+
+        return {
+            'mode': mode,
+            'files': count,
+            'succeeded': sum(1 for r in results if r['success']),
+            'seconds': elapsed,
+            'rename_requests': MockConvertHandler.requests,
+            'statements': counter.count,
+        }
+
+
+def main():
+    global LATENCY
+
+    parser = argparse.ArgumentParser(description='文件分类（批量重命名）基准测试')
+    parser.add_argument('--files', type=int, default=100, help='订单中待分类的文件数')
+    parser.add_argument('--latency', type=float, default=20, help='模拟转换服务每个请求的延迟（毫秒）')
+    args = parser.parse_args()
+    LATENCY = args.latency / 1000
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockConvertHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    os.environ.pop('ARCHIVE_SVC_URL', None)
+    os.environ.update({
+        'FLASK_ENV': 'testing',
+        'TEST_DATABASE_URL': 'sqlite://',
+        'CONVERT_SVC_URL': base_url,
+        'HEALTH_MONITOR_ENABLED': 'false',
+        'BUNDLE_ENABLED': 'false',
+        'JOB_WORKERS': '0',
+    })
+
+    from src.app import create_app
+    from src.models import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+
+    try:
+        results = [run_case(app, mode, args.files, base_url) for mode in ('per_file', 'batch')]
+    finally:
+        server.shutdown()
+
+    header = f"{'mode':<9} {'files':>6} {'ok':>5} {'total_ms':>9} {'rename_requests':>16} {'statements':>11}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{r['mode']:<9} {r['files']:>6} {r['succeeded']:>5} {r['seconds'] * 1000:>9.1f} "
+              f"{r['rename_requests']:>16} {r['statements']:>11}")
+
+
+if __name__ == '__main__':
+    main()
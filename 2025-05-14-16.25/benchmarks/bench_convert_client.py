@@ -0,0 +1,177 @@
+"""ConvertClient连接复用基准测试
+
+在本地启动一个模拟convert-svc的HTTP/1.1服务器（统计建立的TCP连接数），
+对比两种调用方式：
+  - bare:   旧实现，每次转换都用裸requests发起 /health + /api/convert（每次新建连接）
+  - pooled: 进程共享的ConvertClient（连接池 + keep-alive，健康状态由健康监控器在后台探测，
+            调用前不再请求 /health）
+
+并分别模拟两种部署形态：
+  - threads:   线程化开发服务器（单进程多线程）
+  - processes: 多worker服务器（多进程，每个进程多线程，fork后各自重建连接池）
+
+用法:
+    python benchmarks/bench_convert_client.py --requests 400 --threads 8 --workers 4
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import requests
+
+
+class _Counter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+
+    def reset(self):
+        with self.lock:
+            self.connections = 0
+            self.requests = 0
+
+
+COUNTER = _Counter()
+LATENCY = 0.0
+
+
+class MockConvertHandler(BaseHTTPRequestHandler):
+    """模拟convert-svc的 /health 与 /api/convert"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with COUNTER.lock:
+            COUNTER.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        with COUNTER.lock:
+            COUNTER.requests += 1
+        self._send_json({'status': 'ok'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        with COUNTER.lock:
+            COUNTER.requests += 1
+        if LATENCY:
+            time.sleep(LATENCY)
+        self._send_json({'success': True, 'files': [f"/data/converted/{payload.get('file_path', 'x')}.png"]})
+
+
+def bare_convert(base_url, i):
+    """旧实现：每次调用都新建连接并先做健康检查"""
+    requests.get(f"{base_url}/health", timeout=5)
+    requests.post(f"{base_url}/api/convert", json={'file_path': f'file_{i}.pdf'}, timeout=60)
+
+
+def pooled_convert(client, i):
+    """新实现：共享客户端"""
+    client.convert_pdf_to_png(f'file_{i}.pdf')
+
+
+def _run_threads(mode, base_url, count, threads, offset=0):
+    if mode == 'pooled':
+        from src.utils.convert_client import convert_client
+        convert_client.base_url = base_url
+        call = lambda i: pooled_convert(convert_client, i)
+    else:
+        call = lambda i: bare_convert(base_url, i)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(call, range(offset, offset + count)))
+
+
+def _worker(mode, base_url, count, threads, offset):
+    _run_threads(mode, base_url, count, threads, offset)
+
+
+def run_case(mode, layout, base_url, total, threads, workers):
+    COUNTER.reset()
+    start = time.perf_counter()
+
+    if layout == 'threads':
+        _run_threads(mode, base_url, total, threads)
+    else:
+        per_worker = total // workers
+        procs = [
+            multiprocessing.Process(target=_worker, args=(mode, base_url, per_worker, threads, w * per_worker))
+            for w in range(workers)
+        ]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+
+    elapsed = time.perf_counter() - start
+    return {
+        'mode': mode,
+        'layout': layout,
+        'calls': total,
+        'http_requests': COUNTER.requests,
+        'tcp_connections': COUNTER.connections,
+        'seconds': round(elapsed, 3),
+        'calls_per_sec': round(total / elapsed, 1) if elapsed else 0,
+    }
+
+
+def main():
+    global LATENCY
+
+    parser = argparse.ArgumentParser(description='ConvertClient连接复用基准测试')
+    parser.add_argument('--requests', type=int, default=400, help='每个场景的转换调用次数')
+    parser.add_argument('--threads', type=int, default=8, help='每个进程的并发线程数')
+    parser.add_argument('--workers', type=int, default=4, help='多进程场景下的worker数量')
+    parser.add_argument('--latency', type=float, default=2.0, help='模拟转换耗时（毫秒）')
+    args = parser.parse_args()
+
+    LATENCY = args.latency / 1000.0
+
+    # 使用fork，使子进程的请求计入同一个模拟服务器，并验证fork后连接池会重建
+    if 'fork' in multiprocessing.get_all_start_methods():
+        multiprocessing.set_start_method('fork')
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockConvertHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    results = []
+    for layout in ('threads', 'processes'):
+        for mode in ('bare', 'pooled'):
+            results.append(run_case(mode, layout, base_url, args.requests, args.threads, args.workers))
+
+    server.shutdown()
+
+    header = f"{'layout':<10} {'mode':<7} {'calls':>6} {'http_reqs':>10} {'tcp_conns':>10} {'seconds':>8} {'calls/s':>9}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{r['layout']:<10} {r['mode']:<7} {r['calls']:>6} {r['http_requests']:>10} "
+              f"{r['tcp_connections']:>10} {r['seconds']:>8} {r['calls_per_sec']:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""主库并发读写基准测试
+
+在临时SQLite文件库上用多个线程模拟并发请求：
+  - 写线程：逐条插入转换文件记录并提交（每条一个事务，相当于转换完成后保存记录）
+  - 读线程：按订单统计转换文件数并读取订单列表（相当于订单页面刷新）
+
+对比两种引擎配置：
+  - default: SQLAlchemy默认参数（rollback日志、synchronous=FULL、默认连接池、5秒锁等待）
+  - tuned:   src.utils.db_engine 生成的参数（WAL、synchronous=NORMAL、busy_timeout、
+             页缓存、mmap、按配置设置连接池）
+
+输出吞吐量、写入延迟P50/P95以及 "database is locked" 错误数。
+
+用法:
+    python benchmarks/bench_db_concurrency.py --writers 8 --readers 8 --seconds 5
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, insert, select, func
+from sqlalchemy.exc import OperationalError
+
+ORDERS = 50
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def _prepare(engine):
+    from src.models import db
+    from src.models.models import Order
+
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Order.__table__), [
+            {'order_number': f"BENCH{i:05d}", 'status': 'pending', 'is_active': True,
+             'created_at': datetime.now(), 'updated_at': datetime.now()}
+            for i in range(ORDERS)
+        ])
+
+
+def run_case(mode, args, work_dir):
+    from src.models.models import Order, ConvertedFile
+    from src.utils.db_engine import engine_options, configure_engine
+
+    url = f"sqlite:///{os.path.join(work_dir, mode + '.db')}"
+    if mode == 'tuned':
+        settings = {
+            'SQLALCHEMY_DATABASE_URI': url,
+            'DB_POOL_SIZE': args.writers + args.readers,
+            'DB_MAX_OVERFLOW': 0,
+        }
+        engine = create_engine(url, **engine_options(settings))
+        configure_engine(engine, settings)
+    else:
+        engine = create_engine(url)
+    _prepare(engine)
+
+    converted = ConvertedFile.__table__
+    orders = Order.__table__
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats = {'writes': 0, 'reads': 0, 'locked': 0, 'write_latency': []}
+
+    def record(key, latency=None):
+        with lock:
+            stats[key] += 1
+            if latency is not None:
+                stats['write_latency'].append(latency)
+
+    def writer(n):
+        i = 0
+        while not stop.is_set():
+            i += 1
+            started = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(converted).values(
+                        filename=f"w{n}_{i}.png", file_path=f"/data/converted/w{n}_{i}.png",
+                        order_id=(n * 7 + i) % ORDERS + 1, conversion_time=datetime.now()
+                    ))
+                record('writes', time.perf_counter() - started)
+            except OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                record('locked')
+
+    def reader(n):
+        i = 0
+        while not stop.is_set():
+            i += 1
+            try:
+                with engine.connect() as conn:
+                    conn.execute(
+                        select(func.count()).select_from(converted)
+                        .where(converted.c.order_id == (n + i) % ORDERS + 1)
+                    ).scalar()
+                    conn.execute(
+                        select(orders.c.id, orders.c.order_number)
+                        .order_by(orders.c.created_at.desc(), orders.c.id.desc()).limit(20)
+                    ).all()
+                record('reads')
+            except OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                record('locked')
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(n,)) for n in range(args.readers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    return {
+        'mode': mode,
+        'writes_per_s': stats['writes'] / elapsed,
+        'reads_per_s': stats['reads'] / elapsed,
+        'write_p50_ms': _percentile(stats['write_latency'], 50) * 1000,
+        'write_p95_ms': _percentile(stats['write_latency'], 95) * 1000,
+        'locked': stats['locked'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='主库并发读写基准测试')
+    parser.add_argument('--writers', type=int, default=8, help='写线程数')
+    parser.add_argument('--readers', type=int, default=8, help='读线程数')
+    parser.add_argument('--seconds', type=float, default=5, help='每种配置的运行时间（秒）')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='bench_db_')
+    try:
+        results = [run_case(mode, args, work_dir) for mode in ('default', 'tuned')]
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    header = (f"{'mode':<8} {'writes/s':>9} {'reads/s':>9} {'write_p50_ms':>13} "
+              f"{'write_p95_ms':>13} {'locked':>7}")
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{r['mode']:<8} {r['writes_per_s']:>9.1f} {r['reads_per_s']:>9.1f} "
+              f"{r['write_p50_ms']:>13.2f} {r['write_p95_ms']:>13.2f} {r['locked']:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""按哈希查询归档文件基准测试
+
+在本地启动一个模拟archive-svc的HTTP服务器（每个请求增加固定延迟，一半的哈希视为已归档），
+用多个线程并发调用 ArchiveService.get_file_by_hash，统计总耗时、发往归档服务的请求数，
+并核对每个查询得到的结果是否正确。
+
+对比逐个查询（每批1个哈希、不等待，相当于旧实现每个哈希一个GET请求）与合并查询：
+    python benchmarks/bench_hash_lookup.py --lookups 1000 --threads 32 --batch-size 1 --linger-ms 0
+    python benchmarks/bench_hash_lookup.py --lookups 1000 --threads 32 --batch-size 100 --linger-ms 5
+
+单线程查询没有并发，不等待合并窗口，每次查询的耗时与逐个查询相同：
+    python benchmarks/bench_hash_lookup.py --lookups 200 --threads 1
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+LATENCY = 0.01
+
+
+def is_archived(file_hash):
+    """模拟数据：哈希最后一位为偶数时视为已归档"""
+    return int(file_hash[-1], 16) % 2 == 0
+
+
+class MockArchiveHandler(BaseHTTPRequestHandler):
+    """模拟archive-svc的 /health 与 /api/v1/archive/files/hash:batch"""
+
+    protocol_version = 'HTTP/1.1'
+    # 响应头和响应体分两次写出，关闭Nagle避免与客户端延迟ACK叠加产生约40ms的额外延迟
+    disable_nagle_algorithm = True
+    lock = threading.Lock()
+    requests = 0
+    max_batch = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._send_json({'status': 'ok'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        hashes = json.loads(self.rfile.read(length))['hashes']
+        time.sleep(LATENCY)
+        with MockArchiveHandler.lock:
+            MockArchiveHandler.requests += 1
+            MockArchiveHandler.max_batch = max(MockArchiveHandler.max_batch, len(hashes))
+        self._send_json({
+            'success': True,
+            'files': {h: {'id': int(h[:8], 16), 'sha256_hash': h} for h in hashes if is_archived(h)},
+            'missing': [h for h in hashes if not is_archived(h)],
+        })
+
+
+def main():
+    global LATENCY
+
+    parser = argparse.ArgumentParser(description='按哈希查询归档文件基准测试')
+    parser.add_argument('--lookups', type=int, default=1000, help='查询次数')
+    parser.add_argument('--threads', type=int, default=32, help='并发查询的线程数')
+    parser.add_argument('--batch-size', type=int, default=100, help='每个批量请求的最大哈希数')
+    parser.add_argument('--linger-ms', type=float, default=5, help='等待合并的时间窗口（毫秒）')
+    parser.add_argument('--latency', type=float, default=10, help='模拟归档服务每个请求的延迟（毫秒）')
+    args = parser.parse_args()
+    LATENCY = args.latency / 1000
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockArchiveHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ.update({
+        'FLASK_ENV': 'testing',
+        'TEST_DATABASE_URL': 'sqlite://',
+        'ARCHIVE_SVC_URL': f"http://127.0.0.1:{server.server_address[1]}/api/v1/archive",
+        'HEALTH_MONITOR_ENABLED': 'false',
+        'JOB_WORKERS': '0',
+        'ARCHIVE_POOL_MAXSIZE': str(args.threads),
+        'ARCHIVE_HASH_BATCH_MAX_SIZE': str(args.batch_size),
+        'ARCHIVE_HASH_BATCH_LINGER_MS': str(args.linger_ms),
+    })
+
+    from src.app import create_app
+    from src.services.file_service import ArchiveService
+    from src.utils.archive_client import hash_lookup_batcher
+
+    app = create_app()
+    hashes = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(args.lookups)]
+
+    def lookup(file_hash):
+        with app.app_context():
+            return file_hash, ArchiveService.get_file_by_hash(file_hash)
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            started = time.perf_counter()
+            results = list(executor.map(lookup, hashes))
+            elapsed = time.perf_counter() - started
+    finally:
+        server.shutdown()
+
+    wrong = sum(
+        1 for file_hash, file in results
+        if (file is not None) != is_archived(file_hash) or (file and file['sha256_hash'] != file_hash)
+    )
+    stats = hash_lookup_batcher.stats()
+    print(f"{'lookups':>8} {'threads':>8} {'batch':>6} {'linger_ms':>10} {'total_ms':>9} {'lookups/s':>10} "
+          f"{'requests':>9} {'max_batch':>10} {'found':>6} {'wrong':>6}")
+    print(f"{args.lookups:>8} {args.threads:>8} {args.batch_size:>6} {args.linger_ms:>10} {elapsed * 1000:>9.1f} "
+          f"{args.lookups / elapsed:>10.1f} {stats['batches']:>9} {MockArchiveHandler.max_batch:>10} "
+          f"{sum(1 for _, file in results if file):>6} {wrong:>6}")
+
+
+if __name__ == '__main__':
+    main()
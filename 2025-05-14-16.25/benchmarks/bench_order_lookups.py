@@ -0,0 +1,171 @@
+"""转换流程中的订单查询次数基准测试
+
+在本地启动一个模拟convert-svc的HTTP服务器，使用内存SQLite创建一个订单和若干PDF上传文件，
+用SQLAlchemy语句计数器统计一次转换中访问orders表的SELECT次数和语句总数：
+  - uncached: 关闭请求/任务级订单快照缓存（每次查询订单都访问数据库，相当于旧实现）
+  - cached:   订单在一次请求/任务内只查询一次，并沿转换流程传递
+
+分别测量两条转换路径：
+  - per_file: 逐个文件调用 FileService.convert_pdf（/api/convert，每个文件保存一次记录）
+  - job:      JobService.convert_files（/api/convert-batch，批量转换后一次保存）
+
+用法:
+    python benchmarks/bench_order_lookups.py --files 50 --pages 5
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+PAGES = 5
+
+
+class MockConvertHandler(BaseHTTPRequestHandler):
+    """模拟convert-svc的 /health、/api/convert 与 /api/convert-batch"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._send_json({'status': 'ok'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        order_dir = payload.get('order_id') or 'default'
+
+        def pages(file_path):
+            name = os.path.splitext(os.path.basename(file_path))[0]
+            return [f"/data/converted/{order_dir}/{name}_p{i}.png" for i in range(1, PAGES + 1)]
+
+        if self.path == '/api/convert-batch':
+            self._send_json({'results': {
+                f['file_path']: {'success': True, 'files': pages(f['file_path'])} for f in payload.get('files', [])
+            }})
+        else:
+            self._send_json({'success': True, 'files': pages(payload.get('file_path', 'x'))})
+
+
+def _create_files(order_id, count, work_dir):
+    from src.repositories.file_repo import FileRepository
+
+    files = []
+    for i in range(count):
+        path = os.path.join(work_dir, f"doc_{order_id}_{i}.pdf")
+        with open(path, 'wb') as f:
+            f.write(b'%PDF-1.4\n' + os.urandom(64))
+        files.append(FileRepository.create_uploaded_file(
+            filename=os.path.basename(path), original_filename=os.path.basename(path),
+            file_path=path, order_id=order_id, file_type='pdf', file_hash=os.urandom(32).hex()
+        ))
+    return files
+
+
+def run_case(app, path, mode, count, work_dir):
+    from src.models import db
+    from src.models.models import Order
+    from src.repositories import order_repo
+    from src.repositories.order_repo import OrderRepository
+    from src.services.file_service import FileService
+    from src.services.job_service import JobService
+    from src.utils.db_diagnostics import count_statements
+
+    original = order_repo._context_cache
+    if mode == 'uncached':
+        order_repo._context_cache = lambda: None
+
+    try:
+        # 每个场景在独立的应用上下文中执行，相当于一次请求或一个任务
+        with app.app_context():
+            order = Order(order_number=Order.generate_order_number(), status=Order.STATUS_PENDING)
+            db.session.add(order)
+            db.session.commit()
+            files = _create_files(order.id, count, work_dir)
+            file_ids = [f.id for f in files]
+            OrderRepository.forget_context()
+
+            with count_statements(db.engine) as counter:
+                if path == 'per_file':
+                    for file in files:
+                        FileService.convert_pdf(file)
+                else:
+                    JobService.convert_files(order.id, file_ids)
+
+            return {
+                'path': path,
+                'mode': mode,
+                'files': count,
+                'order_selects': counter.count_table('orders'),
+                'statements': counter.count,
+            }
+    finally:
+        order_repo._context_cache = original
+
+
+def main():
+    global PAGES
+
+    parser = argparse.ArgumentParser(description='转换流程订单查询次数基准测试')
+    parser.add_argument('--files', type=int, default=50, help='订单中的PDF文件数')
+    parser.add_argument('--pages', type=int, default=5, help='每个文件转换出的页数')
+    args = parser.parse_args()
+    PAGES = args.pages
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockConvertHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    work_dir = tempfile.mkdtemp(prefix='bench_orders_')
+    os.environ.update({
+        'FLASK_ENV': 'testing',
+        'TEST_DATABASE_URL': 'sqlite://',
+        'CONVERT_SVC_URL': f"http://127.0.0.1:{server.server_address[1]}",
+        'HEALTH_MONITOR_ENABLED': 'false',
+        'CONVERSION_CACHE_ENABLED': 'false',
+        'RENDITION_PREGENERATE': 'false',
+        'BUNDLE_ENABLED': 'false',
+        'JOB_WORKERS': '0',
+    })
+
+    from src.app import create_app
+    from src.models import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+
+    results = []
+    try:
+        for path in ('per_file', 'job'):
+            for mode in ('uncached', 'cached'):
+                results.append(run_case(app, path, mode, args.files, work_dir))
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    header = f"{'path':<9} {'mode':<9} {'files':>6} {'order_selects':>14} {'statements':>11}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{r['path']:<9} {r['mode']:<9} {r['files']:>6} {r['order_selects']:>14} {r['statements']:>11}")
+
+
+if __name__ == '__main__':
+    main()
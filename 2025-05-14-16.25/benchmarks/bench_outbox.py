@@ -0,0 +1,135 @@
+"""归档服务事件发件箱投递基准测试
+
+在本地启动一个模拟archive-svc的HTTP服务器（每个请求增加固定延迟，可按比例返回503），
+使用内存SQLite向发件箱写入若干重命名事件，然后循环调用 OutboxService.dispatch_once 直到发件箱清空，
+统计投递耗时、投递请求数、重复投递的事件数，以及期间的队列深度和延迟。
+
+对比不同的批大小和并发度，例如逐个投递（相当于旧实现每个文件一个通知请求）：
+    python benchmarks/bench_outbox.py --events 1000 --batch-size 1 --concurrency 1
+    python benchmarks/bench_outbox.py --events 1000 --batch-size 100 --concurrency 2
+    python benchmarks/bench_outbox.py --events 1000 --failure-rate 0.2   # 模拟归档服务间歇性失败
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+LATENCY = 0.02
+FAILURE_RATE = 0.0
+
+
+class MockArchiveHandler(BaseHTTPRequestHandler):
+    """模拟archive-svc的 /health 与 /api/v1/archive/events:batch"""
+
+    protocol_version = 'HTTP/1.1'
+    lock = threading.Lock()
+    requests = 0
+    received = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._send_json({'status': 'ok'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        time.sleep(LATENCY)
+        with MockArchiveHandler.lock:
+            MockArchiveHandler.requests += 1
+            if random.random() < FAILURE_RATE:
+                self._send_json({'detail': 'unavailable'}, status=503)
+                return
+            for event in payload.get('events', []):
+                event_id = event['event_id']
+                MockArchiveHandler.received[event_id] = MockArchiveHandler.received.get(event_id, 0) + 1
+        self._send_json({'success': True})
+
+
+def main():
+    global LATENCY, FAILURE_RATE
+
+    parser = argparse.ArgumentParser(description='归档服务事件发件箱投递基准测试')
+    parser.add_argument('--events', type=int, default=1000, help='写入发件箱的事件数')
+    parser.add_argument('--batch-size', type=int, default=100, help='每个投递请求的事件数')
+    parser.add_argument('--concurrency', type=int, default=2, help='同时进行的投递请求数')
+    parser.add_argument('--latency', type=float, default=20, help='模拟归档服务每个请求的延迟（毫秒）')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='归档服务返回503的概率')
+    args = parser.parse_args()
+    LATENCY = args.latency / 1000
+    FAILURE_RATE = args.failure_rate
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockArchiveHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ.update({
+        'FLASK_ENV': 'testing',
+        'TEST_DATABASE_URL': 'sqlite://',
+        'ARCHIVE_SVC_URL': f"http://127.0.0.1:{server.server_address[1]}/api/v1/archive",
+        'HEALTH_MONITOR_ENABLED': 'false',
+        'JOB_WORKERS': '0',
+        'ARCHIVE_OUTBOX_BATCH_SIZE': str(args.batch_size),
+        'ARCHIVE_OUTBOX_CONCURRENCY': str(args.concurrency),
+        # 退避很短，让失败的事件在测试中很快重试
+        'ARCHIVE_OUTBOX_BACKOFF_BASE': '0.01',
+        'ARCHIVE_OUTBOX_BACKOFF_MAX': '0.05',
+        # 失败不触发熔断，只测试发件箱自身的重试
+        'CIRCUIT_FAILURE_THRESHOLD': '1000000',
+    })
+
+    from src.app import create_app
+    from src.models import db
+    from src.services.outbox_service import OutboxService, EVENT_RENAME
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        OutboxService.add_events(EVENT_RENAME, [
+            {'file_id': i, 'order_id': 1, 'old_url': f"/files/ORD/page_{i}.png", 'new_url': f"/files/ORD/cat_{i}.png"}
+            for i in range(args.events)
+        ])
+        db.session.commit()
+
+        max_lag = 0.0
+        rounds = 0
+        started = time.perf_counter()
+        try:
+            while True:
+                stats = OutboxService.stats()
+                max_lag = max(max_lag, stats['lag_seconds'])
+                if not stats['depth']:
+                    break
+                rounds += 1
+                if not OutboxService.dispatch_once():
+                    time.sleep(0.01)
+        finally:
+            server.shutdown()
+        elapsed = time.perf_counter() - started
+
+    received = MockArchiveHandler.received
+    print(f"{'events':>7} {'batch':>6} {'conc':>5} {'total_ms':>9} {'events/s':>9} {'requests':>9} "
+          f"{'rounds':>7} {'delivered':>10} {'redelivered':>12} {'max_lag_s':>10}")
+    print(f"{args.events:>7} {args.batch_size:>6} {args.concurrency:>5} {elapsed * 1000:>9.1f} "
+          f"{args.events / elapsed:>9.1f} {MockArchiveHandler.requests:>9} {rounds:>7} {len(received):>10} "
+          f"{sum(received.values()) - len(received):>12} {max_lag:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
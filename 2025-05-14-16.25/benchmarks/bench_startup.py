@@ -0,0 +1,137 @@
+"""应用启动耗时与worker内存基准测试
+
+在子进程中用 python -X importtime 执行 create_app()，输出：
+  - 启动耗时（导入 + 创建应用）
+  - 启动后的进程常驻内存（Linux读取/proc/self/status的VmRSS，其他平台为ru_maxrss）
+  - 按累计导入耗时排序的前N个顶层模块（-X importtime 报告）
+
+对比两种模式：
+  - eager: 先导入PyMuPDF、python-docx、python-pptx、PIL和rarfile再创建应用（相当于旧的模块级导入）
+  - lazy:  直接创建应用，这些库在首次使用时才导入
+
+未安装的库在eager模式中跳过并在输出中列出。
+
+用法:
+    python benchmarks/bench_startup.py --runs 3 --top 15
+    python benchmarks/bench_startup.py --report startup_importtime.txt   # 同时保存lazy模式的完整importtime报告
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# 旧实现中 file_utils、file_service、archive_stream 在模块级导入的库
+EAGER_MODULES = ('fitz', 'docx', 'pptx', 'PIL.Image', 'PIL.ImageDraw', 'PIL.ImageFont', 'rarfile')
+
+CHILD_SCRIPT = r'''
+import os, sys, time, json, importlib
+started = time.perf_counter()
+skipped = []
+for name in json.loads(sys.argv[1]):
+    try:
+        importlib.import_module(name)
+    except Exception:
+        skipped.append(name)
+from src.app import create_app
+create_app()
+elapsed = time.perf_counter() - started
+
+rss_kb = None
+try:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                rss_kb = int(line.split()[1])
+except OSError:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss_kb //= 1024
+print('RESULT ' + json.dumps({'seconds': elapsed, 'rss_kb': rss_kb, 'skipped': skipped,
+                              'modules': len(sys.modules)}))
+'''
+
+
+def parse_importtime(stderr):
+    """解析 -X importtime 输出，返回 [(累计微秒, 自身微秒, 模块名, 缩进层级)]"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(parts[1]), int(parts[0]), name.strip(), depth))
+    return rows
+
+
+def run_once(mode, work_dir):
+    env = dict(os.environ)
+    env.update({
+        'FLASK_ENV': 'testing',
+        'TEST_DATABASE_URL': 'sqlite://',
+        'HEALTH_MONITOR_ENABLED': 'false',
+        'JOB_WORKERS': '0',
+        'PYTHONPATH': os.pathsep.join(filter(None, [PROJECT_ROOT, env.get('PYTHONPATH')])),
+    })
+    modules = list(EAGER_MODULES) if mode == 'eager' else []
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT, json.dumps(modules)],
+        cwd=work_dir, env=env, capture_output=True, text=True
+    )
+    result_lines = [line for line in proc.stdout.splitlines() if line.startswith('RESULT ')]
+    if proc.returncode != 0 or not result_lines:
+        raise RuntimeError(f"{mode} 启动失败:\n{proc.stderr[-2000:]}")
+    result = json.loads(result_lines[-1][len('RESULT '):])
+    result['importtime'] = parse_importtime(proc.stderr)
+    result['importtime_raw'] = proc.stderr
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='应用启动耗时与worker内存基准测试')
+    parser.add_argument('--runs', type=int, default=3, help='每种模式运行次数（取中位数）')
+    parser.add_argument('--top', type=int, default=15, help='列出累计导入耗时最高的顶层模块数')
+    parser.add_argument('--report', help='保存lazy模式完整 -X importtime 报告的文件路径')
+    args = parser.parse_args()
+
+    # 子进程在临时目录中运行，日志文件等不写入项目目录
+    work_dir = tempfile.mkdtemp(prefix='bench_startup_')
+    results = {}
+    try:
+        for mode in ('eager', 'lazy'):
+            runs = sorted((run_once(mode, work_dir) for _ in range(args.runs)), key=lambda r: r['seconds'])
+            results[mode] = runs[len(runs) // 2]
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    header = f"{'mode':<6} {'startup_ms':>11} {'rss_mb':>8} {'modules':>8}  skipped"
+    print(header)
+    print('-' * len(header))
+    for mode, r in results.items():
+        rss_mb = r['rss_kb'] / 1024 if r['rss_kb'] else 0
+        print(f"{mode:<6} {r['seconds'] * 1000:>11.1f} {rss_mb:>8.1f} {r['modules']:>8}  "
+              f"{', '.join(r['skipped']) or '-'}")
+
+    for mode, r in results.items():
+        top_level = sorted((row for row in r['importtime'] if row[3] == 0), reverse=True)[:args.top]
+        print(f"\n{mode}: 累计导入耗时最高的顶层模块")
+        for cumulative, _, name, _ in top_level:
+            print(f"  {cumulative / 1000:>9.1f} ms  {name}")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            f.write(results['lazy']['importtime_raw'])
+        print(f"\nimporttime报告已保存: {args.report}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""gunicorn配置（生产环境）
+
+    gunicorn -c gunicorn.conf.py src.wsgi:app
+或  FLASK_ENV=production python run.py
+
+- prefork模式，worker数默认按CPU核数计算（2*核数+1），可通过WEB_WORKERS设置
+- preload_app：主进程中创建应用、初始化数据库并预热后再fork
+- worker处理WEB_MAX_REQUESTS个请求后自动重启，控制内存增长
+- kill -HUP <master> 平滑重启所有worker（preload模式下不会重新加载代码，
+  更新代码需发送USR2启动新的master，确认正常后向旧master发送TERM）
+- 各worker的请求统计见 /admin/workers，归档发件箱积压见 /admin/outbox
+"""
+
+import os
+import sys
+import multiprocessing
+
+# 确保项目根目录在Python路径中
+project_root = os.path.dirname(os.path.abspath(__file__))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import src.settings as config
+
+chdir = project_root
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '8080')}"
+workers = config.WEB_WORKERS or multiprocessing.cpu_count() * 2 + 1
+worker_class = 'gthread'
+threads = config.WEB_THREADS
+preload_app = True
+max_requests = config.WEB_MAX_REQUESTS
+max_requests_jitter = config.WEB_MAX_REQUESTS_JITTER
+timeout = config.WEB_TIMEOUT
+graceful_timeout = config.WEB_GRACEFUL_TIMEOUT
+keepalive = 5
+accesslog = '-'
+errorlog = '-'
+loglevel = config.LOG_LEVEL.lower()
+
+
+def when_ready(server):
+    """主进程就绪：启动后台任务worker和归档发件箱dispatcher（只启动一次，HUP重启web worker时不受影响）"""
+    from src.run import start_job_workers, start_outbox_dispatcher
+    start_job_workers()
+    start_outbox_dispatcher()
+    server.log.info(f"gunicorn已就绪: workers={workers}, threads={threads}, max_requests={max_requests}")
+
+
+def post_fork(server, worker):
+    """web worker fork后：重置数据库连接池和后台线程"""
+    from src.wsgi import post_fork as wsgi_post_fork
+    wsgi_post_fork()
+
+
+def child_exit(server, worker):
+    """web worker退出（包括按请求数回收）：删除其请求统计快照"""
+    from src.utils.request_metrics import request_metrics
+    request_metrics.remove(worker.pid)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""为已存在的数据库补建热点查询所需的索引
+
+索引定义在 src/models/models.py 中（db.create_all 只会为新建的表创建索引），
+本脚本只创建缺失的索引，可重复执行。应用启动时也会自动执行同样的检查。
+
+新增索引：
+  orders:            (created_at, id)、(status, created_at, id)、(user_id, created_at, id)、
+                     (user_id, is_active)、email_id
+  uploaded_files:    order_id、file_hash、filename
+  converted_files:   order_id、filename、source_hash、source_file_id
+  emails:            (processed, received_at)、sender、assigned_to
+  email_attachments: email_id
+
+用法:
+    python migrations/add_indexes.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.app import create_app
+from src.models import ensure_indexes
+
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        created = ensure_indexes()
+    if created:
+        print(f"已创建 {len(created)} 个索引:")
+        for name in created:
+            print(f"  {name}")
+    else:
+        print("所有索引均已存在")
@@ -1,11 +1,10 @@
-from flask import render_template, redirect, url_for, request, flash, session
+from flask import render_template, redirect, url_for, request, flash, session, jsonify
 from functools import wraps
 import datetime
 from urllib.parse import urlparse
 
 from src.api import admin_bp, csrf
 from src.services.admin_service import AdminService
-from src.services.order_service import OrderService
 
 # 管理员装饰器
 def admin_required(f):
@@ -108,9 +107,48 @@ def user_list():
 @admin_bp.route('/orders')
 @admin_required
 def orders():
-    """订单管理页面"""
-    orders = OrderService.get_all_orders()
-    return render_template('admin/orders.html', orders=orders)
+    """订单管理页面（分页）"""
+    from src.api.order_routes import order_list_context
+    return render_template('admin/orders.html', **order_list_context())
+
+@admin_bp.route('/cache-stats')
+@admin_required
+def cache_stats():
+    """缓存命中统计（JSON）"""
+    from src.utils.hash_cache import hash_cache
+    from src.utils.conversion_cache import conversion_cache
+    from src.utils.artifact_cache import artifact_cache
+    return jsonify({
+        'hash_cache': hash_cache.stats(),
+        'conversion_cache': conversion_cache.stats(),
+        'artifact_cache': artifact_cache.stats()
+    })
+
+@admin_bp.route('/services')
+@admin_required
+def services_status():
+    """依赖服务健康状态与熔断器状态（JSON）
+    
+    传入 ?refresh=1 时立即重新探测所有服务。
+    """
+    from src.utils.health_monitor import health_monitor
+    if request.args.get('refresh'):
+        health_monitor.refresh_all()
+    return jsonify(health_monitor.snapshot())
+
+@admin_bp.route('/workers')
+@admin_required
+def workers_status():
+    """各Web worker进程的请求统计（JSON）"""
+    from src.utils.request_metrics import request_metrics
+    return jsonify(request_metrics.collect())
+
+@admin_bp.route('/outbox')
+@admin_required
+def outbox_status():
+    """归档服务事件发件箱的积压统计（JSON）：队列深度、最早事件的等待时间和重试情况"""
+    from src.services.outbox_service import OutboxService
+    return jsonify(OutboxService.stats())
 
 @admin_bp.route('/settings')
 @admin_required
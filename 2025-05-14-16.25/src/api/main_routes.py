@@ -1,21 +1,23 @@
-from flask import Blueprint, render_template, redirect, url_for, request, session, flash, send_from_directory, jsonify, abort, current_app
+from flask import Blueprint, render_template, redirect, url_for, request, session, flash, send_from_directory, send_file, jsonify, abort, current_app
 from werkzeug.utils import secure_filename
+from sqlalchemy import text
 import os
 import uuid
 from functools import wraps
 import json
-import zipfile
-from flask import after_this_request
 import shutil
-import requests
 import urllib.parse
-import threading
 
 from src.api import main_bp
 from src.services.admin_service import AdminService
 from src.services.file_service import FileService
 from src.services.order_service import OrderService
+from src.services.job_service import JobService
+from src.services.bundle_service import BundleService
 from src.utils.decorators import login_required
+from src.utils.convert_client import convert_client, SERVICE_NAME as CONVERT_SERVICE
+from src.utils.health_monitor import health_monitor
+from src.utils.artifact_cache import artifact_cache
 from src.repositories.file_repo import FileRepository
 from src.models import db  # 导入数据库会话
 
@@ -74,11 +76,7 @@ def upload_file():
             flash(f'已创建新订单: {order.order_number}', 'info')
         
         # 保存所有上传的文件
-        success_count = 0
-        for file in uploaded_files:
-            uploaded_file = FileService.save_uploaded_file(file, order.id)
-            if uploaded_file:
-                success_count += 1
+        success_count = len(FileService.save_uploaded_files(uploaded_files, order.id))
         
         # 提示消息
         if success_count > 0:
@@ -125,44 +123,32 @@ def process():
             
             selected_file_ids = [str(f.id) for f in files]
         
-        # 处理每个选中的文件
-        processed_count = 0
-        for file_id in selected_file_ids:
-            # 通过服务层获取文件
-            file = FileService.get_uploaded_file(int(file_id))
-            
-            # 确保文件存在且属于当前订单
-            if not file or file.order_id != current_order.id:
-                continue
-                
-            # 检查文件类型并进行相应处理
-            if file.file_path.lower().endswith('.pdf'):
-                # 调用服务层进行PDF转换
-                FileService.convert_pdf(file)
-                processed_count += 1
-            elif file.file_path.lower().endswith(('.docx', '.doc')):
-                # 调用服务层进行Word文档转换
-                FileService.convert_word(file)
-                processed_count += 1
-            elif file.file_path.lower().endswith(('.pptx', '.ppt')):
-                # 调用服务层进行PPT转换
-                FileService.convert_ppt(file)
-                processed_count += 1
-            elif file.file_path.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp', '.gif')):
-                # 调用服务层进行图片转换
-                FileService.convert_image(file)
-                processed_count += 1
-            elif FileService.is_archive_file(file.file_path):
-                # 调用服务层处理压缩文件
-                FileService.extract_and_convert_archive(file)
-                processed_count += 1
-        
-        if processed_count > 0:
-            flash(f'{processed_count}个文件处理完成', 'success')
+        # 任务队列关闭时保持原有的同步处理方式
+        if not current_app.config.get('JOB_QUEUE_ENABLED', True):
+            progress = JobService.run_inline(current_order.id, selected_file_ids)
+            if progress['done']:
+                flash(f"{len(progress['done'])}个文件处理完成", 'success')
+            else:
+                flash('没有找到需要处理的文件', 'info')
+            return redirect(url_for('orders.order_detail', order_number=current_order.order_number))
+        
+        # 提交后台转换任务，立即返回任务ID供页面轮询
+        job, created = JobService.submit_conversion(current_order.id, selected_file_ids)
+        
+        # 转换服务不可用时任务保留在队列中，服务恢复后自动处理
+        degraded = not health_monitor.is_available(CONVERT_SERVICE)
+        
+        if request.accept_mimetypes.best == 'application/json' or request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return jsonify(success=True, job_id=job['id'], status=job['status'], created=created, degraded=degraded), 202
+        
+        if degraded:
+            flash('转换服务暂时不可用，任务已排队，服务恢复后将自动处理', 'info')
+        elif created:
+            flash(f'已提交{len(selected_file_ids)}个文件的处理任务，正在后台转换', 'success')
         else:
-            flash('没有找到需要处理的文件', 'info')
+            flash('相同的处理任务正在进行中', 'info')
         
-        return redirect(url_for('orders.order_detail', order_number=current_order.order_number))
+        return redirect(url_for('orders.order_detail', order_number=current_order.order_number, job_id=job['id']))
     
     except Exception as e:
         flash(f'处理文件时出错: {str(e)}', 'error')
@@ -171,6 +157,66 @@ def process():
             return redirect(url_for('orders.order_detail', order_number=current_order.order_number))
         return redirect(url_for('main.index'))
 
+# 存活探针：进程能处理请求即返回200
+@main_bp.route('/healthz')
+def healthz():
+    """存活检查（供进程管理器判断是否需要重启）"""
+    return jsonify(status='ok'), 200
+
+# 就绪探针：数据库可用时就绪，依赖服务不可用时为降级状态
+@main_bp.route('/readyz')
+def readyz():
+    """就绪检查（供进程管理器/负载均衡判断是否转发流量）
+    
+    数据库不可用时返回503；转换服务或归档服务不可用时返回200并标记为degraded
+    （转换任务排队等待服务恢复），READINESS_REQUIRE_SERVICES为真时返回503。
+    """
+    checks = {}
+    try:
+        db.session.execute(text('SELECT 1'))
+        checks['database'] = True
+    except Exception as e:
+        current_app.logger.error(f"就绪检查: 数据库不可用: {str(e)}")
+        checks['database'] = False
+    finally:
+        db.session.remove()
+    
+    services = health_monitor.snapshot()['services']
+    for name in services:
+        checks[name] = health_monitor.is_available(name)
+    
+    services_ok = all(checks[name] for name in services)
+    if not checks['database'] or (not services_ok and current_app.config.get('READINESS_REQUIRE_SERVICES')):
+        status, code = 'unavailable', 503
+    elif not services_ok:
+        status, code = 'degraded', 200
+    else:
+        status, code = 'ready', 200
+    return jsonify(status=status, checks=checks), code
+
+# 任务状态查询路由
+@main_bp.route('/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    """查询后台处理任务的状态（JSON，供订单页面轮询）
+    
+    只返回当前用户可以查看的订单的任务，其他任务与不存在的任务一样返回404。
+    """
+    job = JobService.get_job(job_id)
+    order_id = (job or {}).get('payload', {}).get('order_id')
+    if not job or not OrderService.can_view_order(OrderService.get_order(order_id) if order_id else None):
+        return jsonify(success=False, message='任务不存在'), 404
+    
+    return jsonify(
+        success=True,
+        job_id=job['id'],
+        status=job['status'],
+        attempts=job['attempts'],
+        max_attempts=job['max_attempts'],
+        progress=job.get('progress'),
+        error=job.get('error')
+    )
+
 # 文件下载路由
 @main_bp.route('/download/<int:file_id>')
 @login_required
@@ -179,6 +225,8 @@ def download_file(file_id):
     # 检查文件类型（上传的或转换的）
     file = FileService.get_uploaded_file(file_id)
     if file:
+        # 本地文件丢失时从归档服务恢复
+        FileService.restore_uploaded_file(file)
         return send_from_directory(os.path.dirname(file.file_path),
                                   os.path.basename(file.file_path),
                                   as_attachment=True,
@@ -316,6 +364,7 @@ def classify_materials():
                             'filename': new_filename,
                             'file_path': new_archive_path
                         })
+                        BundleService.invalidate(file_record.order_id)
                         renamed_files_count += 1
                     except Exception as e:
                         current_app.logger.error(f"更新数据库记录失败: {filename} -> {new_filename}, 错误: {str(e)}")
@@ -404,34 +453,8 @@ def preview_file(filename):
         order_id = request.args.get('order_id')
         current_app.logger.info(f"预览文件请求: {filename}, 订单ID: {order_id}")
         
-        # 获取order_id参数，用于限定查询范围
-        order_id_param = request.args.get('order_id')
-        
-        # 尝试将filename解析为UUID（数字ID）
-        is_uuid = filename.isdigit()
-        
-        # 根据不同标识符查找文件记录
-        converted_file = None
-        if is_uuid:
-            # 尝试通过UUID查找
-            converted_file = FileRepository.get_converted_file_by_id(int(filename))
-            current_app.logger.info(f"通过UUID查找文件: {filename}")
-        else:
-            # 尝试通过文件名查找，优先在指定订单内查找
-            if order_id_param:
-                # 如果提供了订单ID，则在该订单内查找匹配文件名的文件
-                order_files = FileRepository.get_converted_files_by_order(int(order_id_param))
-                if order_files:
-                    for file in order_files:
-                        if file.filename == filename:
-                            converted_file = file
-                            current_app.logger.info(f"在订单 {order_id_param} 内找到文件: {filename}")
-                            break
-            
-            # 如果在指定订单中没有找到，再尝试全局查找
-            if not converted_file:
-                converted_file = FileService.get_converted_file_by_filename(filename)
-                current_app.logger.info(f"通过全局文件名查找文件: {filename}")
+        # 根据UUID（数字ID）或文件名查找文件记录
+        converted_file = _find_converted_file(filename, order_id)
         
         if not converted_file:
             current_app.logger.error(f"找不到文件记录: {filename}")
@@ -501,10 +524,79 @@ def preview_file(filename):
         except:
             return "Server error", 500
 
+def _find_converted_file(filename, order_id=None):
+    """根据UUID（数字ID）或文件名查找转换文件记录，提供订单ID时优先在该订单内按文件名查找"""
+    # 尝试将filename解析为UUID（数字ID）
+    if filename.isdigit():
+        current_app.logger.info(f"通过UUID查找文件: {filename}")
+        return FileRepository.get_converted_file(int(filename))
+    
+    # 尝试通过文件名查找，优先在指定订单内查找
+    if order_id:
+        for file in FileRepository.get_converted_files_by_order(int(order_id)):
+            if file.filename == filename:
+                current_app.logger.info(f"在订单 {order_id} 内找到文件: {filename}")
+                return file
+    
+    # 如果在指定订单中没有找到，再尝试全局查找
+    current_app.logger.info(f"通过全局文件名查找文件: {filename}")
+    return FileService.get_converted_file_by_filename(filename)
+
+# 缩略图路由
+@main_bp.route('/thumbs/<path:filename>')
+@login_required
+def thumbnail(filename):
+    """转换文件的缩略图
+    
+    按 (内容哈希, 尺寸) 缓存，未命中时即时生成。查询参数：
+    size: 长边像素（对齐到RENDITION_SIZES），format: webp或png（默认按Accept头协商）
+    """
+    from src.services.rendition_service import RenditionService
+    
+    order_id = request.args.get('order_id')
+    converted_file = _find_converted_file(filename, order_id)
+    if not converted_file:
+        return "文件不存在", 404
+    if order_id and str(converted_file.order_id) != str(order_id):
+        return "文件不属于当前订单", 403
+    
+    size = request.args.get('size', type=int) or RenditionService.sizes()[0]
+    fmt = request.args.get('format')
+    negotiated = fmt is None
+    if negotiated:
+        fmt = RenditionService.default_format()
+        if fmt == 'webp' and 'image/webp' not in request.headers.get('Accept', ''):
+            fmt = 'png'
+    
+    try:
+        rendition_path, etag = RenditionService.get_rendition(converted_file, size, fmt)
+    except Exception as e:
+        current_app.logger.error(f"生成缩略图失败: {filename}, 错误: {str(e)}")
+        rendition_path = None
+    
+    # 缩略图不可用时回退到原图预览
+    if not rendition_path:
+        return redirect(url_for('main.preview_file', filename=filename, order_id=order_id))
+    
+    response = send_file(
+        rendition_path,
+        mimetype=f"image/{os.path.splitext(rendition_path)[1][1:]}",
+        etag=etag,
+        conditional=True,
+        max_age=current_app.config.get('RENDITION_BROWSER_MAX_AGE', 300),
+    )
+    if negotiated:
+        response.vary.add('Accept')
+    return response
+
 # 添加代理路由，转发文件请求到转换服务
 @main_bp.route('/files/<path:filename>')
 def file_proxy(filename):
-    """代理转发文件请求到转换服务"""
+    """代理转发文件请求到转换服务
+    
+    文件经本地磁盘缓存（artifact_cache）提供，以内容哈希作为强ETag，
+    由send_file处理 If-None-Match (304) 和 Range (206) 请求。
+    """
     try:
         # 从转换服务获取文件
         convert_svc_url = current_app.config.get('CONVERT_SVC_URL', os.environ.get('CONVERT_SVC_URL', 'http://localhost:8081'))
@@ -512,68 +604,80 @@ def file_proxy(filename):
         # 检查是否包含订单号
         order_id = request.args.get('order_id')
         
-        # 如果文件名中没有斜杠，但有订单号参数，则在路径中添加订单号
+        # 如果文件名中没有斜杠，但有订单号参数，则先在订单子目录中查找，再尝试根目录
+        candidates = [filename]
         if order_id and '/' not in filename:
-            file_url = f"{convert_svc_url}/files/{order_id}/{filename}"
-            current_app.logger.info(f"访问订单子目录文件: {file_url}")
-        else:
-            file_url = f"{convert_svc_url}/files/{filename}"
-            current_app.logger.info(f"访问文件: {file_url}")
+            candidates = [f"{order_id}/{filename}", filename]
         
-        # 使用requests获取文件
-        response = requests.get(file_url, stream=True)
+        if not current_app.config.get('ARTIFACT_CACHE_ENABLED', True):
+            return _relay_file(convert_svc_url, candidates)
         
-        if response.status_code == 200:
-            # 创建一个Flask响应
-            from flask import Response
-            
-            # 设置相同的headers
-            headers = {}
-            for name, value in response.headers.items():
-                if name.lower() not in ('content-length', 'connection', 'transfer-encoding'):
-                    headers[name] = value
-                    
-            # 返回流式响应
-            return Response(
-                response.iter_content(chunk_size=10*1024),
-                status=response.status_code,
-                headers=headers,
-                content_type=response.headers.get('content-type', 'image/png')
-            )
-        else:
-            current_app.logger.error(f"从转换服务获取文件失败: {file_url}, 状态码: {response.status_code}")
-            
-            # 如果第一次尝试失败并且有订单号，尝试不同的组合
-            if order_id and '/' not in filename and file_url.endswith(f"/{order_id}/{filename}"):
-                # 尝试不使用订单号子目录
-                alt_file_url = f"{convert_svc_url}/files/{filename}"
-                current_app.logger.info(f"尝试备选路径: {alt_file_url}")
-                
-                alt_response = requests.get(alt_file_url, stream=True)
-                if alt_response.status_code == 200:
-                    # 创建一个Flask响应
-                    from flask import Response
-                    
-                    # 返回流式响应
-                    return Response(
-                        alt_response.iter_content(chunk_size=10*1024),
-                        status=alt_response.status_code,
-                        headers={k: v for k, v in alt_response.headers.items() if k.lower() not in ('content-length', 'connection', 'transfer-encoding')},
-                        content_type=alt_response.headers.get('content-type', 'image/png')
-                    )
+        from src.utils.artifact_cache import ArtifactFetchError
+        
+        status_code = 404
+        for relative_path in candidates:
+            file_url = f"{convert_svc_url}/files/{relative_path}"
+            try:
+                entry = artifact_cache.get_or_fetch(
+                    relative_path,
+                    lambda headers, url=file_url: convert_client.get(url, stream=True, headers=headers)
+                )
+            except ArtifactFetchError as e:
+                current_app.logger.error(f"从转换服务获取文件失败: {file_url}, 状态码: {e.status_code}")
+                status_code = e.status_code
+                continue
             
-            # 如果仍然找不到，返回错误
-            return f"获取文件失败: {response.status_code}", response.status_code
+            try:
+                return send_file(
+                    entry['path'],
+                    mimetype=entry['content_type'] or 'image/png',
+                    etag=entry['etag'],
+                    conditional=True,
+                    max_age=current_app.config.get('ARTIFACT_CACHE_BROWSER_MAX_AGE', 0),
+                )
+            except FileNotFoundError:
+                # 条目在发送前被淘汰，直接回源
+                artifact_cache.invalidate(relative_path)
+                return _relay_file(convert_svc_url, [relative_path])
+        
+        # 如果仍然找不到，返回错误
+        return f"获取文件失败: {status_code}", status_code
     
     except Exception as e:
         current_app.logger.error(f"代理文件请求时出错: {str(e)}")
         return f"服务器错误: {str(e)}", 500
 
+def _relay_file(convert_svc_url, candidates):
+    """不经缓存，直接转发转换服务的文件响应（保留Content-Length，透传条件请求和Range头）"""
+    from flask import Response
+    
+    forward = {name: request.headers[name] for name in ('If-None-Match', 'If-Modified-Since', 'Range')
+               if name in request.headers}
+    response = None
+    for relative_path in candidates:
+        file_url = f"{convert_svc_url}/files/{relative_path}"
+        response = convert_client.get(file_url, stream=True, headers=forward)
+        if response.status_code in (200, 206, 304):
+            headers = {name: value for name, value in response.headers.items()
+                       if name.lower() not in ('connection', 'transfer-encoding', 'content-encoding')}
+            return Response(
+                response.iter_content(chunk_size=64 * 1024),
+                status=response.status_code,
+                headers=headers,
+                direct_passthrough=True,
+            )
+        current_app.logger.error(f"从转换服务获取文件失败: {file_url}, 状态码: {response.status_code}")
+        response.close()
+    return f"获取文件失败: {response.status_code}", response.status_code
+
 # 下载所有文件（打包为ZIP）
 @main_bp.route('/download_all')
 @login_required
 def download_all():
-    """将所有转换文件打包为ZIP下载"""
+    """将所有转换文件打包为ZIP下载
+    
+    订单的ZIP包已生成且未失效时直接发送文件（支持Range），否则流式打包并在后台生成ZIP包。
+    """
     try:
         # 获取订单ID
         order_id = request.args.get('order_id')
@@ -587,139 +691,49 @@ def download_all():
             flash('订单不存在', 'error')
             return redirect(url_for('orders.index'))
         
-        # 创建临时目录
-        import tempfile
-        temp_dir = tempfile.mkdtemp()
-        zip_filename = f'files_{order.order_number}.zip'
-        zip_path = os.path.join(temp_dir, zip_filename)
+        # 获取订单的转换文件
+        converted_files_objs = OrderService.get_order_conversions(order.id)
         
-        # 获取convert-svc服务地址
-        convert_svc_url = os.environ.get('CONVERT_SVC_URL', 'http://localhost:8081')
+        # 如果没有文件，返回错误
+        if not converted_files_objs:
+            flash('没有可下载的文件', 'error')
+            return redirect(url_for('orders.order_detail', order_number=order.order_number))
         
-        # 创建ZIP文件
-        with zipfile.ZipFile(zip_path, 'w') as zipf:
-            # 获取订单的转换文件
-            converted_files_objs = OrderService.get_order_conversions(order.id)
-            
-            # 如果没有文件，返回错误
-            if not converted_files_objs:
-                flash('没有可下载的文件', 'error')
-                return redirect(url_for('orders.order_detail', order_number=order.order_number))
-            
-            # 添加的文件计数
-            added_files_count = 0
-            
-            # 添加文件到ZIP
-            for file_obj in converted_files_objs:
-                try:
-                    # 获取公共URL路径和文件名
-                    file_url = file_obj.file_path  # 这可能是一个URL
-                    filename = file_obj.filename   # 使用数据库中存储的文件名
-                    display_name = file_obj.display_name if hasattr(file_obj, 'display_name') else filename
-                    
-                    # 获取实际存储路径（如果有）
-                    storage_path = file_obj.storage_path if hasattr(file_obj, 'storage_path') else None
-                    
-                    # 尝试从存储路径获取文件
-                    if storage_path and os.path.exists(storage_path):
-                        # 使用物理存储路径
-                        zipf.write(storage_path, display_name)
-                        current_app.logger.info(f"添加文件到ZIP (从存储路径): {storage_path} -> {display_name}")
-                        added_files_count += 1
-                        continue
-                    
-                    # 检查原始文件路径是否是本地路径
-                    if not file_url.startswith(('http://', 'https://')):
-                        if os.path.exists(file_url):
-                            # 文件存在于记录的路径中
-                            zipf.write(file_url, display_name)
-                            current_app.logger.info(f"添加文件到ZIP (本地路径): {file_url} -> {display_name}")
-                            added_files_count += 1
-                            continue
-                    
-                        # 检查常见文件位置
-                        # 仅当存储路径和直接路径都不可用时才尝试猜测路径                                      
-                        converted_folder = current_app.config.get('CONVERTED_FOLDER')
-                        
-                        # 可能的文件路径列表
-                        possible_paths = [
-                            # 订单号子目录中的文件
-                            os.path.join(converted_folder, order.order_number, filename),
-                            # 订单ID子目录中的文件
-                            os.path.join(converted_folder, f"order_{order.id}", filename),
-                            # 根目录中的文件
-                            os.path.join(converted_folder, filename)
-                        ]
-                        
-                        # 检查所有可能的路径
-                        file_found = False
-                        for path in possible_paths:
-                            if os.path.exists(path):
-                                zipf.write(path, display_name)
-                                current_app.logger.info(f"添加文件到ZIP (找到路径): {path} -> {display_name}")
-                                file_found = True
-                                added_files_count += 1
-                                break
-                        
-                        if file_found:
-                            continue
-                    
-                    # 如果无法在本地找到，尝试从URL下载
-                    try:
-                        # 构造合适的URL（如果需要）
-                        download_url = file_url
-                        if "/files/" in file_url and not file_url.startswith(('http://', 'https://')):
-                            # 构造完整URL
-                            download_url = f"{convert_svc_url}/files/{file_url}"
-                        
-                        # 从URL下载文件
-                        response = requests.get(download_url, timeout=30)
-                        if response.status_code == 200:
-                            # 保存到临时文件
-                            temp_file_path = os.path.join(temp_dir, filename)
-                            with open(temp_file_path, 'wb') as f:
-                                f.write(response.content)
-                            
-                            # 添加到ZIP
-                            zipf.write(temp_file_path, display_name)
-                            current_app.logger.info(f"添加文件到ZIP (从URL): {download_url} -> {display_name}")
-                            added_files_count += 1
-                            
-                            # 删除临时文件
-                            try:
-                                os.remove(temp_file_path)
-                            except:
-                                pass
-                        else:
-                            current_app.logger.warning(f"无法从URL获取文件: {download_url}, 状态码: {response.status_code}")
-                    except Exception as download_error:
-                        current_app.logger.error(f"从URL下载文件时出错: {str(download_error)}")
-                        
-                except Exception as file_error:
-                    current_app.logger.error(f"处理文件时出错: {str(file_error)}")
-            
-            # 如果没有成功添加任何文件
-            if added_files_count == 0:
-                flash('没有可下载的文件 (所有文件都无法访问)', 'warning')
-                # 删除临时目录和空ZIP
-                try:
-                    os.remove(zip_path)
-                    os.rmdir(temp_dir)
-                except:
-                    pass
-                return redirect(url_for('orders.order_detail', order_number=order.order_number))
-        
-        # 发送文件
-        @after_this_request
-        def cleanup(response):
-            try:
-                os.remove(zip_path)
-                os.rmdir(temp_dir)
-            except Exception as e:
-                current_app.logger.error(f"清理临时文件时出错: {str(e)}")
-            return response
+        zip_filename = f'files_{order.order_number}.zip'
+        
+        # 已生成的ZIP包：交给send_file发送（sendfile + 条件请求/Range）
+        bundle_path = BundleService.cached_bundle(order.id, converted_files_objs)
+        if bundle_path:
+            current_app.logger.info(f"使用已生成的订单ZIP包: {bundle_path}")
+            return send_file(
+                bundle_path,
+                mimetype='application/zip',
+                as_attachment=True,
+                download_name=zip_filename,
+                conditional=True,
+            )
         
-        return send_from_directory(temp_dir, zip_filename, as_attachment=True)
+        # ZIP包尚未生成或已失效：本次流式打包，同时在后台生成供后续下载使用
+        BundleService.schedule_build(order.id)
+        
+        from flask import Response, stream_with_context
+        
+        logger = current_app.logger
+        chunks = BundleService.stream(
+            order, converted_files_objs,
+            on_added=lambda entry, origin: logger.info(f"添加文件到ZIP: {origin} -> {entry['arcname']}"),
+            on_error=lambda entry, error: logger.error(f"添加文件到ZIP失败: {entry['arcname']}, 错误: {str(error)}"),
+        )
+        
+        # 流式响应：ZIP条目边生成边发送，不在磁盘上生成完整ZIP
+        return Response(
+            stream_with_context(chunks),
+            mimetype='application/zip',
+            headers={
+                'Content-Disposition': f"attachment; filename*=UTF-8''{urllib.parse.quote(zip_filename)}",
+                'X-Accel-Buffering': 'no',
+            }
+        )
     
     except Exception as e:
         current_app.logger.error(f"下载文件时出错: {str(e)}")
@@ -754,7 +768,7 @@ def download_file_by_name(filename):
         if file_path.startswith('http'):
             # 从转换服务下载文件并提供给用户
             try:
-                response = requests.get(file_path, stream=True, timeout=30)
+                response = convert_client.get(file_path, stream=True)
                 if response.status_code == 200:
                     from flask import Response
                     
@@ -906,177 +920,7 @@ def categorize_files():
         
         current_app.logger.info(f"接收到分类请求: {json.dumps(files_data, ensure_ascii=False)}")
         
-        results = []
-        
-        # 获取convert-svc服务地址
-        convert_svc_url = os.environ.get('CONVERT_SVC_URL', 'http://localhost:8081')
-        
-        # 为每个文件处理分类和重命名
-        for file_item in files_data:
-            # 支持两种格式：新的file_uuid和旧的file_id
-            file_uuid = file_item.get('file_uuid') or file_item.get('file_id')
-            category = file_item.get('category')
-            display_name = file_item.get('display_name')
-            
-            if not file_uuid or not category:
-                results.append({
-                    "file_uuid": file_uuid,
-                    "success": False,
-                    "message": "缺少文件UUID或分类信息"
-                })
-                continue
-                
-            current_app.logger.info(f"处理文件分类: UUID={file_uuid}, 分类={category}")
-            
-            # 首先尝试通过UUID查询文件记录
-            file_record = FileRepository.get_converted_file_by_id(file_uuid) \
-                if file_uuid.isdigit() else None
-                
-            # 如果找不到，尝试通过文件名查询（兼容旧接口）
-            if not file_record:
-                file_record = FileRepository.get_converted_file_by_filename(file_uuid)
-                
-            if not file_record:
-                current_app.logger.error(f"文件记录不存在: {file_uuid}")
-                results.append({
-                    "file_uuid": file_uuid,
-                    "success": False,
-                    "message": "文件记录不存在"
-                })
-                continue
-            
-            # 获取订单号
-            order = OrderService.get_order(file_record.order_id)
-            order_number = order.order_number if order else None
-            
-            # 检查文件是否存在
-            # 改为使用数据库中记录的路径，而不是根据文件名猜测
-            original_path = file_record.file_path
-            storage_path = file_record.storage_path if hasattr(file_record, 'storage_path') else None
-            
-            # 获取当前分类下的序号
-            category_files = FileRepository.get_converted_files_by_order(file_record.order_id)
-            # 根据文件名前缀来判断分类
-            category_count = sum(1 for f in category_files if f.filename.startswith(f"{category}_"))
-            
-            # 保留原始文件扩展名
-            file_ext = os.path.splitext(file_record.filename)[1]
-            
-            # 获取订单号的短标识（取最后8位或更少）
-            order_suffix = ""
-            if order_number and len(order_number) > 8:
-                order_suffix = order_number[-8:]  # 取订单号的最后8位作为后缀
-            elif order_number:
-                order_suffix = order_number  # 如果订单号小于8位，使用完整订单号
-            
-            # 生成新的显示文件名，加入订单号后缀
-            new_display_name = f"{category}_{category_count + 1}_{order_suffix}{file_ext}"
-            
-            current_app.logger.info(f"生成新文件名: {new_display_name}, 分类计数: {category_count}, 订单后缀: {order_suffix}")
-            
-            # 确保使用正确的路径格式
-            if "/files/" in original_path:
-                # 提取文件名
-                filename_only = os.path.basename(urllib.parse.unquote(original_path))
-                # 使用订单号构建正确的路径
-                original_path = f"{order_number}/{filename_only}"
-            
-            current_app.logger.info(f"原始文件路径: {original_path}, 订单号: {order_number}")
-            
-            # 调用转换服务API进行文件重命名
-            rename_response = requests.post(
-                f"{convert_svc_url}/api/rename",
-                json={
-                    "original_path": original_path,
-                    "new_name": new_display_name,
-                    "order_id": order_number  # 使用订单号而不是订单ID
-                }
-            )
-            
-            current_app.logger.info(f"重命名API响应状态码: {rename_response.status_code}")
-            current_app.logger.info(f"重命名API响应内容: {rename_response.text}")
-            
-            if rename_response.status_code != 200:
-                results.append({
-                    "file_uuid": file_uuid,
-                    "success": False,
-                    "message": f"调用重命名服务失败: {rename_response.text}"
-                })
-                continue
-            
-            rename_data = rename_response.json()
-            if not rename_data.get('success'):
-                results.append({
-                    "file_uuid": file_uuid,
-                    "success": False,
-                    "message": f"重命名失败: {rename_data.get('message')}"
-                })
-                continue
-            
-            # 更新数据库记录
-            try:
-                # 保存旧路径用于通知归档服务
-                old_path = file_record.file_path
-                old_name = file_record.filename
-                
-                # 新的公共URL路径
-                new_public_url = rename_data.get('new_url')
-                
-                # 更新数据库记录
-                update_data = {
-                    'filename': new_display_name,  # 更新显示名称
-                    'file_path': new_public_url,   # 更新公共URL
-                    'category': category           # 添加分类信息
-                }
-                
-                # 如果有storage_path字段，同时更新物理存储路径
-                if hasattr(file_record, 'storage_path') and rename_data.get('new_path'):
-                    update_data['storage_path'] = rename_data.get('new_path')
-                
-                # 更新记录，保留原始ID不变
-                FileRepository.update_converted_file(
-                    file_record.id,
-                    **update_data
-                )
-                
-                # 记录操作日志
-                current_app.logger.info(f"已将文件 {old_name} (ID: {file_record.id}) 分类为 '{category}'，新路径: {new_public_url}")
-                
-                # 异步通知archive-svc更新归档
-                try:
-                    archive_svc_url = os.environ.get('ARCHIVE_SVC_URL')
-                    if archive_svc_url:
-                        # 获取当前应用实例
-                        app = current_app._get_current_object()
-                        
-                        # 使用线程异步通知，不阻塞主流程，同时传递应用上下文
-                        thread = threading.Thread(
-                            target=notify_archive_service,
-                            args=(app, archive_svc_url, file_record.id, file_record.order_id, old_path, new_public_url)
-                        )
-                        thread.daemon = True  # 设置为守护线程，主程序退出时自动结束
-                        thread.start()
-                except Exception as e:
-                    current_app.logger.error(f"启动通知归档服务线程失败: {str(e)}")
-                
-                results.append({
-                    "file_uuid": str(file_record.id),  # 始终返回数据库ID作为唯一标识
-                    "old_id": file_uuid,               # 返回原始传入的ID用于前端匹配
-                    "success": True,
-                    "message": "文件分类成功",
-                    "new_url": new_public_url,
-                    "category": category,
-                    "display_name": new_display_name
-                })
-            except Exception as db_error:
-                # 使用SQLAlchemy的会话回滚
-                db.session.rollback()
-                current_app.logger.error(f"更新数据库失败: {str(db_error)}")
-                results.append({
-                    "file_uuid": file_uuid,
-                    "success": False,
-                    "message": f"更新数据库失败: {str(db_error)}"
-                })
+        results = FileService.categorize_converted_files(files_data)
         
         # 判断整体操作是否成功
         all_success = all(result.get('success', False) for result in results)
@@ -1090,42 +934,3 @@ def categorize_files():
     except Exception as e:
         current_app.logger.error(f"文件分类错误: {str(e)}")
         return jsonify({"success": False, "message": f"服务器处理错误: {str(e)}"}), 500
-
-# 辅助函数：异步通知归档服务
-def notify_archive_service(app, archive_url, file_id, order_id, old_url, new_url):
-    """异步通知归档服务文件重命名事件
-    
-    Args:
-        app: Flask应用实例，用于创建应用上下文
-        archive_url: 归档服务的URL
-        file_id: 文件ID
-        order_id: 订单ID
-        old_url: 旧的文件URL
-        new_url: 新的文件URL
-    """
-    # 在线程中创建应用上下文
-    with app.app_context():
-        try:
-            app.logger.info(f"开始通知归档服务，文件ID: {file_id}")
-            
-            response = requests.post(
-                f"{archive_url}/update",
-                json={
-                    "file_id": file_id,
-                    "order_id": order_id,
-                    "old_url": old_url,
-                    "new_url": new_url,
-                    "operation": "rename"
-                },
-                timeout=10  # 设置超时以避免永久阻塞
-            )
-            
-            if response.status_code == 200:
-                app.logger.info(f"通知归档服务成功，文件ID: {file_id}")
-            else:
-                app.logger.error(f"归档服务返回错误: {response.status_code} - {response.text}")
-        
-        except requests.RequestException as e:
-            app.logger.error(f"通知归档服务网络错误: {str(e)}")
-        except Exception as e:
-            app.logger.error(f"通知归档服务异常: {str(e)}")
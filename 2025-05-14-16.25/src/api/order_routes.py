@@ -25,9 +25,23 @@ def index():
 @orders_bp.route('/list')
 @login_required
 def order_list():
-    """订单列表"""
-    orders = OrderService.get_all_orders()
-    return render_template('orders/index.html', orders=orders)
+    """订单列表（按创建时间倒序分页，支持状态/创建人/备注筛选）"""
+    return render_template('orders/index.html', **order_list_context())
+
+def order_list_context():
+    """根据查询参数获取订单列表页的模板变量"""
+    filters = {key: request.args.get(key) for key in ('status', 'creator', 'note_search') if request.args.get(key)}
+    page = OrderService.list_orders(after=request.args.get('after'), before=request.args.get('before'), **filters)
+    
+    users = AdminService.get_all_users()
+    creator_name = next((u.username for u in users if str(u.id) == filters.get('creator')), None)
+    return {
+        'orders': page['orders'],
+        'page': page,
+        'filters': filters,
+        'users': users,
+        'creator_name': creator_name,
+    }
 
 @orders_bp.route('/batch-delete', methods=['POST'])
 @login_required
@@ -4,6 +4,7 @@ from flask import Flask, session, render_template
 from src.models import db
 from src.api import init_app as init_blueprints, csrf
 import src.settings as config
+from src.utils.db_engine import engine_options, configure_engine
 
 def create_app():
     """创建Flask应用实例
@@ -32,8 +33,10 @@ def create_app():
     # 配置日志
     configure_logging(app)
     
-    # 初始化扩展
+    # 初始化扩展（数据库引擎参数按数据库类型生成）
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
     db.init_app(app)
+    configure_database(app)
     
     # 初始化CSRF保护
     csrf.init_app(app)
@@ -56,17 +59,34 @@ def create_app():
         os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
         os.makedirs(app.config['CONVERTED_FOLDER'], exist_ok=True)
         os.makedirs(app.config['ARCHIVE_FOLDER'], exist_ok=True)
+        os.makedirs(app.config['BUNDLE_FOLDER'], exist_ok=True)
         os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'email_attachments'), exist_ok=True)
     
     # 注册错误处理
     register_error_handlers(app)
     
+    # 启动依赖服务健康监控
+    register_health_monitor(app)
+    
+    # 记录每个worker进程的请求统计
+    register_request_metrics(app)
+    
     # 打印Secret Key的前8个字符（用于调试）
     app.logger.info(f"Secret Key: {app.config['SECRET_KEY'][:8]}...")
     app.logger.info(f"运行环境: {config.ENV}")
     
     return app
 
+def configure_database(app):
+    """配置数据库引擎（SQLite文件库每个连接执行PRAGMA），需在首次连接前调用
+    
+    Args:
+        app: Flask应用实例
+    """
+    with app.app_context():
+        description = configure_engine(db.engine, app.config)
+    app.logger.info(f"数据库引擎: {description}")
+
 def register_template_globals(app):
     """注册Jinja2模板全局函数
     
@@ -134,6 +154,60 @@ def configure_logging(app):
     else:
         app.logger.addHandler(file_handler)
 
+def register_health_monitor(app):
+    """注册依赖服务的健康探测并启动后台监控线程
+    
+    Args:
+        app: Flask应用实例
+    """
+    import requests
+    from src.utils.health_monitor import health_monitor
+    from src.utils.convert_client import convert_client, SERVICE_NAME as CONVERT_SERVICE
+    from src.services.file_service import ARCHIVE_SERVICE
+    
+    archive_health_url = f"{app.config['ARCHIVE_SVC_URL'].split('/archive')[0]}/health"
+    probe_timeout = app.config['HEALTH_PROBE_TIMEOUT']
+    
+    def probe_archive():
+        return requests.get(archive_health_url, timeout=probe_timeout).status_code == 200
+    
+    health_monitor.register(CONVERT_SERVICE, convert_client.health_check)
+    health_monitor.register(ARCHIVE_SERVICE, probe_archive)
+    
+    if app.config['HEALTH_MONITOR_ENABLED'] and not app.config['TESTING']:
+        health_monitor.start()
+    else:
+        app.logger.info("健康监控后台线程未启动，将按需探测")
+
+def register_request_metrics(app):
+    """注册请求统计钩子（按进程累计，多worker部署时由 /admin/workers 汇总）
+    
+    Args:
+        app: Flask应用实例
+    """
+    import time
+    from flask import g
+    from src.utils.request_metrics import request_metrics
+    
+    @app.before_request
+    def _metrics_request_started():
+        g.metrics_started = time.perf_counter()
+        request_metrics.request_started()
+    
+    @app.after_request
+    def _metrics_request_finished(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            request_metrics.request_finished(response.status_code, time.perf_counter() - started)
+        return response
+    
+    @app.teardown_request
+    def _metrics_request_failed(exc):
+        # 未经过after_request（请求处理中断）的请求按500计入
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            request_metrics.request_finished(500, time.perf_counter() - started)
+
 def register_error_handlers(app):
     """注册错误处理函数
     
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""仓储层查询计划审计
+
+在一次性的SQLite数据库中生成合成数据（默认100万条转换记录及相应比例的订单、
+上传文件和邮件），对每个仓储查询执行 EXPLAIN QUERY PLAN，报告全表扫描和临时排序。
+存在未预期的全表扫描时以状态码1退出。
+
+用法:
+    python -m src.db_audit                     # 100万条转换记录
+    python -m src.db_audit --rows 100000
+    python -m src.db_audit --baseline          # 不创建模型中声明的索引，查看迁移前的计划
+    python -m src.db_audit --keep /tmp/audit.db
+"""
+
+import os
+import sys
+import shutil
+import sqlite3
+import hashlib
+import argparse
+import datetime
+import tempfile
+
+# 插入合成数据时每批的行数
+POPULATE_CHUNK_SIZE = 50000
+
+# 合成数据的起始时间
+_EPOCH = datetime.datetime(2025, 1, 1)
+
+
+def _ts(seconds):
+    return (_EPOCH + datetime.timedelta(seconds=seconds)).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def _sha(value):
+    return hashlib.sha256(str(value).encode('utf-8')).hexdigest()
+
+
+def _insert(conn, table, columns, rows):
+    """分批插入合成数据"""
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= POPULATE_CHUNK_SIZE:
+            conn.executemany(sql, batch)
+            batch = []
+    if batch:
+        conn.executemany(sql, batch)
+
+
+def populate(db_path, rows):
+    """生成合成数据
+
+    比例：每个订单约10个上传文件，每个上传文件约5页转换结果。
+
+    Args:
+        db_path: SQLite数据库文件路径（表已创建）
+        rows: 转换记录数
+
+    Returns:
+        各表行数字典
+    """
+    counts = {
+        'admin_user': 20,
+        'orders': max(rows // 50, 1),
+        'uploaded_files': max(rows // 5, 1),
+        'converted_files': rows,
+        'emails': max(rows // 50, 1),
+        'email_attachments': max(rows // 50, 1),
+    }
+    users, orders, uploads, emails = (counts['admin_user'], counts['orders'],
+                                      counts['uploaded_files'], counts['emails'])
+    statuses = ('pending', 'material', 'reviewed', 'archived')
+
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=OFF')
+    conn.execute('PRAGMA synchronous=OFF')
+
+    _insert(conn, 'admin_user', ('id', 'username', 'password_hash', 'is_admin', 'created_at', 'is_active'), (
+        (i, f"user{i}", 'x', i == 1, _ts(i), 1) for i in range(1, users + 1)
+    ))
+    _insert(conn, 'orders', ('id', 'order_number', 'created_at', 'updated_at', 'is_active', 'status',
+                             'note', 'is_merged', 'user_id', 'email_id'), (
+        (i, f"20250101-{i:08x}", _ts(i * 60), _ts(i * 60), i % 97 == 0, statuses[i % len(statuses)],
+         f"备注 {i}" if i % 3 == 0 else None, 0, i % users + 1, (i % emails + 1) if i % 5 == 0 else None)
+        for i in range(1, orders + 1)
+    ))
+    _insert(conn, 'uploaded_files', ('id', 'filename', 'original_filename', 'file_path', 'file_size',
+                                     'file_type', 'file_hash', 'upload_time', 'order_id'), (
+        (i, f"file_{i}.pdf", f"file_{i}.pdf", f"/data/uploads/file_{i}.pdf", 1024, 'pdf', _sha(i),
+         _ts(i * 12), i % orders + 1)
+        for i in range(1, uploads + 1)
+    ))
+    _insert(conn, 'converted_files', ('id', 'filename', 'file_path', 'source_file_id', 'source_hash',
+                                      'from_zip', 'conversion_time', 'order_id'), (
+        (i, f"file_{i % uploads + 1}_p{i}.png", f"http://localhost:8081/files/file_{i % uploads + 1}_p{i}.png",
+         i % uploads + 1, _sha(i % uploads + 1)[:6], 0, _ts(i * 2), (i % uploads + 1) % orders + 1)
+        for i in range(1, rows + 1)
+    ))
+    _insert(conn, 'emails', ('id', 'uid', 'subject', 'sender', 'received_at', 'processed', 'assigned_to'), (
+        (i, str(i), f"订单资料 {i}", f"sender{i % 500}@example.com", _ts(i * 600), i % 10 != 0, i % users + 1)
+        for i in range(1, emails + 1)
+    ))
+    _insert(conn, 'email_attachments', ('id', 'filename', 'saved_as', 'file_path', 'email_id'), (
+        (i, f"att_{i}.pdf", f"att_{i}.pdf", f"/data/mail/att_{i}.pdf", i % emails + 1)
+        for i in range(1, counts['email_attachments'] + 1)
+    ))
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+    return counts
+
+
+def repository_queries(counts):
+    """需要审计的仓储查询
+
+    Returns:
+        (名称, 调用函数, 允许的全表扫描 {表名: 原因}) 列表
+    """
+    from src.models.models import Order
+    from src.repositories.admin_repo import AdminRepository
+    from src.repositories.file_repo import FileRepository
+    from src.repositories.mail_repo import MailRepository
+    from src.repositories.order_repo import OrderRepository
+
+    order_id = counts['orders'] // 2
+    upload_id = counts['uploaded_files'] // 2
+    converted_id = counts['converted_files'] // 2
+    email_id = counts['emails'] // 2
+    user_id = 2
+    cursor = (_EPOCH + datetime.timedelta(seconds=order_id * 60), order_id)
+    full_list = {'orders': '返回全部订单，调用方需改用list_orders分页'}
+
+    return [
+        ('OrderRepository.get_by_id', lambda: OrderRepository.get_by_id(order_id), {}),
+        ('OrderRepository.get_context', lambda: OrderRepository.get_context(order_id), {}),
+        ('OrderRepository.get_by_order_number',
+         lambda: OrderRepository.get_by_order_number(f"20250101-{order_id:08x}"), {}),
+        ('OrderRepository.get_all_orders', OrderRepository.get_all_orders, full_list),
+        ('OrderRepository.list_orders', lambda: OrderRepository.list_orders(50), {}),
+        ('OrderRepository.list_orders(after)', lambda: OrderRepository.list_orders(50, after=cursor), {}),
+        ('OrderRepository.list_orders(before)', lambda: OrderRepository.list_orders(50, before=cursor), {}),
+        ('OrderRepository.list_orders(status)',
+         lambda: OrderRepository.list_orders(50, after=cursor, status='pending'), {}),
+        ('OrderRepository.list_orders(user_id)', lambda: OrderRepository.list_orders(50, user_id=user_id), {}),
+        ('OrderRepository.list_orders(note_search)', lambda: OrderRepository.list_orders(50, note_search='备注'), {}),
+        ('OrderRepository.attach_counts',
+         lambda: OrderRepository.attach_counts([Order(id=i) for i in range(order_id, order_id + 50)]), {}),
+        ('OrderRepository.get_active_order', lambda: OrderRepository.get_active_order(user_id), {}),
+        ('OrderRepository.set_active', lambda: OrderRepository.set_active(order_id, user_id), {}),
+        ('OrderRepository.update_order', lambda: OrderRepository.update_order(order_id, note='x'), {}),
+        ('OrderRepository.delete_order', lambda: OrderRepository.delete_order(order_id), {}),
+        ('FileRepository.get_uploaded_file', lambda: FileRepository.get_uploaded_file(upload_id), {}),
+        ('FileRepository.get_uploaded_file_by_filename',
+         lambda: FileRepository.get_uploaded_file_by_filename(f"file_{upload_id}.pdf"), {}),
+        ('FileRepository.get_uploaded_files_by_order', lambda: FileRepository.get_uploaded_files_by_order(order_id), {}),
+        ('FileRepository.get_converted_file', lambda: FileRepository.get_converted_file(converted_id), {}),
+        ('FileRepository.get_converted_file_by_filename',
+         lambda: FileRepository.get_converted_file_by_filename(f"file_{upload_id}_p{converted_id}.png"), {}),
+        ('FileRepository.get_converted_files_by_order',
+         lambda: FileRepository.get_converted_files_by_order(order_id), {}),
+        ('FileRepository.get_converted_files_by_source',
+         lambda: FileRepository.get_converted_files_by_source(upload_id), {}),
+        ('FileRepository.get_converted_files_by_hash',
+         lambda: FileRepository.get_converted_files_by_hash(_sha(upload_id)[:6]), {}),
+        ('FileRepository.delete_converted_files_by_order',
+         lambda: FileRepository.delete_converted_files_by_order(order_id), {}),
+        ('FileRepository.delete_uploaded_files_by_order',
+         lambda: FileRepository.delete_uploaded_files_by_order(order_id), {}),
+        ('MailRepository.get_email', lambda: MailRepository.get_email(email_id), {}),
+        ('MailRepository.get_email_by_uid', lambda: MailRepository.get_email_by_uid(str(email_id), f"订单资料 {email_id}"), {}),
+        ('MailRepository.get_unprocessed_emails', MailRepository.get_unprocessed_emails, {}),
+        ('MailRepository.get_emails_by_sender', lambda: MailRepository.get_emails_by_sender('sender1@example.com'), {}),
+        ('MailRepository.get_emails_by_user', lambda: MailRepository.get_emails_by_user(user_id), {}),
+        ('MailRepository.get_attachments_by_email', lambda: MailRepository.get_attachments_by_email(email_id), {}),
+        ('AdminRepository.get_by_id', lambda: AdminRepository.get_by_id(user_id), {}),
+        ('AdminRepository.get_by_username', lambda: AdminRepository.get_by_username('user2'), {}),
+        ('AdminRepository.get_all_users', AdminRepository.get_all_users, {'admin_user': '用户表很小，全量读取'}),
+    ]
+
+
+def audit(counts):
+    """对每个仓储查询执行EXPLAIN QUERY PLAN（需要在应用上下文中调用）
+
+    查询照常执行（更新和删除会修改合成数据库），方法中的每条语句都会被捕获。
+
+    Returns:
+        未预期的全表扫描数
+    """
+    from src.models import db
+    from src.utils.db_diagnostics import capture_query_plans
+
+    unexpected = 0
+    for name, call, allowed in repository_queries(counts):
+        with capture_query_plans(db.engine) as plans:
+            try:
+                call()
+            except Exception as e:
+                db.session.rollback()
+                print(f"  ! {name}: {type(e).__name__}: {str(e).splitlines()[0]}")
+
+        if not plans:
+            print(f"[--]   {name}: 未执行SQL")
+            continue
+
+        for plan in plans:
+            scans = plan.table_scans()
+            flagged = [table for table in scans if table not in allowed]
+            unexpected += len(flagged)
+            status = 'SCAN' if flagged else ('ok*' if scans else 'ok')
+            print(f"[{status:<4}] {name}")
+            for detail in plan.details:
+                print(f"         {detail}")
+            for table in scans:
+                if table in allowed:
+                    print(f"         (允许扫描 {table}: {allowed[table]})")
+    return unexpected
+
+
+def main():
+    parser = argparse.ArgumentParser(description='仓储层查询计划审计')
+    parser.add_argument('--rows', type=int, default=1000000, help='合成的转换记录数（其他表按比例生成）')
+    parser.add_argument('--baseline', action='store_true', help='不创建模型中声明的索引（迁移前的状态）')
+    parser.add_argument('--keep', help='保留合成数据库到指定路径')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='db_audit_')
+    db_path = os.path.join(work_dir, 'audit.db')
+    os.environ.update({
+        'FLASK_ENV': 'testing',
+        'TEST_DATABASE_URL': f"sqlite:///{db_path}",
+        'HEALTH_MONITOR_ENABLED': 'false',
+        'JOB_WORKERS': '0',
+    })
+
+    from src.app import create_app
+    from src.models import db
+
+    try:
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+            if args.baseline:
+                with db.engine.begin() as conn:
+                    for table in db.metadata.sorted_tables:
+                        for index in table.indexes:
+                            conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index.name}")
+            db.engine.dispose()
+
+            print(f"生成合成数据: {args.rows} 条转换记录 ...")
+            counts = populate(db_path, args.rows)
+            print('  ' + ', '.join(f"{table}={count}" for table, count in counts.items()))
+            print()
+
+            unexpected = audit(counts)
+            db.session.remove()
+            db.engine.dispose()
+
+        print()
+        if unexpected:
+            print(f"发现 {unexpected} 处未预期的全表扫描")
+        else:
+            print("未发现未预期的全表扫描")
+
+        if args.keep:
+            shutil.copyfile(db_path, args.keep)
+            print(f"合成数据库已保存到: {args.keep}")
+        return 1 if unexpected else 0
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,4 +3,36 @@ from flask_sqlalchemy import SQLAlchemy
 # 创建数据库实例
 db = SQLAlchemy()
 
-from src.models.models import AdminUser, UploadedFile, ConvertedFile, Order
+from src.models.models import AdminUser, UploadedFile, ConvertedFile, Order, ArchiveOutbox
+
+
+def ensure_indexes(engine=None):
+    """为已存在的表补建模型中声明的索引（db.create_all只会为新建的表创建索引）
+    
+    Args:
+        engine: SQLAlchemy引擎，为None时使用db.engine（需要在应用上下文中调用）
+        
+    Returns:
+        新创建的索引名列表
+    """
+    from sqlalchemy import inspect
+    
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    
+    created = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            if index.name not in existing:
+                index.create(bind=engine)
+                created.append(index.name)
+    
+    if created:
+        # 更新查询规划器使用的统计信息
+        with engine.begin() as conn:
+            conn.exec_driver_sql('ANALYZE')
+    return created
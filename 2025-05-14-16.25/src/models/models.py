@@ -1,4 +1,5 @@
 import os
+import json
 import uuid
 import datetime
 import bcrypt
@@ -7,6 +8,14 @@ from src.models import db
 class Order(db.Model):
     """订单模型，用于管理文件上传和转换记录"""
     __tablename__ = 'orders'  # 显式指定表名，避免使用SQL保留字'order'
+    __table_args__ = (
+        # 订单列表按 (created_at, id) 键集分页，可按状态筛选
+        db.Index('ix_orders_created_at_id', 'created_at', 'id'),
+        db.Index('ix_orders_status_created_at_id', 'status', 'created_at', 'id'),
+        db.Index('ix_orders_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+        # 查询用户的活跃订单
+        db.Index('ix_orders_user_id_is_active', 'user_id', 'is_active'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     order_number = db.Column(db.String(32), unique=True, nullable=False)
@@ -33,12 +42,26 @@ class Order(db.Model):
     user = db.relationship('AdminUser', backref='orders')
     
     # 邮件关联
-    email_id = db.Column(db.Integer, db.ForeignKey('emails.id'), nullable=True)
+    email_id = db.Column(db.Integer, db.ForeignKey('emails.id'), nullable=True, index=True)
     
     # 关系
     files = db.relationship('UploadedFile', backref='order', lazy=True, cascade="all, delete-orphan")
     conversions = db.relationship('ConvertedFile', backref='order', lazy=True, cascade="all, delete-orphan")
     
+    # 列表查询时由分组聚合预先填充的文件数（非数据库字段），为None时按关系计数
+    _file_count = None
+    _conversion_count = None
+    
+    @property
+    def file_count(self):
+        """上传文件数"""
+        return self._file_count if self._file_count is not None else len(self.files)
+    
+    @property
+    def conversion_count(self):
+        """转换文件数"""
+        return self._conversion_count if self._conversion_count is not None else len(self.conversions)
+    
     @classmethod
     def generate_order_number(cls):
         """生成唯一的订单号: 日期前缀 + UUID"""
@@ -56,8 +79,8 @@ class Order(db.Model):
             'is_active': self.is_active,
             'status': self.status,
             'note': self.note,
-            'file_count': len(self.files),
-            'conversion_count': len(self.conversions),
+            'file_count': self.file_count,
+            'conversion_count': self.conversion_count,
             'user_id': self.user_id,
             'username': self.user.username if self.user else None,
             'is_merged': self.is_merged,
@@ -89,14 +112,14 @@ class UploadedFile(db.Model):
     __tablename__ = 'uploaded_files'  # 显式指定表名
     
     id = db.Column(db.Integer, primary_key=True)
-    filename = db.Column(db.String(255), nullable=False)  # 存储的文件名
+    filename = db.Column(db.String(255), nullable=False, index=True)  # 存储的文件名
     original_filename = db.Column(db.String(255), nullable=False)  # 原始文件名
     file_path = db.Column(db.String(255), nullable=False)  # 文件路径
     file_size = db.Column(db.Integer, nullable=True)  # 文件大小
     file_type = db.Column(db.String(50), nullable=True)  # 文件类型
-    file_hash = db.Column(db.String(64), nullable=True)  # 文件哈希值，用于唯一标识文件内容
+    file_hash = db.Column(db.String(64), nullable=True, index=True)  # 文件哈希值，用于唯一标识文件内容
     upload_time = db.Column(db.DateTime, default=datetime.datetime.utcnow)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)  # 修改为新表名
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)  # 修改为新表名
     
     # 定义与转换文件的关系
     conversions = db.relationship('ConvertedFile', backref='source_file', lazy=True, 
@@ -121,14 +144,14 @@ class ConvertedFile(db.Model):
     __tablename__ = 'converted_files'  # 显式指定表名
     
     id = db.Column(db.Integer, primary_key=True)
-    filename = db.Column(db.String(255), nullable=False)
+    filename = db.Column(db.String(255), nullable=False, index=True)
     file_path = db.Column(db.String(255), nullable=False)
-    source_file_id = db.Column(db.Integer, db.ForeignKey('uploaded_files.id'), nullable=True)  # 修改为新表名
-    source_hash = db.Column(db.String(64), nullable=True)  # 源文件的哈希值，用于间接映射
+    source_file_id = db.Column(db.Integer, db.ForeignKey('uploaded_files.id'), nullable=True, index=True)  # 修改为新表名
+    source_hash = db.Column(db.String(64), nullable=True, index=True)  # 源文件的哈希值，用于间接映射
     from_zip = db.Column(db.Boolean, default=False)  # 是否来自压缩包
     zip_path = db.Column(db.String(255), nullable=True)  # 所属压缩包路径
     conversion_time = db.Column(db.DateTime, default=datetime.datetime.utcnow)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)  # 修改为新表名
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)  # 修改为新表名
     
     def to_dict(self):
         """将转换文件转换为字典"""
@@ -207,16 +230,18 @@ class Email(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     uid = db.Column(db.String(100), nullable=False)  # 邮件UID，用于标识邮件
     subject = db.Column(db.String(255), nullable=False)  # 邮件主题
-    sender = db.Column(db.String(100), nullable=False)   # 发件人邮箱
+    sender = db.Column(db.String(100), nullable=False, index=True)   # 发件人邮箱
     sender_name = db.Column(db.String(100), nullable=True)  # 发件人名称
     received_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)  # 接收时间
     content = db.Column(db.Text, nullable=True)         # 邮件内容
     processed = db.Column(db.Boolean, default=False)    # 是否已处理
-    assigned_to = db.Column(db.Integer, db.ForeignKey('admin_user.id'), nullable=True)  # 分配给谁
+    assigned_to = db.Column(db.Integer, db.ForeignKey('admin_user.id'), nullable=True, index=True)  # 分配给谁
     
     # 使用uid和subject的组合作为唯一约束，确保不会重复处理相同的邮件
     __table_args__ = (
         db.UniqueConstraint('uid', 'subject', name='_uid_subject_uc'),
+        # 未处理邮件列表
+        db.Index('ix_emails_processed_received_at', 'processed', 'received_at'),
     )
     
     # 关系
@@ -250,7 +275,7 @@ class EmailAttachment(db.Model):
     file_size = db.Column(db.Integer, nullable=True)      # 附件大小
     file_type = db.Column(db.String(50), nullable=True)   # 附件类型
     file_hash = db.Column(db.String(64), nullable=True)   # 附件哈希值
-    email_id = db.Column(db.Integer, db.ForeignKey('emails.id'), nullable=False)  # 所属邮件ID
+    email_id = db.Column(db.Integer, db.ForeignKey('emails.id'), nullable=False, index=True)  # 所属邮件ID
     
     def to_dict(self):
         """将附件转换为字典"""
@@ -262,4 +287,36 @@ class EmailAttachment(db.Model):
             'file_size': self.file_size,
             'file_type': self.file_type,
             'email_id': self.email_id
-        } 
\ No newline at end of file
+        } 
+
+
+class ArchiveOutbox(db.Model):
+    """归档服务事件发件箱
+
+    事件与触发它的业务数据在同一事务中写入，由dispatcher批量投递给归档服务，
+    投递成功后删除；失败时按指数退避重试，直到投递成功（至少一次）。
+    """
+    __tablename__ = 'archive_outbox'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.String(32), nullable=False, unique=True, default=lambda: uuid.uuid4().hex)  # 归档服务据此去重
+    event_type = db.Column(db.String(32), nullable=False)  # 事件类型，如rename
+    payload = db.Column(db.Text, nullable=False)  # JSON格式的事件内容
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)  # 已失败的投递次数
+    next_attempt_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)  # 下次可投递的时间
+    last_error = db.Column(db.Text, nullable=True)
+    
+    __table_args__ = (
+        # dispatcher按到期时间领取事件
+        db.Index('ix_archive_outbox_next_attempt_at_id', 'next_attempt_at', 'id'),
+    )
+    
+    def to_event(self):
+        """转换为投递给归档服务的事件字典"""
+        return {
+            'event_id': self.event_id,
+            'event_type': self.event_type,
+            'occurred_at': self.created_at.isoformat() + 'Z',
+            'payload': json.loads(self.payload),
+        }
@@ -2,3 +2,4 @@ from src.repositories.admin_repo import AdminRepository
 from src.repositories.order_repo import OrderRepository
 from src.repositories.file_repo import FileRepository
 from src.repositories.mail_repo import MailRepository
+from src.repositories.outbox_repo import OutboxRepository
@@ -1,6 +1,14 @@
+from sqlalchemy import insert
+
 from src.models import db
 from src.models.models import UploadedFile, ConvertedFile
 
+# 批量插入时每条INSERT语句的最大行数（每行8个参数，低于旧版SQLite的999个参数上限）
+BULK_INSERT_CHUNK_SIZE = 100
+
+# IN查询每条语句的最大参数个数
+IN_QUERY_CHUNK_SIZE = 500
+
 class FileRepository:
     """文件存储库类，处理与文件相关的数据库操作"""
     
@@ -34,6 +42,25 @@ class FileRepository:
         """获取指定订单的所有转换文件"""
         return ConvertedFile.query.filter_by(order_id=order_id).all()
     
+    @staticmethod
+    def get_converted_files_by_ids(file_ids):
+        """按ID批量获取转换文件"""
+        return FileRepository._query_in(ConvertedFile.id, file_ids)
+    
+    @staticmethod
+    def get_converted_files_by_filenames(filenames):
+        """按文件名批量获取转换文件"""
+        return FileRepository._query_in(ConvertedFile.filename, filenames)
+    
+    @staticmethod
+    def _query_in(column, values):
+        values = list(dict.fromkeys(values))
+        files = []
+        for start in range(0, len(values), IN_QUERY_CHUNK_SIZE):
+            chunk = values[start:start + IN_QUERY_CHUNK_SIZE]
+            files.extend(ConvertedFile.query.filter(column.in_(chunk)).all())
+        return files
+    
     @staticmethod
     def get_converted_files_by_source(source_file_id):
         """获取指定源文件的所有转换文件"""
@@ -78,6 +105,36 @@ class FileRepository:
         db.session.commit()
         return converted_file
     
+    @staticmethod
+    def create_converted_files(rows):
+        """批量创建转换文件记录
+        
+        以多行 INSERT ... RETURNING id 语句插入（超过BULK_INSERT_CHUNK_SIZE行时分多条语句），
+        所有行在同一个事务中提交，不构造ORM对象。
+        
+        Args:
+            rows: 字段字典列表，字段同create_converted_file
+            
+        Returns:
+            新记录ID列表，顺序与rows一致
+        """
+        if not rows:
+            return []
+        ids = []
+        try:
+            for start in range(0, len(rows), BULK_INSERT_CHUNK_SIZE):
+                chunk = rows[start:start + BULK_INSERT_CHUNK_SIZE]
+                result = db.session.execute(
+                    insert(ConvertedFile).values(chunk).returning(ConvertedFile.id)
+                )
+                # 同一条语句插入的行按顺序分配自增ID，RETURNING本身不保证顺序
+                ids.extend(sorted(result.scalars().all()))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return ids
+    
     @staticmethod
     def delete_uploaded_file(file_id):
         """删除上传文件记录"""
@@ -134,4 +191,28 @@ class FileRepository:
                 if hasattr(file, key):
                     setattr(file, key, value)
             db.session.commit()
-        return file 
\ No newline at end of file
+        return file
+    
+    @staticmethod
+    def update_converted_files(updates):
+        """批量更新转换文件信息，所有更新在同一个事务中提交
+        
+        Args:
+            updates: {文件ID: {字段: 值}}
+            
+        Returns:
+            更新后的转换文件列表
+        """
+        if not updates:
+            return []
+        try:
+            files = FileRepository.get_converted_files_by_ids(updates.keys())
+            for file in files:
+                for key, value in updates[file.id].items():
+                    if hasattr(file, key):
+                        setattr(file, key, value)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return files 
\ No newline at end of file
@@ -1,6 +1,25 @@
+from collections import namedtuple
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import joinedload
+
 from src.models import db
-from src.models.models import Order
-from flask import session
+from src.models.models import Order, UploadedFile, ConvertedFile
+from flask import session, g, has_app_context
+
+# 订单的只读快照：转换流程只需要订单ID和订单号，解析一次后沿调用链传递。
+# 与ORM对象不同，提交事务后不会过期，读取字段不会触发重新查询。
+OrderContext = namedtuple('OrderContext', ['id', 'order_number'])
+
+
+def _context_cache():
+    """当前应用上下文（一次请求或一个后台任务）内的订单快照缓存，没有应用上下文时返回None"""
+    if not has_app_context():
+        return None
+    if 'order_contexts' not in g:
+        g.order_contexts = {}
+    return g.order_contexts
+
 
 class OrderRepository:
     """订单存储库类，处理与订单相关的数据库操作"""
@@ -10,6 +29,45 @@ class OrderRepository:
         """根据ID获取订单"""
         return Order.query.get(order_id)
     
+    @staticmethod
+    def get_context(order_id):
+        """获取订单快照，同一请求/任务内每个订单只查询一次
+        
+        Args:
+            order_id: 订单ID
+            
+        Returns:
+            OrderContext，订单不存在返回None（不存在的结果同样缓存）
+        """
+        if order_id is None:
+            return None
+        order_id = int(order_id)
+        
+        cache = _context_cache()
+        if cache is not None and order_id in cache:
+            return cache[order_id]
+        
+        row = db.session.query(Order.id, Order.order_number).filter(Order.id == order_id).first()
+        context = OrderContext(row.id, row.order_number) if row else None
+        if cache is not None:
+            cache[order_id] = context
+        return context
+    
+    @staticmethod
+    def forget_context(order_id=None):
+        """清除订单快照缓存
+        
+        Args:
+            order_id: 订单ID，为None时清除全部
+        """
+        cache = _context_cache()
+        if cache is None:
+            return
+        if order_id is None:
+            cache.clear()
+        else:
+            cache.pop(int(order_id), None)
+    
     @staticmethod
     def get_by_order_number(order_number):
         """根据订单号获取订单"""
@@ -20,6 +78,83 @@ class OrderRepository:
         """获取所有订单"""
         return Order.query.all()
     
+    @staticmethod
+    def list_orders(limit, after=None, before=None, status=None, user_id=None, note_search=None):
+        """按创建时间倒序分页获取订单（键集分页）
+        
+        以 (created_at, id) 为游标，翻页代价与页码无关。创建者随订单一起加载，
+        文件数和转换文件数用两条分组查询批量填充，整页只需三条查询。
+        
+        Args:
+            limit: 每页数量
+            after: 游标 (created_at, id)，获取比它更早的一页（下一页）
+            before: 游标 (created_at, id)，获取比它更新的一页（上一页）
+            status: 按状态筛选
+            user_id: 按创建者筛选
+            note_search: 按备注关键词筛选
+            
+        Returns:
+            (订单列表, 是否有下一页, 是否有上一页) 三元组
+        """
+        query = Order.query.options(joinedload(Order.user))
+        if status:
+            query = query.filter(Order.status == status)
+        if user_id:
+            query = query.filter(Order.user_id == user_id)
+        if note_search:
+            query = query.filter(Order.note.ilike(f"%{note_search}%"))
+        
+        # 使用行值比较，数据库可以直接在 (created_at, id) 索引上定位游标位置，
+        # 而 "a < x OR (a = x AND id < y)" 的写法会从头扫描索引
+        if before is not None:
+            query = query.filter(tuple_(Order.created_at, Order.id) > tuple(before))
+            query = query.order_by(Order.created_at.asc(), Order.id.asc())
+        else:
+            if after is not None:
+                query = query.filter(tuple_(Order.created_at, Order.id) < tuple(after))
+            query = query.order_by(Order.created_at.desc(), Order.id.desc())
+        
+        # 多取一行判断是否还有更多
+        orders = query.limit(limit + 1).all()
+        has_more = len(orders) > limit
+        orders = orders[:limit]
+        
+        if before is not None:
+            orders.reverse()
+            has_next, has_prev = True, has_more
+        else:
+            has_next, has_prev = has_more, after is not None
+        
+        OrderRepository.attach_counts(orders)
+        return orders, has_next, has_prev
+    
+    @staticmethod
+    def attach_counts(orders):
+        """用分组查询批量填充订单的文件数和转换文件数，避免逐个加载文件关系
+        
+        Args:
+            orders: 订单对象列表
+        """
+        if not orders:
+            return
+        
+        order_ids = [order.id for order in orders]
+        file_counts = dict(
+            db.session.query(UploadedFile.order_id, func.count(UploadedFile.id))
+            .filter(UploadedFile.order_id.in_(order_ids))
+            .group_by(UploadedFile.order_id)
+            .all()
+        )
+        conversion_counts = dict(
+            db.session.query(ConvertedFile.order_id, func.count(ConvertedFile.id))
+            .filter(ConvertedFile.order_id.in_(order_ids))
+            .group_by(ConvertedFile.order_id)
+            .all()
+        )
+        for order in orders:
+            order._file_count = file_counts.get(order.id, 0)
+            order._conversion_count = conversion_counts.get(order.id, 0)
+    
     @staticmethod
     def get_active_order(user_id=None):
         """获取活跃订单
@@ -78,6 +213,7 @@ class OrderRepository:
                 if hasattr(order, key):
                     setattr(order, key, value)
             db.session.commit()
+            OrderRepository.forget_context(order_id)
         
         return order
     
@@ -138,6 +274,7 @@ class OrderRepository:
         if order:
             db.session.delete(order)
             db.session.commit()
+            OrderRepository.forget_context(order_id)
             return True
         
         return False
@@ -0,0 +1,90 @@
+import json
+import datetime
+
+from sqlalchemy import func, delete
+
+from src.models import db
+from src.models.models import ArchiveOutbox
+
+class OutboxRepository:
+    """归档服务事件发件箱存储库类"""
+
+    @staticmethod
+    def add_events(event_type, payloads):
+        """在当前事务中写入事件（不提交，由调用方与业务数据一起提交）
+
+        Args:
+            event_type: 事件类型
+            payloads: 事件内容列表，每项为可JSON序列化的字典
+
+        Returns:
+            新建的发件箱记录列表
+        """
+        events = [
+            ArchiveOutbox(event_type=event_type, payload=json.dumps(payload, ensure_ascii=False))
+            for payload in payloads
+        ]
+        db.session.add_all(events)
+        return events
+
+    @staticmethod
+    def get_due(limit):
+        """按写入顺序获取已到投递时间的事件
+
+        Args:
+            limit: 最多返回的事件数
+        """
+        return ArchiveOutbox.query.filter(
+            ArchiveOutbox.next_attempt_at <= datetime.datetime.utcnow()
+        ).order_by(ArchiveOutbox.id).limit(limit).all()
+
+    @staticmethod
+    def record_delivery(delivered_ids, failures, backoff_base, backoff_max):
+        """在一个事务中记录一轮投递的结果：删除已投递的事件，失败的事件按指数退避推迟下次投递
+
+        Args:
+            delivered_ids: 已投递的发件箱记录ID列表
+            failures: [(发件箱记录列表, 错误信息)]
+            backoff_base: 退避基数（秒），第n次失败后等待 backoff_base * 2^(n-1) 秒
+            backoff_max: 最长退避（秒）
+        """
+        now = datetime.datetime.utcnow()
+        try:
+            for events, error in failures:
+                for event in events:
+                    event.attempts += 1
+                    delay = min(backoff_base * (2 ** (event.attempts - 1)), backoff_max)
+                    event.next_attempt_at = now + datetime.timedelta(seconds=delay)
+                    event.last_error = str(error)[:1000]
+            if delivered_ids:
+                db.session.execute(
+                    delete(ArchiveOutbox).where(ArchiveOutbox.id.in_(list(delivered_ids))),
+                    execution_options={'synchronize_session': False}
+                )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    @staticmethod
+    def stats():
+        """发件箱积压统计
+
+        Returns:
+            字典，包含 depth（待投递事件数）、retrying（投递失败过的事件数）、
+            lag_seconds（最早的待投递事件已等待的秒数）、max_attempts、last_error
+        """
+        depth, oldest, max_attempts = db.session.query(
+            func.count(ArchiveOutbox.id), func.min(ArchiveOutbox.created_at), func.max(ArchiveOutbox.attempts)
+        ).one()
+        retrying = ArchiveOutbox.query.filter(ArchiveOutbox.attempts > 0).count()
+        last_failed = ArchiveOutbox.query.filter(ArchiveOutbox.attempts > 0) \
+            .order_by(ArchiveOutbox.next_attempt_at.desc()).first()
+        lag = (datetime.datetime.utcnow() - oldest).total_seconds() if oldest else 0.0
+        return {
+            'depth': depth,
+            'retrying': retrying,
+            'lag_seconds': round(max(lag, 0.0), 3),
+            'max_attempts': max_attempts or 0,
+            'last_error': last_failed.last_error if last_failed else None,
+        }
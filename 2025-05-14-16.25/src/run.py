@@ -7,10 +7,9 @@ from socket import socket, AF_INET, SOCK_STREAM
 import shutil
 from datetime import datetime
 from src.app import create_app
-from src.models import db, AdminUser
+from src.models import db, AdminUser, ensure_indexes
 import src.settings as config
 import socket
-import requests
 from src.utils.convert_client import convert_client
 
 # 设置环境变量连接到正确的微服务端口
@@ -79,55 +78,143 @@ def find_available_port(start_port=8000):
 
 # 检查外部微服务是否可用
 def check_external_services():
-    """检查所有依赖的外部服务是否可用，如果不可用则退出
+    """并发探测依赖的外部服务（转换服务、归档服务），不可用时以降级模式继续启动
     
-    检查项目：
-    1. 转换服务（Go服务）- 必须可用
-    2. 归档服务（FastAPI服务）- 必须可用
+    探测使用健康监控器中注册的探测函数，结果写入监控器缓存和熔断器。
+    降级模式下转换任务保留在队列中，服务恢复后由worker继续处理；
+    服务状态通过 /readyz 提供给进程管理器。
+    
+    Returns:
+        {服务名称: 是否可用}
     """
-    logger.info("开始检查依赖的外部服务...")
+    from src.utils.health_monitor import health_monitor
     
-    # 检查转换服务
-    logger.info(f"检查转换服务健康状态...")
-    convert_svc_url = os.environ.get('CONVERT_SVC_URL', 'http://localhost:8081')
-    convert_health_url = f"{convert_svc_url}/api/health"
+    logger.info("开始检查依赖的外部服务...")
+    statuses = health_monitor.refresh_all()
     
-    try:
-        resp = requests.get(convert_health_url, timeout=5)
-        if resp.status_code == 200:
-            logger.info("✓ 转换服务正常运行")
+    available = {}
+    for name, status in statuses.items():
+        healthy = bool(status and status['healthy'])
+        available[name] = healthy
+        if healthy:
+            logger.info(f"✓ {name} 正常运行 ({status['latency_ms']}ms)")
         else:
-            logger.error(f"转换服务状态异常: HTTP {resp.status_code}, 响应: {resp.text}")
-            logger.error("系统依赖转换服务，无法继续运行")
-            print(f"错误: 转换服务不可用，请确保转换服务已启动并运行在 {convert_svc_url}")
-            sys.exit(1)
-    except requests.RequestException as e:
-        logger.error(f"无法连接到转换服务: {str(e)}")
-        logger.error("系统依赖转换服务，无法继续运行")
-        print(f"错误: 无法连接转换服务，请确保转换服务已启动并运行在 {convert_svc_url}")
-        sys.exit(1)
+            error = status.get('error') if status else None
+            logger.warning(f"✗ {name} 不可用{f': {error}' if error else ''}")
+    
+    if all(available.values()):
+        logger.info("所有依赖的外部服务检查通过")
+    else:
+        unavailable = ', '.join(name for name, ok in available.items() if not ok)
+        logger.warning(f"以降级模式启动: {unavailable} 不可用，相关任务将排队等待服务恢复")
+    return available
 
-    # 检查归档服务
-    logger.info(f"检查归档服务健康状态...")
-    archive_url = os.environ.get('ARCHIVE_SVC_URL', 'http://localhost:8088/api/v1/archive')
-    health_url = f"{archive_url.split('/archive')[0]}/health"
+# 启动后台转换任务worker
+def start_job_workers():
+    """启动后台转换任务worker进程
     
-    try:
-        resp = requests.get(health_url, timeout=5)
-        if resp.status_code == 200:
-            logger.info("✓ 归档服务正常运行")
-        else:
-            logger.error(f"归档服务状态异常: HTTP {resp.status_code}, 响应: {resp.text}")
-            logger.error("系统依赖归档服务，无法继续运行")
-            print(f"错误: 归档服务不可用，请确保归档服务已启动并运行在 {health_url}")
-            sys.exit(1)
-    except requests.RequestException as e:
-        logger.error(f"无法连接到归档服务: {str(e)}")
-        logger.error("系统依赖归档服务，无法继续运行")
-        print(f"错误: 无法连接归档服务，请确保归档服务已启动并运行在 {health_url}")
-        sys.exit(1)
+    JOB_WORKERS为0时不启动，需通过 python -m src.worker 单独运行worker。
+    """
+    if not config.JOB_QUEUE_ENABLED or config.JOB_WORKERS <= 0:
+        return []
+    # debug模式下Werkzeug重载器会先启动一个监控进程，只在实际提供服务的子进程中启动worker
+    if config.DEBUG and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return []
+    from src.services.job_service import JobService
+    return JobService.start_workers()
+
+# 启动归档服务事件发件箱dispatcher
+def start_outbox_dispatcher():
+    """启动归档服务事件发件箱的dispatcher进程（每个部署只启动一个）"""
+    if not config.ARCHIVE_OUTBOX_ENABLED:
+        return None
+    # debug模式下Werkzeug重载器会先启动一个监控进程，只在实际提供服务的子进程中启动
+    if config.DEBUG and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return None
+    from src.services.outbox_service import OutboxService
+    return OutboxService.start_dispatcher()
+
+# 初始化数据库
+def init_database():
+    """创建数据表、为已存在的表补建索引，并确保默认管理员存在"""
+    with app.app_context():
+        logger.info("创建新的数据库结构...")
+        db.create_all()
+        # 为已存在的表补建新增的索引
+        created_indexes = ensure_indexes()
+        if created_indexes:
+            logger.info(f"已创建索引: {', '.join(created_indexes)}")
+        # 使用配置中的默认管理员信息
+        default_admin = AdminUser.query.filter_by(username=config.ADMIN_USERNAME).first()
+        if not default_admin:
+            default_admin = AdminUser(
+                username=config.ADMIN_USERNAME,
+                is_admin=True,
+                full_name='系统管理员',
+                email=config.ADMIN_EMAIL
+            )
+            default_admin.set_password(config.ADMIN_PASSWORD)
+            db.session.add(default_admin)
+            db.session.commit()
+            logger.info(f"创建默认管理员: {config.ADMIN_USERNAME}")
+        logger.info("数据库初始化完成")
+
+# 是否使用Werkzeug开发服务器
+def use_dev_server():
+    """仅FLASK_ENV=development时使用开发服务器，其余环境使用gunicorn
+    
+    gunicorn不支持Windows，Windows下始终使用开发服务器。
+    """
+    if env == 'development':
+        return True
+    if os_name == 'Windows':
+        logger.warning("gunicorn不支持Windows，使用开发服务器")
+        return True
+    return False
+
+# 以gunicorn启动生产服务
+def run_production_server():
+    """以gunicorn prefork模式启动（替换当前进程）
+    
+    worker数量、线程数、按请求数回收等参数见项目根目录的 gunicorn.conf.py，
+    任务worker由gunicorn主进程在就绪后启动。
+    """
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    conf_path = os.path.join(project_root, 'gunicorn.conf.py')
+    logger.info(f"以gunicorn启动生产服务: 配置 {conf_path}")
+    logging.shutdown()
+    os.execvp(sys.executable, [sys.executable, '-m', 'gunicorn', '-c', conf_path, 'src.wsgi:app'])
+
+# 启动Web服务
+def serve():
+    """启动Web服务：开发环境使用Werkzeug开发服务器，其余环境使用gunicorn"""
+    if not use_dev_server():
+        run_production_server()
+        return
+    
+    # 使用0.0.0.0允许局域网访问
+    host = '0.0.0.0'
+    
+    # 尝试使用用户指定的端口，如果不可用则自动查找可用端口
+    preferred_port = int(os.environ.get('PORT', 8080))
+    if not is_port_available(preferred_port, host):
+        logger.warning(f"端口 {preferred_port} 已被占用，正在查找可用端口...")
+        port = find_available_port(8000)
+        logger.info(f"自动选择端口 {port}")
+    else:
+        port = preferred_port
+        
+    debug = config.DEBUG
+    
+    logger.info(f"应用启动于 http://{host}:{port}，debug={debug}")
+    print(f"应用已启动，请访问: http://{host}:{port}")
     
-    logger.info("所有依赖的外部服务检查通过")
+    # 启动后台任务worker和归档发件箱dispatcher
+    start_job_workers()
+    start_outbox_dispatcher()
+    
+    # 使用threaded=True提高并发性能
+    app.run(host=host, port=port, debug=debug, threaded=True)
 
 if __name__ == '__main__':
     try:
@@ -148,44 +235,10 @@ if __name__ == '__main__':
             os.remove(db_path)
         
         # 创建新的数据库及表
-        with app.app_context():
-            logger.info("创建新的数据库结构...")
-            db.create_all()
-            # 使用配置中的默认管理员信息
-            default_admin = AdminUser.query.filter_by(username=config.ADMIN_USERNAME).first()
-            if not default_admin:
-                default_admin = AdminUser(
-                    username=config.ADMIN_USERNAME,
-                    is_admin=True,
-                    full_name='系统管理员',
-                    email=config.ADMIN_EMAIL
-                )
-                default_admin.set_password(config.ADMIN_PASSWORD)
-                db.session.add(default_admin)
-                db.session.commit()
-                logger.info(f"创建默认管理员: {config.ADMIN_USERNAME}")
-            logger.info("数据库初始化完成")
-        
-        # 启动Flask应用
-        # 使用0.0.0.0允许局域网访问
-        host = '0.0.0.0'
-        
-        # 尝试使用用户指定的端口，如果不可用则自动查找可用端口
-        preferred_port = int(os.environ.get('PORT', 8080))
-        if not is_port_available(preferred_port, host):
-            logger.warning(f"端口 {preferred_port} 已被占用，正在查找可用端口...")
-            port = find_available_port(8000)
-            logger.info(f"自动选择端口 {port}")
-        else:
-            port = preferred_port
-            
-        debug = config.DEBUG
-        
-        logger.info(f"应用启动于 http://{host}:{port}，debug={debug}")
-        print(f"应用已启动，请访问: http://{host}:{port}")
+        init_database()
         
-        # 使用threaded=True提高并发性能
-        app.run(host=host, port=port, debug=debug, threaded=True)
+        # 启动Web服务
+        serve()
     except Exception as e:
         logger.error(f"应用启动失败: {str(e)}")
         sys.exit(1) 
\ No newline at end of file
@@ -1,4 +1,7 @@
 from src.services.admin_service import AdminService
+from src.services.bundle_service import BundleService
 from src.services.file_service import FileService
+from src.services.job_service import JobService
 from src.services.mail_service import MailService
 from src.services.order_service import OrderService
+from src.services.rendition_service import RenditionService
@@ -0,0 +1,242 @@
+import os
+import glob
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from src.services.order_service import OrderService
+from src.utils.convert_client import convert_client
+from src.utils.zip_stream import stream_zip
+
+# 后台打包线程池（按进程创建）及正在打包的订单
+_builder = None
+_builder_pid = None
+_building = set()
+_lock = threading.Lock()
+
+
+class BundleService:
+    """订单ZIP包缓存服务类
+
+    订单的转换全部结束后在后台生成ZIP包，下载时直接发送文件。
+    ZIP包以订单转换记录的指纹命名，任何转换记录的增删改都会改变指纹，
+    旧的ZIP包随即失效；分类重命名、清空PNG池、删除等操作还会主动删除旧包。
+    """
+
+    @staticmethod
+    def bundle_dir():
+        """ZIP包缓存目录"""
+        return current_app.config.get('BUNDLE_FOLDER') or os.path.join(
+            os.path.dirname(current_app.config['CONVERTED_FOLDER']), 'bundles'
+        )
+
+    @staticmethod
+    def fingerprint(converted_files):
+        """根据订单的转换记录计算指纹
+
+        Args:
+            converted_files: 转换文件对象列表
+
+        Returns:
+            指纹字符串（16位十六进制）
+        """
+        digest = hashlib.sha256()
+        for file in sorted(converted_files, key=lambda f: f.id):
+            digest.update(f"{file.id}\0{file.filename}\0{file.file_path}\n".encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+    @staticmethod
+    def bundle_path(order_id, fingerprint):
+        """ZIP包文件路径"""
+        return os.path.join(BundleService.bundle_dir(), f"order_{order_id}_{fingerprint}.zip")
+
+    @staticmethod
+    def cached_bundle(order_id, converted_files):
+        """获取与当前转换记录一致的ZIP包
+
+        Args:
+            order_id: 订单ID
+            converted_files: 订单当前的转换文件对象列表
+
+        Returns:
+            ZIP包路径，不存在或已失效返回None
+        """
+        if not current_app.config.get('BUNDLE_ENABLED', True) or not converted_files:
+            return None
+        path = BundleService.bundle_path(order_id, BundleService.fingerprint(converted_files))
+        return path if os.path.exists(path) else None
+
+    @staticmethod
+    def invalidate(order_id, keep=None):
+        """删除订单的ZIP包
+
+        Args:
+            order_id: 订单ID
+            keep: 需要保留的ZIP包路径（可选）
+        """
+        for path in glob.glob(os.path.join(BundleService.bundle_dir(), f"order_{order_id}_*.zip")):
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                current_app.logger.info(f"已删除订单ZIP包: {path}")
+            except OSError as e:
+                current_app.logger.error(f"删除订单ZIP包失败: {path}, 错误: {str(e)}")
+
+    @staticmethod
+    def zip_entry(file_obj, order):
+        """确定转换文件在ZIP中的名称和来源
+
+        Args:
+            file_obj: 转换文件对象
+            order: 订单对象
+
+        Returns:
+            包含arcname和path（本地文件）或url（远程文件）的字典
+        """
+        # 获取公共URL路径和文件名
+        file_url = file_obj.file_path  # 这可能是一个URL
+        filename = file_obj.filename   # 使用数据库中存储的文件名
+        display_name = file_obj.display_name if hasattr(file_obj, 'display_name') else filename
+
+        # 获取实际存储路径（如果有）
+        storage_path = file_obj.storage_path if hasattr(file_obj, 'storage_path') else None
+        if storage_path and os.path.exists(storage_path):
+            return {'arcname': display_name, 'path': storage_path}
+
+        # 检查原始文件路径是否是本地路径
+        if not file_url.startswith(('http://', 'https://')):
+            if os.path.exists(file_url):
+                return {'arcname': display_name, 'path': file_url}
+
+            # 仅当存储路径和直接路径都不可用时才尝试猜测路径
+            converted_folder = current_app.config.get('CONVERTED_FOLDER')
+            possible_paths = [
+                # 订单号子目录中的文件
+                os.path.join(converted_folder, order.order_number, filename),
+                # 订单ID子目录中的文件
+                os.path.join(converted_folder, f"order_{order.id}", filename),
+                # 根目录中的文件
+                os.path.join(converted_folder, filename)
+            ]
+            for path in possible_paths:
+                if os.path.exists(path):
+                    return {'arcname': display_name, 'path': path}
+
+        # 无法在本地找到时从URL下载
+        download_url = file_url
+        if "/files/" in file_url and not file_url.startswith(('http://', 'https://')):
+            convert_svc_url = os.environ.get('CONVERT_SVC_URL', 'http://localhost:8081')
+            download_url = f"{convert_svc_url}/files/{file_url}"
+        return {'arcname': display_name, 'url': download_url}
+
+    @staticmethod
+    def stream(order, converted_files, on_added=None, on_error=None):
+        """流式生成订单ZIP
+
+        Args:
+            order: 订单对象
+            converted_files: 转换文件对象列表
+            on_added / on_error: 传给stream_zip的回调
+
+        Returns:
+            ZIP数据块生成器
+        """
+        entries = [BundleService.zip_entry(file_obj, order) for file_obj in converted_files]
+        return stream_zip(
+            entries,
+            fetch=lambda url: convert_client.get(url, stream=True),
+            prefetch=current_app.config.get('DOWNLOAD_ZIP_PREFETCH', 4),
+            max_memory_per_file=current_app.config.get('DOWNLOAD_ZIP_MEMORY_PER_FILE', 8 * 1024 * 1024),
+            on_added=on_added,
+            on_error=on_error,
+        )
+
+    @staticmethod
+    def build(order_id):
+        """生成订单ZIP包（需要在应用上下文中调用）
+
+        先写入临时文件，全部条目成功后再原子替换为正式文件；
+        有条目失败时不发布ZIP包，下载时回退到流式打包。
+
+        Args:
+            order_id: 订单ID
+
+        Returns:
+            ZIP包路径，订单没有转换文件或打包失败返回None
+        """
+        order = OrderService.get_order(order_id)
+        converted_files = OrderService.get_order_conversions(order_id) if order else []
+        if not converted_files:
+            BundleService.invalidate(order_id)
+            return None
+
+        path = BundleService.bundle_path(order_id, BundleService.fingerprint(converted_files))
+        if os.path.exists(path):
+            return path
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        errors = []
+        try:
+            with open(tmp_path, 'wb') as out:
+                for chunk in BundleService.stream(
+                    order, converted_files,
+                    on_error=lambda entry, error: errors.append(f"{entry['arcname']}: {str(error)}"),
+                ):
+                    out.write(chunk)
+
+            if errors:
+                current_app.logger.warning(f"订单ZIP包未发布，{len(errors)}个文件无法读取: {'; '.join(errors[:5])}")
+                return None
+
+            os.replace(tmp_path, path)
+            current_app.logger.info(f"订单ZIP包已生成: {path}, 共 {len(converted_files)} 个文件")
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        # 删除同一订单的旧包
+        BundleService.invalidate(order_id, keep=path)
+        return path
+
+    @staticmethod
+    def schedule_build(order_id):
+        """在后台线程中生成订单ZIP包（同一订单同时只打包一次）
+
+        Args:
+            order_id: 订单ID
+
+        Returns:
+            已提交返回True，打包关闭或已在打包中返回False
+        """
+        global _builder, _builder_pid
+
+        if not current_app.config.get('BUNDLE_ENABLED', True):
+            return False
+
+        app = current_app._get_current_object()
+        with _lock:
+            if order_id in _building:
+                return False
+            if _builder is None or _builder_pid != os.getpid():
+                _builder = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bundle-builder')
+                _builder_pid = os.getpid()
+                _building.clear()
+            _building.add(order_id)
+            _builder.submit(_build_in_background, app, order_id)
+        return True
+
+
+def _build_in_background(app, order_id):
+    """后台线程入口：在应用上下文中生成ZIP包"""
+    try:
+        with app.app_context():
+            BundleService.build(order_id)
+    except Exception as e:
+        app.logger.error(f"生成订单ZIP包失败: order_id={order_id}, 错误: {str(e)}")
+    finally:
+        with _lock:
+            _building.discard(order_id)
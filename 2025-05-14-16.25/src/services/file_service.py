@@ -1,22 +1,35 @@
 import os
 import uuid
-import hashlib
 import shutil
 import zipfile
-import rarfile
-import requests
 import functools
-from werkzeug.utils import secure_filename
-from flask import current_app, flash
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, flash, has_request_context
 import logging
-import time
 from datetime import datetime
-import mimetypes
 
 from src.repositories.file_repo import FileRepository
 from src.repositories.order_repo import OrderRepository
-from src.utils.file_utils import convert_pdf_to_png, convert_docx_to_png, convert_pptx_to_png, convert_image_to_png
-from src.utils.convert_client import convert_client
+from src.services.bundle_service import BundleService
+from src.services.rendition_service import RenditionService
+from src.services.outbox_service import OutboxService, EVENT_RENAME
+from src.utils.convert_client import convert_client, SERVICE_NAME as CONVERT_SERVICE
+from src.utils.health_monitor import health_monitor
+from src.utils.ingest import ingest_stream
+from src.utils.hash_cache import hash_cache
+from src.utils.conversion_cache import conversion_cache
+from src.utils.artifact_cache import artifact_cache
+from src.utils.archive_client import archive_client, hash_lookup_batcher, fetch_files_by_hash
+
+# 健康监控和熔断器中使用的归档服务名称
+from src.utils.archive_client import SERVICE_NAME as ARCHIVE_SERVICE
+
+# 归档（推送到归档服务、本地备用副本）的后台线程池（按进程创建）
+_archiver = None
+_archiver_pid = None
+_archiver_lock = threading.Lock()
 
 # 文件类型策略表
 FILE_TYPE_MAP = {
@@ -86,46 +99,102 @@ class ArchiveService:
     
     @staticmethod
     @log_exceptions("归档文件时出错", default_return=None)
-    def archive_file(file_path, category="general", description=None, tags=None):
-        """将文件归档
+    def archive_file(file_path, category="general", description=None, tags=None, file_hash=None,
+                     precheck=True):
+        """将文件以流式上传归档到归档服务
+        
+        文件按块读取并通过连接池发送，不整体载入内存；同时传递SHA-256，
+        归档服务中已存在相同内容的文件时直接返回已有文件。
         
         Args:
             file_path: 文件路径
             category: 文件分类
             description: 文件描述
             tags: 文件标签列表
+            file_hash: 已计算的SHA-256（可选），未提供时通过哈希缓存计算
+            precheck: 是否先用哈希预检（调用方已批量预检时传False）
             
         Returns:
-            归档成功返回归档信息字典，否则返回None
+            归档成功返回归档信息字典（success、file_id、stored_path、file_hash、duplicate），否则返回None
         """
         if not os.path.exists(file_path):
             current_app.logger.error(f"归档文件不存在: {file_path}")
             return None
         
-        # 获取归档服务URL
-        archive_svc_url = current_app.config.get('ARCHIVE_SVC_URL', 'http://localhost:8088/api/v1/archive')
+        # 健康检查（读取后台监控的缓存状态，熔断时快速失败）
+        if not health_monitor.is_available(ARCHIVE_SERVICE):
+            current_app.logger.error("归档服务不可用（健康检查失败或熔断中）")
+            return None
         
-        # 健康检查
-        try:
-            health_check = requests.get(f"{archive_svc_url.split('/archive')[0]}/health", timeout=2)
-            if health_check.status_code != 200:
-                current_app.logger.error(f"归档服务不可用: {health_check.status_code}")
-                return None
-        except Exception as e:
-            current_app.logger.error(f"连接归档服务失败: {str(e)}")
+        file_hash = file_hash or hash_cache.get_hash(file_path)
+        
+        # 先用哈希预检，已归档的文件只需一个小请求，不再传输文件内容
+        archived = precheck and (ArchiveService.have_hashes([file_hash]) or {}).get(file_hash)
+        if archived:
+            current_app.logger.info(f"文件已存在于归档中，跳过上传: {file_path}, ID: {archived['id']}")
+            return {
+                'success': True,
+                'file_id': archived['id'],
+                'stored_path': archived.get('file_path'),
+                'file_hash': file_hash,
+                'duplicate': True,
+            }
+        
+        response = archive_client.upload_file(
+            file_path, category=category, description=description, tags=tags, sha256=file_hash
+        )
+        if response.status_code != 200:
+            current_app.logger.error(f"归档服务返回错误: {response.status_code} - {response.text[:200]}")
+            return None
+        
+        result = response.json()
+        archived = result.get('file') or {}
+        if not result.get('success') or not archived.get('id'):
+            current_app.logger.error(f"归档失败: {result.get('message')}")
             return None
+        
+        return {
+            'success': True,
+            'file_id': archived['id'],
+            'stored_path': archived.get('file_path'),
+            'file_hash': archived.get('sha256_hash') or file_hash,
+            'duplicate': result.get('message') == '文件已存在于归档中',
+        }
+    
+    @staticmethod
+    @log_exceptions("哈希预检时出错", default_return=None)
+    def have_hashes(hashes):
+        """批量检查SHA-256是否已归档（一个请求）
+        
+        Args:
+            hashes: SHA-256哈希值列表
             
-        # TODO: 实现文件归档逻辑，调用归档服务
-        # 暂时返回None，表示归档失败，让FileService继续使用本地归档
-        return None
+        Returns:
+            已归档的哈希值到 {id, file_path} 的映射；归档服务不可用或请求失败时返回None，
+            调用方应按未知处理（继续上传，由归档服务按sha256去重）
+        """
+        hashes = [file_hash.lower() for file_hash in hashes if file_hash]
+        if not hashes:
+            return {}
+        
+        if not health_monitor.is_available(ARCHIVE_SERVICE):
+            return None
+        
+        response = archive_client.have_hashes(hashes)
+        if response.status_code != 200:
+            current_app.logger.error(f"归档服务哈希预检失败: {response.status_code} - {response.text[:200]}")
+            return None
+        return response.json().get('existing') or {}
     
     @staticmethod
     @log_exceptions("查找文件时出错", default_return=None)
     def get_file_by_hash(file_hash):
         """根据文件哈希值获取文件信息
         
+        并发的查询在短暂的等待窗口内合并为一个 /files/hash:batch 请求。
+        
         Args:
-            file_hash: 文件哈希值
+            file_hash: 文件SHA-256哈希值
             
         Returns:
             文件信息字典，如果未找到则返回None
@@ -133,23 +202,35 @@ class ArchiveService:
         if not file_hash:
             return None
         
-        # 获取归档服务URL
-        archive_svc_url = current_app.config.get('ARCHIVE_SVC_URL', 'http://localhost:8088/api/v1/archive')
+        # 归档服务熔断中时直接跳过，避免等待超时
+        if not health_monitor.is_available(ARCHIVE_SERVICE):
+            return None
         
-        try:
-            response = requests.get(f"{archive_svc_url}/files/hash/{file_hash}", timeout=10)
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result.get('file')
-            elif response.status_code != 404:  # 如果不是404（文件不存在），记录错误
-                current_app.logger.error(f"从归档服务获取文件失败: {response.status_code}")
+        return hash_lookup_batcher.get(file_hash.lower())
+    
+    @staticmethod
+    @log_exceptions("批量查找文件时出错", default_return=None)
+    def get_files_by_hash(hashes):
+        """根据文件哈希值批量获取文件信息，每 ARCHIVE_HASH_BATCH_MAX_SIZE 个哈希一个请求
+        
+        Args:
+            hashes: 文件SHA-256哈希值列表
             
-            return None
+        Returns:
+            已找到的哈希值到文件信息字典的映射；归档服务不可用时返回None
+        """
+        hashes = list(dict.fromkeys(file_hash.lower() for file_hash in hashes if file_hash))
+        if not hashes:
+            return {}
         
-        except Exception as e:
-            current_app.logger.error(f"通过哈希值查找文件失败: {str(e)}")
+        if not health_monitor.is_available(ARCHIVE_SERVICE):
             return None
+        
+        batch_size = hash_lookup_batcher.max_batch_size
+        files = {}
+        for start in range(0, len(hashes), batch_size):
+            files.update(fetch_files_by_hash(hashes[start:start + batch_size]))
+        return files
     
     @staticmethod
     @log_exceptions("下载文件时出错", default_return=None)
@@ -166,30 +247,29 @@ class ArchiveService:
         if not file_id:
             return None
         
-        # 获取归档服务URL
-        archive_svc_url = current_app.config.get('ARCHIVE_SVC_URL', 'http://localhost:8088/api/v1/archive')
+        # 归档服务熔断中时直接跳过，避免等待超时
+        if not health_monitor.is_available(ARCHIVE_SERVICE):
+            return None
         
         try:
-            response = requests.get(f"{archive_svc_url}/files/{file_id}/download", timeout=30, stream=True)
-            
-            if response.status_code == 200:
-                if target_path:
-                    # 保存到文件
-                    with open(target_path, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            if chunk:
-                                f.write(chunk)
-                    return target_path
-                else:
-                    # 返回文件内容
-                    return response.content
-            else:
-                current_app.logger.error(f"从归档服务下载文件失败: {response.status_code}")
-                return None
-        
+            response = archive_client.download(file_id)
         except Exception as e:
             current_app.logger.error(f"下载归档文件失败: {str(e)}")
             return None
+        
+        # 流式响应在任何情况下都要关闭，连接才能回到连接池
+        with response:
+            if response.status_code != 200:
+                current_app.logger.error(f"从归档服务下载文件失败: {response.status_code}")
+                return None
+            if target_path:
+                # 按块写入文件
+                with open(target_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
+                        f.write(chunk)
+                return target_path
+            # 返回文件内容
+            return response.content
 
 class FileService:
     """文件服务类，处理与文件相关的业务逻辑"""
@@ -218,6 +298,8 @@ class FileService:
     def calculate_file_hash(file_path):
         """计算文件的SHA-256哈希值
         
+        结果按 (device, inode, size, mtime_ns) 缓存，文件未变化时不再重复读取。
+        
         Args:
             file_path: 文件路径
             
@@ -225,12 +307,8 @@ class FileService:
             文件哈希值（16进制字符串）
         """
         try:
-            hasher = hashlib.sha256()
-            with open(file_path, 'rb') as f:
-                # 分块读取文件，避免大文件一次性读入内存
-                for chunk in iter(lambda: f.read(4096), b''):
-                    hasher.update(chunk)
-            return hasher.hexdigest()
+            # 通过哈希缓存获取，同一文件内容只计算一次
+            return hash_cache.get_hash(file_path)
         except Exception as e:
             current_app.logger.error(f"计算文件哈希出错: {str(e)}")
             return None
@@ -246,11 +324,47 @@ class FileService:
         Returns:
             保存成功返回上传文件对象，否则返回None
         """
+        uploaded = FileService.save_uploaded_files([file], order_id)
+        return uploaded[0] if uploaded else None
+    
+    @staticmethod
+    def save_uploaded_files(files, order_id):
+        """保存同一请求上传的多个文件，并在后台推送到归档服务
+        
+        所有文件保存后只做一次哈希预检，已归档的内容不再上传。
+        
+        Args:
+            files: Flask文件对象列表
+            order_id: 订单ID
+            
+        Returns:
+            保存成功的上传文件对象列表
+        """
+        uploaded = []
+        to_archive = []
+        for file in files:
+            saved = FileService._save_uploaded_file(file, order_id)
+            if saved:
+                uploaded.append(saved[0])
+                to_archive.append(saved[1:])
+        
+        # 后台流式推送到归档服务（传递已计算的哈希），不阻塞上传请求
+        if to_archive:
+            FileService.schedule_archive_uploads(to_archive)
+        return uploaded
+    
+    @staticmethod
+    def _save_uploaded_file(file, order_id):
+        """保存一个上传的文件（不推送归档服务）
+        
+        Returns:
+            (上传文件对象, 推送归档服务时读取的路径, SHA-256) 三元组，失败返回None
+        """
         if not file or not file.filename:
             return None
         
-        # 获取订单对象
-        order = OrderRepository.get_by_id(order_id)
+        # 获取订单快照（同一请求内多个文件只查询一次）
+        order = OrderRepository.get_context(order_id)
         if not order:
             return None
         
@@ -265,12 +379,9 @@ class FileService:
         base, ext = os.path.splitext(safe_filename)
         unique_filename = f"{base}_{uuid.uuid4().hex[:8]}{ext}"
         
-        # 保存到上传目录
+        # 上传目录与订单存档目录
         upload_folder = current_app.config['UPLOAD_FOLDER']
         file_path = os.path.join(upload_folder, unique_filename)
-        file.save(file_path)
-        
-        # 同时保存到订单存档目录
         archive_folder = os.path.join(
             current_app.config['ARCHIVE_FOLDER'],
             'uploads',
@@ -279,28 +390,55 @@ class FileService:
         os.makedirs(archive_folder, exist_ok=True)
         archive_path = os.path.join(archive_folder, unique_filename)
         
-        try:
-            shutil.copy2(file_path, archive_path)
-        except Exception as e:
-            current_app.logger.error(f"存档上传文件时出错: {unique_filename}, 错误: {str(e)}")
-        
-        # 获取文件大小和类型
-        file_size = os.path.getsize(file_path)
-        file_type = FileService.detect_file_type(file_path)
-        
-        # 计算文件哈希值
-        file_hash = FileService.calculate_file_hash(file_path)
+        # 单次读取上传流，同时得到文件大小、类型和哈希值
+        ingested = FileService.ingest_upload(file.stream, file_path, archive_path)
+        if ingested['copy_method'] is None:
+            # 存档副本未能生成时改为后台复制，避免记录指向不存在的存档路径
+            current_app.logger.error(f"存档上传文件时出错，改为后台复制: {unique_filename}")
+            FileService.schedule_local_archive(file_path, archive_path)
         
         # 创建上传文件记录
-        return FileRepository.create_uploaded_file(
+        uploaded_file = FileRepository.create_uploaded_file(
             filename=unique_filename,
             original_filename=original_filename,
             file_path=archive_path,  # 使用存档路径，这样即使工作目录被清空，还能恢复文件
-            file_size=file_size,
-            file_type=file_type,
-            file_hash=file_hash,
+            file_size=ingested['file_size'],
+            file_type=ingested['file_type'],
+            file_hash=ingested['file_hash'],
             order_id=order_id
         )
+        
+        if not uploaded_file:
+            return None
+        return uploaded_file, archive_path if ingested['copy_method'] else file_path, ingested['file_hash']
+    
+    @staticmethod
+    def ingest_upload(stream, file_path, archive_path=None):
+        """摄取上传流：一次读取完成写盘、SHA-256计算、文件头嗅探和存档副本
+        
+        存档副本优先使用硬链接或reflink，跨文件系统时在同一次读取中同时写出。
+        
+        Args:
+            stream: 上传文件的二进制流
+            file_path: 上传目录中的目标路径
+            archive_path: 存档副本路径（可选）
+            
+        Returns:
+            包含file_size、file_type、file_hash、copy_method的字典
+        """
+        result = ingest_stream(stream, file_path, archive_path)
+        
+        # 登记已计算的哈希，后续对这些文件的哈希查询直接命中缓存
+        hash_cache.put(file_path, result['file_hash'])
+        if result['copy_method'] in ('tee', 'reflink', 'copy'):
+            hash_cache.put(archive_path, result['file_hash'])
+        
+        return {
+            'file_size': result['file_size'],
+            'file_type': FileService.detect_file_type(file_path, header=result['header']),
+            'file_hash': result['file_hash'],
+            'copy_method': result['copy_method']
+        }
     
     @staticmethod
     def save_converted_file(filename, file_url, order_id, source_file_id=None, 
@@ -319,9 +457,8 @@ class FileService:
         Returns:
             保存成功返回转换文件对象，否则返回None
         """
-        # 获取订单对象
-        order = OrderRepository.get_by_id(order_id)
-        if not order:
+        # 检查订单是否存在（同一请求/任务内只查询一次）
+        if not OrderRepository.get_context(order_id):
             return None
         
         # 创建转换文件记录，直接使用转换服务提供的URL
@@ -339,7 +476,7 @@ class FileService:
     @staticmethod
     def save_converted_files_from_urls(file_urls, order_id, source_file_id=None, 
                                      source_hash=None, from_zip=False, zip_path=None):
-        """将转换服务返回的URL列表保存为转换文件记录
+        """将转换服务返回的URL列表保存为转换文件记录（单条语句、单个事务）
         
         Args:
             file_urls: 转换服务返回的文件URL列表
@@ -350,29 +487,38 @@ class FileService:
             zip_path: 压缩包路径
             
         Returns:
-            保存成功返回转换文件对象列表，失败返回空列表
+            保存成功返回转换文件ID列表，失败返回空列表
         """
         if not file_urls:
             return []
-            
-        converted_files = []
-        for file_url in file_urls:
-            # 从URL中提取文件名
-            filename = os.path.basename(file_url.split('/')[-1])
-            # 保存记录
-            converted_file = FileService.save_converted_file(
-                filename=filename,
-                file_url=file_url,
-                order_id=order_id,
-                source_file_id=source_file_id,
-                source_hash=source_hash,
-                from_zip=from_zip,
-                zip_path=zip_path
-            )
-            if converted_file:
-                converted_files.append(converted_file)
-                
-        return converted_files
+        
+        # 整批只检查一次订单（同一请求/任务内只查询一次）
+        if not OrderRepository.get_context(order_id):
+            return []
+        
+        file_ids = FileRepository.create_converted_files(
+            FileService.converted_file_rows(file_urls, order_id, source_file_id, source_hash, from_zip, zip_path)
+        )
+        RenditionService.schedule_pregenerate(file_ids)
+        return file_ids
+    
+    @staticmethod
+    def converted_file_rows(file_urls, order_id, source_file_id=None, source_hash=None,
+                            from_zip=False, zip_path=None):
+        """将转换服务返回的URL列表转换为批量插入用的字段字典列表"""
+        return [
+            {
+                # 从URL中提取文件名
+                'filename': os.path.basename(file_url.split('/')[-1]),
+                'file_path': file_url,  # 使用URL而非本地路径
+                'order_id': order_id,
+                'source_file_id': source_file_id,
+                'source_hash': source_hash,
+                'from_zip': from_zip,
+                'zip_path': zip_path,
+            }
+            for file_url in file_urls
+        ]
 
     @staticmethod
     def delete_uploaded_file(file_id):
@@ -402,6 +548,9 @@ class FileService:
             删除成功返回True，否则返回False
         """
         file = FileRepository.get_converted_file(file_id)
+        if file:
+            BundleService.invalidate(file.order_id)
+            artifact_cache.invalidate(convert_client.relative_path(file.file_path))
         return FileService._delete_file_record(
             file, 
             current_app.config['CONVERTED_FOLDER'], 
@@ -448,25 +597,28 @@ class FileService:
         """
         files = FileRepository.get_converted_files_by_order(order_id)
         
-        # 删除物理文件
+        # 删除物理文件及其本地缓存副本
         for file in files:
             try:
                 converted_path = os.path.join(current_app.config['CONVERTED_FOLDER'], file.filename)
                 if os.path.exists(converted_path):
                     os.remove(converted_path)
+                artifact_cache.invalidate(convert_client.relative_path(file.file_path))
             except Exception as e:
                 current_app.logger.error(f"清除转换文件时出错: {file.filename}, 错误: {str(e)}")
         
-        # 删除数据库记录
+        # 删除数据库记录和订单ZIP包
         FileRepository.delete_converted_files_by_order(order_id)
+        BundleService.invalidate(order_id)
         return True
     
     @staticmethod
-    def detect_file_type(file_path):
+    def detect_file_type(file_path, header=None):
         """检测文件类型
         
         Args:
             file_path: 文件路径
+            header: 已读取的文件头字节（可选），提供时不再重新打开文件
             
         Returns:
             文件类型字符串
@@ -482,14 +634,15 @@ class FileService:
         
         # 如果扩展名不明确，尝试通过文件头判断
         try:
-            with open(file_path, 'rb') as f:
-                header = f.read(8)
-                
-                # 遍历所有文件类型，检查文件头
-                for file_type, specs in FILE_TYPE_MAP.items():
-                    check_func = specs.get('check')
-                    if check_func and check_func(header):
-                        return file_type
+            if header is None:
+                with open(file_path, 'rb') as f:
+                    header = f.read(8)
+            
+            # 遍历所有文件类型，检查文件头
+            for file_type, specs in FILE_TYPE_MAP.items():
+                check_func = specs.get('check')
+                if check_func and check_func(header):
+                    return file_type
         except Exception as e:
             current_app.logger.error(f"检测文件类型时出错: {str(e)}")
         
@@ -589,6 +742,7 @@ class FileService:
                             zip_ref.extract(zip_info, extract_to)
             
             elif file_type == 'rar':
+                import rarfile
                 with rarfile.RarFile(archive_path, 'r') as rar_ref:
                     # 处理编码问题
                     for rar_info in rar_ref.infolist():
@@ -638,7 +792,7 @@ class FileService:
             file: 上传的文件对象
             
         Returns:
-            转换成功返回转换后的文件对象列表，失败返回空列表
+            转换成功返回转换文件ID列表，失败返回空列表
         """
         return FileService._convert_file_generic(file, "pdf")
 
@@ -651,7 +805,7 @@ class FileService:
             file: 上传的文件对象
             
         Returns:
-            转换成功返回转换后的文件对象列表，失败返回空列表
+            转换成功返回转换文件ID列表，失败返回空列表
         """
         return FileService._convert_file_generic(file, "docx")
 
@@ -664,7 +818,7 @@ class FileService:
             file: 上传的文件对象
             
         Returns:
-            转换成功返回转换后的文件对象列表，失败返回空列表
+            转换成功返回转换文件ID列表，失败返回空列表
         """
         return FileService._convert_file_generic(file, "pptx")
             
@@ -677,7 +831,7 @@ class FileService:
             file: 上传的文件对象
             
         Returns:
-            转换成功返回转换后的文件对象，失败返回None
+            转换成功返回转换文件ID，失败返回None
         """
         converted_files = FileService._convert_file_generic(file, "image")
         if converted_files and len(converted_files) > 0:
@@ -695,17 +849,18 @@ class FileService:
             file_type: 文件类型 (pdf, docx, pptx, image)
             
         Returns:
-            转换成功返回转换后的文件对象列表，失败返回空列表
+            转换成功返回转换文件ID列表，失败返回空列表
         """
         current_app.logger.info(f"开始转换{file_type}文件: {file.filename}")
         
-        # 使用convert_to_images进行转换
+        # 使用convert_to_images进行转换，订单只解析一次
         output_urls = FileService.convert_to_images(
             file_path=file.file_path,
             output_dir=None,  # 不再使用本地输出目录
             file_type=file_type,
             source_hash=file.file_hash,
-            order_id=file.order_id
+            order_id=file.order_id,
+            order=OrderRepository.get_context(file.order_id)
         )
         
         # 保存转换后的文件记录
@@ -720,226 +875,150 @@ class FileService:
 
     # 新增方法：提取并转换压缩包中的文件
     @staticmethod
-    @log_exceptions("提取并转换压缩包时出错", default_return=[])
-    def extract_and_convert_archive(file, depth=0, max_depth=3):
-        """提取压缩包中的文件并转换
+    @log_exceptions("提取并转换压缩包时出错", default_return=([], '提取并转换压缩包时出错'))
+    def extract_and_convert_archive(file, max_depth=None, order=None):
+        """流式解压压缩包（含嵌套压缩包）并转换其中的文件
+        
+        成员在解压的同时计算哈希，每解压出一批可转换文件即提交转换，
+        与后续成员的解压并行进行；嵌套压缩包在同一次遍历中展开。
+        解压中途出错（如超出成员数或解压大小限制）时停止解压，已转换的文件照常保存记录，
+        不会在转换目录中留下没有记录的PNG，同时通过错误信息告知调用方压缩包未完整处理。
         
         Args:
-            file: 上传的文件对象（压缩包）或内部压缩包的路径
-            depth: 当前处理的嵌套深度，用于限制递归
-            max_depth: 最大允许的递归深度，防止无限递归
+            file: 上传的文件对象（压缩包），或包含file_path、file_hash、filename、order_id的字典
+            max_depth: 最大嵌套深度，默认使用ARCHIVE_MAX_DEPTH
+            order: 已解析的订单快照（可选），未提供时按order_id获取
             
         Returns:
-            转换成功返回转换后的文件对象列表，失败返回空列表
+            (转换文件ID列表, 错误信息) 二元组，压缩包完整解压时错误信息为None
         """
-        # 防止过深的递归
-        if depth > max_depth:
-            current_app.logger.warning(f"达到最大递归深度 {max_depth}，停止处理更深层次的压缩包")
-            return []
-            
-        converted_files = []
-        
-        # 处理文件对象和字符串路径的情况
-        if isinstance(file, str):
-            file_path = file
-            file_hash = FileService.calculate_file_hash(file_path)
-            file_name = os.path.basename(file_path)
-            order_id = None
-            parent_id = None
-            parent_file_id = None
-            current_app.logger.info(f"处理内部压缩包: {file_name}, 嵌套深度: {depth}")
-        elif isinstance(file, dict):
-            # 处理自定义字典对象（内部压缩包）
+        import tempfile
+        from src.utils.archive_stream import iter_archive, ArchiveLimitError
+        
+        if isinstance(file, dict):
             file_path = file.get('file_path')
             file_hash = file.get('file_hash') or FileService.calculate_file_hash(file_path)
             file_name = file.get('filename') or os.path.basename(file_path)
             order_id = file.get('order_id')
-            parent_id = file.get('parent_id')
-            parent_file_id = file.get('id')
-            current_app.logger.info(f"处理内部压缩包: {file_name}, 嵌套深度: {depth}, 使用订单ID: {order_id}")
+            source_file_id = file.get('id')
         else:
-            # 处理数据库模型对象（顶层压缩包）
             file_path = file.file_path
             file_hash = file.file_hash
             file_name = file.filename
             order_id = file.order_id
-            parent_id = None
-            parent_file_id = getattr(file, 'id', None)
-            current_app.logger.info(f"开始处理压缩包: {file_name}, 嵌套深度: {depth}")
-
-        # 提取压缩包
-        extract_dir = FileService.extract_archive(file_path)
-        if not extract_dir:
-            raise RuntimeError(f"无法提取压缩包内容: {file_name}")
+            source_file_id = getattr(file, 'id', None)
+        current_app.logger.info(f"开始处理压缩包: {file_name}, 订单ID: {order_id}")
+        
+        # 转换服务不可用时不必解压
+        if not health_monitor.is_available(CONVERT_SERVICE):
+            current_app.logger.error(f"转换服务不可用，跳过压缩包: {file_name}")
+            return [], '转换服务不可用'
+        
+        work_dir = tempfile.mkdtemp(prefix='archive_')
+        members = []
+        errors = []
+        
+        def extracted_members():
+            """流式解压成员，出错时结束遍历而不是把异常抛给批量转换（已提交的批次仍需保存记录）"""
+            try:
+                yield from iter_archive(
+                    file_path, work_dir, FileService.detect_file_type,
+                    archive_type=FileService.detect_file_type(file_path),
+                    archive_hash=file_hash,
+                    max_depth=max_depth,
+                )
+            except ArchiveLimitError as e:
+                current_app.logger.error(f"压缩包超出限制，停止解压: {file_name}, 已解压 {len(members)} 个文件, {str(e)}")
+                errors.append(f"压缩包超出限制，仅处理了前 {len(members)} 个文件: {str(e)}")
+            except Exception as e:
+                current_app.logger.error(f"解压中断: {file_name}, 已解压 {len(members)} 个文件, 错误: {str(e)}")
+                errors.append(f"解压中断，仅处理了前 {len(members)} 个文件: {str(e)}")
+        
+        def pending_items():
+            """将解压出的成员转换为批量转换项"""
+            for member in extracted_members():
+                members.append(member)
+                zip_path = file_path
+                if member['archive_name']:
+                    zip_path = f"{file_path}/{member['archive_name']}"[:255]
+                current_app.logger.info(
+                    f"待转换文件: {member['name']}, 类型: {member['file_type']}, "
+                    f"嵌套深度: {member['depth']}, 哈希: {member['sha256'][:10]}..."
+                )
+                yield {
+                    'key': member['path'],
+                    'file_path': member['path'],
+                    'file_type': member['file_type'],
+                    'file_hash': member['sha256'],
+                    # 组合哈希值和所属压缩包内的序号，确保源文件ID唯一
+                    'source_id': f"{member['sha256'][:6]}-{member['index']}",
+                    'parent_id': member['parent_hash'],
+                    'source_file_id': source_file_id,  # 顶层压缩包的ID
+                    'from_zip': True,
+                    'zip_path': zip_path,
+                }
         
         try:
-            # 获取压缩包哈希值，用作父文件标识符
-            zip_hash = file_hash
-            
-            # 获取订单对象（如果适用）
-            order_number = None
-            if order_id is not None:
-                from src.services.order_service import OrderService
-                order = OrderService.get_order(order_id)
-                order_number = order.order_number if order else str(order_id)
-                current_app.logger.info(f"压缩包关联订单: {order_number}")
+            converted_files, results = FileService.batch_convert_items(pending_items(), order_id=order_id, order=order)
             
-            # 遍历提取的文件
-            file_counter = 1  # 添加计数器确保文件名唯一
-            for root, dirs, files in os.walk(extract_dir):
-                for filename in files:
-                    # 跳过隐藏文件和系统文件
-                    if filename.startswith('.') or filename.startswith('__'):
-                        current_app.logger.info(f"跳过隐藏/系统文件: {filename}")
-                        continue
-                        
-                    # 获取文件完整路径
-                    inner_file_path = os.path.join(root, filename)
-                    
-                    # 计算文件哈希值，用于生成源文件标识符
-                    inner_file_hash = FileService.calculate_file_hash(inner_file_path)
-                    if inner_file_hash:
-                        current_app.logger.info(f"文件哈希值: {inner_file_hash[:10]}...")
-                    
-                    # 生成唯一源文件ID，组合哈希值和计数器
-                    source_id = f"{inner_file_hash[:6]}-{file_counter}" if inner_file_hash else f"file-{file_counter}"
-                    current_app.logger.info(f"生成唯一ID: {source_id} (文件 {file_counter}/{len(files)})")
-                    file_counter += 1
-                    
-                    # 检测文件类型
-                    file_type = FileService.detect_file_type(inner_file_path)
-                    current_app.logger.info(f"检测文件类型: {inner_file_path} -> {file_type}")
-                    
-                    # 处理嵌套压缩包
-                    if file_type in ['zip', 'rar'] and depth < max_depth:
-                        current_app.logger.info(f"发现嵌套压缩包: {filename}, 开始递归处理 (深度 {depth+1})")
-                        
-                        # 在递归处理内部压缩包前，创建一个内部压缩包的临时文件记录对象
-                        inner_archive = {
-                            'file_path': inner_file_path,
-                            'file_hash': inner_file_hash,
-                            'filename': filename,
-                            'order_id': order_id,  # 传递原始订单ID
-                            'id': None  # 内部压缩包没有数据库ID
-                        }
-                        
-                        # 修改：递归处理内部压缩包时传递父压缩包的order_id
-                        # 创建包含order_id的自定义对象，确保传递订单ID到内部压缩包处理
-                        inner_file_with_order = {
-                            'file_path': inner_file_path,
-                            'file_hash': inner_file_hash,
-                            'filename': filename,
-                            'order_id': order_id  # 传递原始订单ID
-                        }
-                        inner_results = FileService.extract_and_convert_archive(inner_file_with_order, depth + 1, max_depth)
-                        
-                        if inner_results and len(inner_results) > 0:
-                            # 这里我们不需要在内部压缩包处理时将结果添加到converted_files
-                            # 内部压缩包处理完成后会返回处理结果，我们只需要记录和报告一下
-                            current_app.logger.info(f"内部压缩包 {filename} 处理完成，生成了 {len(inner_results)} 个转换文件")
-                            
-                            # 只有在最外层调用（depth=0）时才将结果添加到数据库记录
-                            if depth == 0 and order_id is not None:
-                                # 更新文件记录的层次关系
-                                for inner_file in inner_results:
-                                    # 这里我们可以添加一些元数据，如嵌套路径信息
-                                    pass
-                                                    
-                                # 添加到总结果集
-                                converted_files.extend(inner_results)
-                        else:
-                            current_app.logger.warning(f"内部压缩包 {filename} 处理未返回任何结果")
-                    
-                    # 处理常规可转换文件
-                    elif file_type in ['pdf', 'docx', 'pptx', 'image']:
-                        current_app.logger.info(f"转换文件: {filename}, 类型: {file_type}, 使用源ID: {source_id}, 父ID: {zip_hash}")
-                        
-                        # 使用转换工具处理文件
-                        converted_urls = FileService.convert_to_images(
-                            inner_file_path,
-                            file_type=file_type,
-                            source_hash=source_id, 
-                            order_id=order_id,
-                            parent_id=zip_hash
-                        )
-                        
-                        # 保存转换后的文件记录（仅当有订单ID且在最外层时）
-                        if converted_urls and len(converted_urls) > 0:
-                            current_app.logger.info(f"文件 {filename} 成功转换为 {len(converted_urls)} 个文件")
-                            
-                            # 只有在有订单ID且处于最外层压缩包处理时才保存到数据库
-                            if order_id is not None and depth == 0:
-                                saved_files = FileService.save_converted_files_from_urls(
-                                    converted_urls,
-                                    order_id,
-                                    parent_file_id,  # 原始压缩包的ID
-                                    source_hash=source_id,
-                                    from_zip=True,
-                                    zip_path=file_path
-                                )
-                                current_app.logger.info(f"成功保存 {len(saved_files)} 个转换后的文件记录")
-                                converted_files.extend(saved_files)
-                            # 如果是内部压缩包，保存转换结果到数据库（如果有order_id）或暂存结果
-                            elif depth > 0:
-                                # 如果内部压缩包处理时也有order_id，直接保存到数据库
-                                if order_id is not None:
-                                    saved_files = FileService.save_converted_files_from_urls(
-                                        converted_urls,
-                                        order_id,
-                                        parent_file_id,  # 可能为None
-                                        source_hash=source_id,
-                                        from_zip=True,
-                                        zip_path=file_path
-                                    )
-                                    current_app.logger.info(f"内部压缩包文件 {filename} 成功保存 {len(saved_files)} 个转换后的文件记录")
-                                    converted_files.extend(saved_files)
-                                else:
-                                    # 如果没有order_id，则创建临时对象（老行为，理论上不应该发生）
-                                    current_app.logger.warning(f"内部压缩包文件 {filename} 没有order_id，只能暂存结果")
-                                    for url in converted_urls:
-                                        # 创建临时对象以便于外部处理
-                                        temp_file = {
-                                            'filename': os.path.basename(url),
-                                            'file_path': url,
-                                            'source_hash': source_id,
-                                            'parent_hash': zip_hash,
-                                            'from_nested_zip': True,
-                                            'nested_level': depth,
-                                            'original_filename': filename,
-                                            'original_path': inner_file_path
-                                        }
-                                        converted_files.append(temp_file)
-                        else:
-                            current_app.logger.error(f"文件 {filename} 转换失败，未生成任何URL")
-                    else:
-                        current_app.logger.info(f"跳过不支持的文件类型: {filename} ({file_type})")
+            for member in members:
+                result = results.get(member['path'], {})
+                if not result.get('success'):
+                    current_app.logger.error(f"文件 {member['name']} 转换失败: {result.get('error')}")
+                    continue
                 
-            return converted_files
+                current_app.logger.info(f"文件 {member['name']} 成功转换为 {len(result['urls'])} 个文件")
                 
+                # 没有order_id时创建临时对象（老行为，理论上不应该发生）
+                if order_id is None:
+                    current_app.logger.warning(f"压缩包文件 {member['name']} 没有order_id，只能暂存结果")
+                    for url in result['urls']:
+                        converted_files.append({
+                            'filename': os.path.basename(url),
+                            'file_path': url,
+                            'source_hash': f"{member['sha256'][:6]}-{member['index']}",
+                            'parent_hash': member['parent_hash'],
+                            'from_nested_zip': member['depth'] > 0,
+                            'nested_level': member['depth'],
+                            'original_filename': os.path.basename(member['name']),
+                            'original_path': member['name']
+                        })
+            
+            current_app.logger.info(
+                f"压缩包处理完成: {file_name}, 共 {len(members)} 个可转换文件, 生成 {len(converted_files)} 个转换文件"
+            )
+            return converted_files, errors[0] if errors else None
+        
         finally:
-            # 清理临时提取目录
-            if extract_dir and os.path.exists(extract_dir):
-                try:
-                    shutil.rmtree(extract_dir)
-                    current_app.logger.info(f"已清理临时提取目录: {extract_dir}")
-                except Exception as e:
-                    current_app.logger.error(f"清理临时提取目录时出错: {str(e)}")
+            # 清理解压工作目录
+            try:
+                shutil.rmtree(work_dir)
+                current_app.logger.info(f"已清理解压工作目录: {work_dir}")
+            except Exception as e:
+                current_app.logger.error(f"清理解压工作目录时出错: {str(e)}")
 
     @staticmethod
-    def archive_file(file_path, category="general", description=None, tags=None):
-        """将文件归档到归档服务
+    def schedule_archive_uploads(files):
+        """在后台线程中把上传的文件流式推送到归档服务
+        
+        先用一个请求批量预检哈希，只上传归档服务中还没有的内容。
         
         Args:
-            file_path: 文件路径
-            category: 文件分类
-            description: 文件描述
-            tags: 文件标签列表
-            
-        Returns:
-            归档成功返回归档文件信息字典，否则返回None
+            files: (文件路径, SHA-256) 二元组列表
+        """
+        app = current_app._get_current_object()
+        _archive_executor().submit(_upload_to_archive, app, list(files))
+    
+    @staticmethod
+    def schedule_local_archive(file_path, archive_path):
+        """在后台线程中把文件复制到本地归档目录（归档服务不可用时的备用方案）
+        
+        Args:
+            file_path: 源文件路径
+            archive_path: 本地归档路径
         """
-        # 调用归档服务
-        return ArchiveService.archive_file(file_path, category, description, tags)
+        app = current_app._get_current_object()
+        _archive_executor().submit(_copy_to_local_archive, app, file_path, archive_path)
 
     @staticmethod
     def get_file_by_hash(file_hash):
@@ -954,99 +1033,98 @@ class FileService:
         return ArchiveService.get_file_by_hash(file_hash)
 
     @staticmethod
-    def download_archived_file(file_id, target_path=None):
-        """从归档服务下载文件
+    def get_files_by_hash(hashes):
+        """根据文件哈希值批量获取文件信息
         
         Args:
-            file_id: 归档文件ID
-            target_path: 目标保存路径，如果为None则使用临时目录
+            hashes: 文件哈希值列表
             
         Returns:
-            下载成功返回文件路径，否则返回None
+            已找到的哈希值到文件信息字典的映射，归档服务不可用时返回None
         """
-        return ArchiveService.download_file(file_id, target_path)
+        return ArchiveService.get_files_by_hash(hashes)
 
     @staticmethod
-    def store_file(uploaded_file, file_dir, file_type=None, filename=None):
+    def restore_uploaded_file(file):
+        """本地上传文件丢失时从归档服务按哈希恢复
+        
+        并发请求的哈希查询会合并为一个批量请求。
+        
+        Args:
+            file: 上传文件对象
+            
+        Returns:
+            文件存在或恢复成功返回True，否则返回False
         """
-        存储上传的文件
+        if os.path.exists(file.file_path):
+            return True
+        if not file.file_hash:
+            return False
+        
+        archived = FileService.get_file_by_hash(file.file_hash)
+        return bool(archived) and FileService._restore_from_archive(file, archived)
+
+    @staticmethod
+    def restore_uploaded_files(files):
+        """批量恢复本地丢失的上传文件（每 ARCHIVE_HASH_BATCH_MAX_SIZE 个哈希一个查询请求）
         
         Args:
-            uploaded_file: 上传的文件对象
-            file_dir: 文件存储目录
-            file_type: 文件类型（可选）
-            filename: 自定义文件名（可选）
+            files: 上传文件对象列表
             
         Returns:
-            存储后的文件信息字典
+            恢复成功的文件数
         """
+        missing = [file for file in files if file.file_hash and not os.path.exists(file.file_path)]
+        if not missing:
+            return 0
+        
+        archived = FileService.get_files_by_hash([file.file_hash for file in missing]) or {}
+        restored = sum(
+            1 for file in missing
+            if file.file_hash in archived and FileService._restore_from_archive(file, archived[file.file_hash])
+        )
+        current_app.logger.info(f"从归档服务恢复上传文件: {restored}/{len(missing)}")
+        return restored
+
+    @staticmethod
+    def _restore_from_archive(file, archived):
+        """下载归档文件到临时路径，校验哈希后替换到记录的本地路径"""
+        part_path = f"{file.file_path}.{uuid.uuid4().hex[:8]}.part"
         try:
-            if filename is None:
-                filename = secure_filename(uploaded_file.filename)
-            
-            # 确保文件目录存在
-            os.makedirs(file_dir, exist_ok=True)
-            
-            # 生成唯一文件名
-            unique_filename = f"{int(time.time())}_{filename}"
-            file_path = os.path.join(file_dir, unique_filename)
-            
-            # 保存文件
-            uploaded_file.save(file_path)
-            
-            # 计算文件哈希值
-            file_hash = FileService.calculate_file_hash(file_path)
-            
-            # 尝试归档文件
-            archive_result = FileService.archive_file(file_path, 
-                                                    category="uploads", 
-                                                    description=f"上传于 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            
-            # 如果归档成功，使用归档路径作为备份
-            if archive_result and archive_result.get("success"):
-                archived_path = archive_result.get("stored_path")
-                archived_hash = archive_result.get("file_hash")
-                archived_id = archive_result.get("file_id")
-                current_app.logger.info(f"文件已归档: {archived_path}, ID: {archived_id}")
-            else:
-                archived_path = None
-                archived_hash = None
-                archived_id = None
-                
-                # 仅当归档失败时才复制到归档目录
-                # 创建归档文件夹（按日期分类）
-                archive_folder = os.path.join(
-                    current_app.config['ARCHIVE_FOLDER'], 
-                    datetime.now().strftime('%Y-%m-%d')
-                )
-                os.makedirs(archive_folder, exist_ok=True)
-                archive_path = os.path.join(archive_folder, unique_filename)
-                
-                # 复制文件到归档目录
-                shutil.copy2(file_path, archive_path)
-                current_app.logger.info(f"文件已本地归档: {archive_path}")
-            
-            # 创建文件记录
-            file_data = {
-                'filename': filename,
-                'file_path': file_path,
-                'file_type': file_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream',
-                'file_hash': file_hash,
-                'archived_path': archived_path,
-                'archived_hash': archived_hash or file_hash,
-                'archived_id': archived_id
-            }
-            
-            # 不再创建数据库记录，只返回文件信息
-            return file_data
+            os.makedirs(os.path.dirname(file.file_path), exist_ok=True)
+            if not ArchiveService.download_file(archived['id'], part_path):
+                return False
+            if hash_cache.get_hash(part_path) != file.file_hash:
+                current_app.logger.error(f"恢复的文件哈希不一致: {file.file_path}, 归档ID: {archived['id']}")
+                return False
+            os.replace(part_path, file.file_path)
+        except OSError as e:
+            current_app.logger.error(f"恢复上传文件失败: {file.file_path}, 错误: {str(e)}")
+            return False
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
         
-        except Exception as e:
-            current_app.logger.error(f"存储文件时出错: {str(e)}")
-            raise e
+        hash_cache.put(file.file_path, file.file_hash)
+        current_app.logger.info(f"已从归档服务恢复上传文件: {file.file_path}, 归档ID: {archived['id']}")
+        return True
+
+    @staticmethod
+    def download_archived_file(file_id, target_path=None):
+        """从归档服务下载文件
+        
+        Args:
+            file_id: 归档文件ID
+            target_path: 目标保存路径，如果为None则使用临时目录
+            
+        Returns:
+            下载成功返回文件路径，否则返回None
+        """
+        return ArchiveService.download_file(file_id, target_path)
 
     @staticmethod
     @log_exceptions("转换文件时出错", default_return=[])
-    def convert_to_images(file_path, output_dir=None, file_type="pdf", page_start=None, page_end=None, source_hash=None, order_id=None, parent_id=None):
+    def convert_to_images(file_path, output_dir=None, file_type="pdf", page_start=None, page_end=None, source_hash=None, order_id=None, parent_id=None, order=None):
         """转换文件为图像
         
         Args:
@@ -1058,6 +1136,7 @@ class FileService:
             source_hash: 源文件哈希值
             order_id: 订单ID
             parent_id: 父文件ID（如压缩包）
+            order: 已解析的订单快照（可选），未提供时按order_id获取
             
         Returns:
             转换后的文件URL列表
@@ -1068,14 +1147,11 @@ class FileService:
             f"source_hash={source_hash}, order_id={order_id}, parent_id={parent_id}"
         )
         
-        # 获取转换客户端
-        from src.utils.convert_client import ConvertClient
-        convert_client = ConvertClient(current_app.config.get('CONVERT_API'))
-        
-        # 检查健康状态
-        if not convert_client.health_check():
+        # 检查健康状态（读取后台监控的缓存状态，熔断时快速失败）
+        if not health_monitor.is_available(CONVERT_SERVICE):
             current_app.logger.error("转换服务不可用")
-            flash("转换服务不可用", "danger")
+            if has_request_context():
+                flash("转换服务不可用", "danger")
             return []
             
         # 确保源文件哈希值有效 
@@ -1084,18 +1160,7 @@ class FileService:
             current_app.logger.info(f"生成源文件哈希: {source_hash}")
         
         # 重要：使用订单号而不是订单ID
-        order_dir_name = None
-        if order_id is not None:
-            # 获取订单号
-            from src.services.order_service import OrderService
-            order = OrderService.get_order(int(order_id))
-            if order:
-                order_dir_name = order.order_number
-                current_app.logger.info(f"使用订单号作为目录: {order_dir_name}")
-            else:
-                # 如果找不到订单，使用ID作为备用
-                order_dir_name = str(order_id)
-                current_app.logger.warning(f"找不到订单ID {order_id}，使用ID作为目录")
+        order_dir_name = FileService.order_dir_name(order_id, order)
         
         # 准备调用参数
         kwargs = {
@@ -1115,6 +1180,13 @@ class FileService:
             current_app.logger.error(f"不支持的文件类型: {file_type}")
             return []
             
+        # 相同内容、类型和DPI已转换过时，直接链接已有PNG
+        cache_key = FileService.conversion_cache_key(file_path, file_type, kwargs.get('dpi'))
+        if cache_key:
+            cached_urls = FileService.link_cached_conversion(cache_key, order_dir_name)
+            if cached_urls:
+                return cached_urls
+            
         # 调用适当的转换方法
         urls = converter(convert_client, file_path, **kwargs)
         
@@ -1129,4 +1201,484 @@ class FileService:
         
         # 记录转换结果
         current_app.logger.info(f"文件转换成功: {file_path} -> {len(urls)} 个文件")
-        return urls 
\ No newline at end of file
+        if cache_key:
+            FileService.remember_conversion(cache_key, urls)
+        return urls
+
+    @staticmethod
+    def order_dir_name(order_id, order=None):
+        """转换服务输出目录名（使用订单号而不是订单ID）
+        
+        Args:
+            order_id: 订单ID
+            order: 已解析的订单快照（可选），未提供时按order_id获取（同一请求/任务内只查询一次）
+            
+        Returns:
+            订单号，找不到订单时使用ID作为备用，order_id为None时返回None
+        """
+        if order_id is None:
+            return None
+        if order is None:
+            order = OrderRepository.get_context(order_id)
+        if order:
+            current_app.logger.debug(f"使用订单号作为目录: {order.order_number}")
+            return order.order_number
+        # 如果找不到订单，使用ID作为备用
+        current_app.logger.warning(f"找不到订单ID {order_id}，使用ID作为目录")
+        return str(order_id)
+    
+    @staticmethod
+    def conversion_cache_key(file_path, file_type, dpi=None, file_hash=None):
+        """生成转换缓存键 (源文件SHA-256, 文件类型, DPI, 转换器版本)
+        
+        Args:
+            file_path: 源文件路径
+            file_type: 文件类型 (pdf, docx, pptx, image)
+            dpi: 输出DPI，图片转换忽略
+            file_hash: 已知的源文件SHA-256（如解压时已计算），提供时不再读取文件
+            
+        Returns:
+            缓存键，缓存关闭或无法计算哈希时返回None
+        """
+        if not current_app.config.get('CONVERSION_CACHE_ENABLED', True):
+            return None
+        file_hash = file_hash or FileService.calculate_file_hash(file_path)
+        if not file_hash:
+            return None
+        return conversion_cache.make_key(file_hash, file_type, None if file_type == 'image' else dpi)
+    
+    @staticmethod
+    def link_cached_conversion(cache_key, order_dir_name):
+        """转换缓存命中时，将已有PNG链接到订单目录
+        
+        Args:
+            cache_key: 转换缓存键
+            order_dir_name: 目标订单号（转换服务的订单目录）
+            
+        Returns:
+            链接后的文件URL列表，未命中或链接失败返回None
+        """
+        files = conversion_cache.get(cache_key)
+        if not files:
+            return None
+        
+        urls = convert_client.link_files(files, order_id=order_dir_name)
+        if not urls:
+            # 源PNG已被删除或重命名，缓存条目失效
+            current_app.logger.info(f"转换缓存条目已失效: {cache_key}")
+            conversion_cache.invalidate(cache_key)
+            return None
+        
+        current_app.logger.info(f"转换缓存命中: {cache_key} -> {len(urls)} 个文件")
+        return urls
+    
+    @staticmethod
+    def remember_conversion(cache_key, urls):
+        """记录转换结果，供相同内容的文件复用
+        
+        Args:
+            cache_key: 转换缓存键
+            urls: 转换服务返回的文件URL列表
+        """
+        conversion_cache.put(cache_key, [convert_client.relative_path(url) for url in urls])
+
+    @staticmethod
+    def batch_convert_items(items, order_id=None, order=None):
+        """通过 /api/convert-batch 批量转换文件，并以单个事务保存转换记录
+        
+        文件按 CONVERT_BATCH_SIZE 分批，以 CONVERT_BATCH_CONCURRENCY 的并发度发送，
+        单个文件失败只影响该文件，不影响同批或整个订单的其他文件。
+        items可以是生成器（如流式解压）：每凑满一批立即提交，
+        转换与后续文件的产出同时进行；进行中的批次过多时暂停读取items。
+        
+        Args:
+            items: 转换项列表或可迭代对象，每项为字典，包含以下字段:
+                  - key: 调用方用于识别结果的键（如上传文件ID）
+                  - file_path: 文件路径(必须)
+                  - file_type: 文件类型 (pdf, docx, pptx, image)
+                  - file_hash: 源文件SHA-256(可选，提供时不再重新计算)
+                  - source_id: 源文件标识符(可选)
+                  - parent_id: 父文件标识符(可选)
+                  - source_file_id / from_zip / zip_path: 转换记录字段(可选)
+            order_id: 订单ID，为None时只转换不保存记录
+            order: 已解析的订单快照（可选），未提供时按order_id获取
+            
+        Returns:
+            (转换文件ID列表, 结果字典) 二元组，结果字典的键为item的key，
+            值包含 success、urls、error
+        """
+        results = {}
+        
+        # 转换服务不可用时快速失败，逐个标记失败
+        if not health_monitor.is_available(CONVERT_SERVICE):
+            current_app.logger.error("转换服务不可用，跳过批量转换")
+            for item in items:
+                results[item['key']] = {'success': False, 'urls': [], 'error': '转换服务不可用'}
+            return [], results
+        
+        # 使用订单号作为转换服务的输出目录
+        order_dir_name = FileService.order_dir_name(order_id, order)
+        
+        dpi = current_app.config.get('CONVERT_DPI', 150)
+        batch_size = max(current_app.config.get('CONVERT_BATCH_SIZE', 4), 1)
+        concurrency = max(current_app.config.get('CONVERT_BATCH_CONCURRENCY', 4), 1)
+        
+        # 已提交但未完成的批次数上限，超出时暂停读取items，限制待转换文件的堆积
+        in_flight = threading.BoundedSemaphore(concurrency * 2)
+        
+        def submit(executor, batch):
+            in_flight.acquire()
+            # 工作线程只做网络调用，不访问数据库
+            future = executor.submit(convert_client.batch_convert, batch, order_id=order_dir_name)
+            future.add_done_callback(lambda _: in_flight.release())
+            submitted.append((batch, future))
+        
+        by_path = {}
+        outcomes = []  # (item, source_id, urls, error)
+        submitted = []  # (batch, future)
+        pending = []
+        total = 0
+        hits = 0
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for item in items:
+                total += 1
+                file_hash = item.get('file_hash')
+                source_id = item.get('source_id')
+                if not source_id:
+                    file_hash = file_hash or FileService.calculate_file_hash(item['file_path'])
+                    source_id = file_hash[:6] if file_hash else None
+                
+                file_config = {'file_path': item['file_path']}
+                if source_id:
+                    file_config['source_id'] = source_id
+                if item.get('parent_id'):
+                    file_config['parent_id'] = item['parent_id']
+                if item.get('file_type') in ['pdf', 'docx', 'pptx']:
+                    file_config['dpi'] = dpi
+                
+                # 转换缓存命中时直接链接已有PNG，不再发送给转换服务
+                cache_key = FileService.conversion_cache_key(
+                    item['file_path'], item.get('file_type'), file_config.get('dpi'), file_hash=file_hash
+                )
+                cached_urls = FileService.link_cached_conversion(cache_key, order_dir_name) if cache_key else None
+                if cached_urls:
+                    hits += 1
+                    outcomes.append((item, source_id, cached_urls, None))
+                    continue
+                
+                by_path[item['file_path']] = (item, source_id, cache_key)
+                pending.append(file_config)
+                if len(pending) >= batch_size:
+                    submit(executor, pending)
+                    pending = []
+            
+            if pending:
+                submit(executor, pending)
+            
+            current_app.logger.info(
+                f"批量转换 {len(by_path)} 个文件（缓存命中 {hits} 个）: "
+                f"{len(submitted)} 批, 每批最多 {batch_size} 个, 并发 {concurrency}"
+            )
+            
+            for batch, future in submitted:
+                batch_result = future.result()
+                for file_config in batch:
+                    item, source_id, cache_key = by_path[file_config['file_path']]
+                    file_result = batch_result.get(file_config['file_path'])
+                    
+                    if not file_result:
+                        error = '转换服务未返回该文件的结果'
+                    elif not file_result.get('success'):
+                        error = file_result.get('error') or '转换失败'
+                    elif not file_result.get('files'):
+                        error = '转换结果为空'
+                    else:
+                        error = None
+                    
+                    if error:
+                        outcomes.append((item, source_id, None, error))
+                    else:
+                        if cache_key:
+                            FileService.remember_conversion(cache_key, file_result['files'])
+                        outcomes.append((item, source_id, file_result['files'], None))
+        
+        if not total:
+            return [], {}
+        
+        rows = []
+        for item, source_id, urls, error in outcomes:
+            if error:
+                current_app.logger.error(f"文件转换失败: {item['file_path']}, 错误: {error}")
+                results[item['key']] = {'success': False, 'urls': [], 'error': error}
+                continue
+            
+            results[item['key']] = {'success': True, 'urls': urls, 'error': None}
+            
+            if order_id is not None:
+                rows.extend(FileService.converted_file_rows(
+                    urls, order_id, item.get('source_file_id'), source_id,
+                    item.get('from_zip', False), item.get('zip_path')
+                ))
+        
+        # 所有转换记录在一个事务中保存，随后在后台预生成缩略图
+        converted_files = FileRepository.create_converted_files(rows)
+        RenditionService.schedule_pregenerate(converted_files)
+        
+        succeeded = sum(1 for r in results.values() if r['success'])
+        current_app.logger.info(
+            f"批量转换完成: 成功 {succeeded}/{total} 个文件, 保存 {len(converted_files)} 条转换记录"
+        )
+        return converted_files, results
+
+    @staticmethod
+    def convert_uploaded_files(files, order=None):
+        """批量转换同一订单中的上传文件
+        
+        Args:
+            files: (上传文件对象, 文件类型) 元组列表，文件类型为 pdf、docx、pptx、image
+            order: 已解析的订单快照（可选）
+            
+        Returns:
+            (转换文件ID列表, 结果字典) 二元组，结果字典的键为上传文件ID
+        """
+        if not files:
+            return [], {}
+        
+        items = [
+            {
+                'key': file.id,
+                'file_path': file.file_path,
+                'file_type': file_type,
+                'source_id': file.file_hash[:6] if file.file_hash else None,
+                'source_file_id': file.id,
+            }
+            for file, file_type in files
+        ]
+        return FileService.batch_convert_items(items, order_id=files[0][0].order_id, order=order)
+
+    
+    @staticmethod
+    def categorize_converted_files(items):
+        """批量分类转换文件：按分类重命名并更新记录
+        
+        同一订单的文件只查询一次订单和已有文件，一次性计算全部新文件名，
+        通过一次 /api/rename-batch 调用重命名，并在一个事务中更新数据库记录和写入归档服务事件。
+        新文件名为 "{分类}_{序号}_{订单号后8位}{扩展名}"，序号按订单中已有的同分类文件递增。
+        
+        Args:
+            items: 分类项列表，每项为字典，包含 file_uuid（或旧字段file_id，值为转换文件ID或文件名）
+                   和 category
+                   
+        Returns:
+            结果列表，与items顺序一致
+        """
+        results = [None] * len(items)
+        
+        # 解析请求项：数字按ID查询，其余及ID未命中的按文件名查询（兼容旧接口）
+        requested = []  # (index, file_uuid, category)
+        for index, file_item in enumerate(items):
+            file_uuid = file_item.get('file_uuid') or file_item.get('file_id')
+            category = file_item.get('category')
+            if not file_uuid or not category:
+                results[index] = {"file_uuid": file_uuid, "success": False, "message": "缺少文件UUID或分类信息"}
+                continue
+            requested.append((index, str(file_uuid), category))
+        
+        by_id = {
+            str(f.id): f for f in FileRepository.get_converted_files_by_ids(
+                int(key) for _, key, _ in requested if key.isdigit()
+            )
+        }
+        by_filename = {
+            f.filename: f for f in FileRepository.get_converted_files_by_filenames(
+                key for _, key, _ in requested if key not in by_id
+            )
+        }
+        
+        groups = {}  # order_id -> [(index, file_uuid, category, file_record)]
+        for index, file_uuid, category in requested:
+            file_record = by_id.get(file_uuid) or by_filename.get(file_uuid)
+            if not file_record:
+                current_app.logger.error(f"文件记录不存在: {file_uuid}")
+                results[index] = {"file_uuid": file_uuid, "success": False, "message": "文件记录不存在"}
+                continue
+            groups.setdefault(file_record.order_id, []).append((index, file_uuid, category, file_record))
+        
+        renamed = []  # (index, file_uuid, category, file_record, 新文件名, 原路径, 新URL)
+        for order_id, group in groups.items():
+            renamed.extend(FileService._rename_order_files(order_id, group, results))
+        
+        # 提交后ORM对象过期，先取出后续需要的字段，避免逐个重新加载
+        renamed = [
+            (index, file_uuid, category, file_record.id, file_record.order_id, file_record.file_path,
+             new_name, original_path, new_url)
+            for index, file_uuid, category, file_record, new_name, original_path, new_url in renamed
+        ]
+        updates = {
+            file_id: {'filename': new_name, 'file_path': new_url, 'category': category}
+            for _, _, category, file_id, _, _, new_name, _, new_url in renamed
+        }
+        
+        # 所有记录在一个事务中更新，归档服务的重命名事件写入发件箱并随同一事务提交
+        try:
+            OutboxService.add_events(EVENT_RENAME, [
+                {"file_id": file_id, "order_id": order_id, "old_url": old_url, "new_url": new_url}
+                for _, _, _, file_id, order_id, old_url, _, _, new_url in renamed
+            ])
+            FileRepository.update_converted_files(updates)
+        except Exception as e:
+            current_app.logger.error(f"更新数据库失败: {str(e)}")
+            for index, file_uuid, *_ in renamed:
+                results[index] = {"file_uuid": file_uuid, "success": False, "message": f"更新数据库失败: {str(e)}"}
+            return results
+        
+        for order_id in {entry[4] for entry in renamed}:
+            BundleService.invalidate(order_id)
+        
+        for index, file_uuid, category, file_id, order_id, old_url, new_name, original_path, new_url in renamed:
+            artifact_cache.invalidate(original_path)
+            current_app.logger.info(f"已将文件 (ID: {file_id}) 分类为 '{category}'，新路径: {new_url}")
+            results[index] = {
+                "file_uuid": str(file_id),  # 始终返回数据库ID作为唯一标识
+                "old_id": file_uuid,        # 返回原始传入的ID用于前端匹配
+                "success": True,
+                "message": "文件分类成功",
+                "new_url": new_url,
+                "category": category,
+                "display_name": new_name
+            }
+        
+        return results
+    
+    @staticmethod
+    def _rename_order_files(order_id, group, results):
+        """为同一订单的文件计算新文件名并批量重命名
+        
+        Args:
+            order_id: 订单ID
+            group: [(index, file_uuid, category, file_record)]
+            results: 结果列表，重命名失败的项直接写入
+            
+        Returns:
+            重命名成功的项 [(index, file_uuid, category, file_record, 新文件名, 原路径, 新URL)]
+        """
+        order = OrderRepository.get_context(order_id)
+        order_number = order.order_number if order else None
+        
+        # 获取订单号的短标识（取最后8位或更少）
+        order_suffix = order_number[-8:] if order_number else ""
+        
+        # 订单当前的文件名，按文件名前缀统计各分类已有的文件数
+        filenames = {f.id: f.filename for f in FileRepository.get_converted_files_by_order(order_id)}
+        prefixes = {category: f"{category}_" for _, _, category, _ in group}
+        counts = {
+            category: sum(1 for name in filenames.values() if name.startswith(prefix))
+            for category, prefix in prefixes.items()
+        }
+        
+        planned = []
+        for index, file_uuid, category, file_record in group:
+            # 保留原始文件扩展名
+            file_ext = os.path.splitext(file_record.filename)[1]
+            new_name = f"{category}_{counts[category] + 1}_{order_suffix}{file_ext}"
+            
+            # 文件改名后，原名称不再计入旧分类，新名称计入新分类
+            old_name = filenames.get(file_record.id, file_record.filename)
+            for other, prefix in prefixes.items():
+                counts[other] += new_name.startswith(prefix) - old_name.startswith(prefix)
+            filenames[file_record.id] = new_name
+            
+            # 数据库中记录的是公共URL，转换服务需要相对于转换目录的路径
+            original_path = file_record.file_path
+            if "/files/" in original_path:
+                filename_only = os.path.basename(urllib.parse.unquote(original_path))
+                original_path = f"{order_number}/{filename_only}"
+            
+            planned.append((index, file_uuid, category, file_record, new_name, original_path))
+        
+        current_app.logger.info(f"订单 {order_number} 批量重命名 {len(planned)} 个文件")
+        
+        def fail_all(message):
+            for index, file_uuid, *_ in planned:
+                results[index] = {"file_uuid": file_uuid, "success": False, "message": message}
+            return []
+        
+        try:
+            response = convert_client.rename_files(
+                [(original_path, new_name) for *_, new_name, original_path in planned],
+                order_id=order_number  # 使用订单号而不是订单ID
+            )
+        except Exception as e:
+            current_app.logger.error(f"调用重命名服务失败: {str(e)}")
+            return fail_all(f"调用重命名服务失败: {str(e)}")
+        
+        if response.status_code != 200:
+            current_app.logger.error(f"重命名服务返回错误: {response.status_code}, {response.text}")
+            return fail_all(f"调用重命名服务失败: {response.text}")
+        
+        rename_data = response.json()
+        item_results = rename_data.get('results') or []
+        if len(item_results) != len(planned):
+            return fail_all(f"重命名失败: {rename_data.get('message') or rename_data.get('error')}")
+        
+        renamed = []
+        for entry, item_result in zip(planned, item_results):
+            index, file_uuid = entry[0], entry[1]
+            if not item_result.get('success'):
+                results[index] = {"file_uuid": file_uuid, "success": False,
+                                  "message": f"重命名失败: {item_result.get('error')}"}
+                continue
+            renamed.append(entry + (item_result.get('new_url'),))
+        return renamed
+
+
+def _archive_executor():
+    """获取当前进程的归档后台线程池（fork后重新创建）"""
+    global _archiver, _archiver_pid
+    
+    with _archiver_lock:
+        if _archiver is None or _archiver_pid != os.getpid():
+            _archiver = ThreadPoolExecutor(
+                max_workers=max(current_app.config.get('ARCHIVE_UPLOAD_WORKERS', 2), 1),
+                thread_name_prefix='archive'
+            )
+            _archiver_pid = os.getpid()
+        return _archiver
+
+
+def _upload_to_archive(app, files):
+    """后台线程入口：批量预检哈希，再把归档服务中没有的文件逐个提交上传"""
+    with app.app_context():
+        existing = ArchiveService.have_hashes([file_hash for _, file_hash in files]) or {}
+        for file_path, file_hash in files:
+            if file_hash in existing:
+                app.logger.info(f"文件已存在于归档中，跳过上传: {file_path}, ID: {existing[file_hash]['id']}")
+                continue
+            _archive_executor().submit(_push_to_archive, app, file_path, file_hash)
+
+
+def _push_to_archive(app, file_path, file_hash):
+    """后台线程入口：流式上传文件到归档服务，失败时本地已有存档副本，只记录日志"""
+    with app.app_context():
+        # 已批量预检过，不再逐个预检；预检失败时由归档服务按sha256去重
+        result = ArchiveService.archive_file(
+            file_path,
+            category="uploads",
+            description=f"上传于 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            file_hash=file_hash,
+            precheck=False
+        )
+        if result:
+            app.logger.info(f"上传文件已归档: {file_path}, ID: {result['file_id']}")
+        else:
+            app.logger.warning(f"上传文件推送到归档服务失败，仅保留本地存档: {file_path}")
+
+
+def _copy_to_local_archive(app, file_path, archive_path):
+    """后台线程入口：复制文件到本地归档目录"""
+    try:
+        os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+        shutil.copy2(file_path, archive_path)
+        app.logger.info(f"文件已本地归档: {archive_path}")
+    except Exception as e:
+        app.logger.error(f"本地归档失败: {file_path} -> {archive_path}, 错误: {str(e)}")
@@ -0,0 +1,393 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+import multiprocessing
+
+from flask import current_app
+
+import src.settings as config
+from src.services.file_service import FileService
+from src.utils.convert_client import SERVICE_NAME as CONVERT_SERVICE
+from src.utils.health_monitor import health_monitor
+from src.services.bundle_service import BundleService
+from src.services.order_service import OrderService
+from src.utils.job_queue import job_queue
+
+logger = logging.getLogger(__name__)
+
+# 任务类型：转换订单中的文件
+JOB_CONVERT_FILES = 'convert_order_files'
+
+# worker空闲时的轮询间隔（秒）
+POLL_INTERVAL = 1.0
+
+# 当前进程的worker是否因转换服务不可用而暂停领取任务（仅用于在状态变化时记录日志）
+_deferring = False
+
+
+class JobError(Exception):
+    """任务部分或全部失败，需要重试"""
+
+
+class LeaseLostError(Exception):
+    """任务租约已被其他worker回收，当前worker应停止执行"""
+
+
+class LeaseKeeper:
+    """任务执行期间在后台线程中定期续约，续约失败（租约已被回收）后标记为lost
+
+    用法：
+        with LeaseKeeper(job_id, worker_id, interval) as lease:
+            ...
+            lease.update(progress)  # 续约并更新进度，租约已失效时抛出LeaseLostError
+    """
+
+    def __init__(self, job_id, worker_id, interval):
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self.lost = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'job-lease-{job_id}', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        """后台线程入口：每隔interval秒续约一次，直到任务结束或租约失效"""
+        while not self._stopped.wait(self.interval):
+            if not self.renew():
+                return
+
+    def renew(self, progress=None):
+        """续约（可同时更新进度）
+
+        Returns:
+            租约仍有效返回True；续约请求出错时保持原状态，下次再试
+        """
+        try:
+            renewed = job_queue.heartbeat(self.job_id, self.worker_id, progress)
+        except Exception as e:
+            logger.warning(f"任务续约失败: id={self.job_id}, 错误: {str(e)}")
+            return not self.lost.is_set()
+        if not renewed:
+            if not self.lost.is_set():
+                logger.warning(f"任务租约已被回收: id={self.job_id}, worker={self.worker_id}")
+            self.lost.set()
+        return renewed
+
+    def update(self, progress):
+        """续约并更新进度，租约已失效时抛出LeaseLostError以停止后续转换"""
+        if not self.renew(progress) or self.lost.is_set():
+            raise LeaseLostError(f"任务租约已失效: id={self.job_id}, worker={self.worker_id}")
+
+
+class JobService:
+    """后台任务服务类，负责提交、执行和查询文件转换任务"""
+
+    @staticmethod
+    def order_key_prefix(order_id):
+        """订单转换任务幂等键的公共前缀"""
+        return f"{JOB_CONVERT_FILES}:{order_id}:"
+
+    @staticmethod
+    def conversion_key(order_id, file_ids):
+        """生成转换任务的幂等键（订单 + 排序后的文件ID集合）
+
+        Args:
+            order_id: 订单ID
+            file_ids: 文件ID列表
+
+        Returns:
+            幂等键字符串
+        """
+        ids = ','.join(str(i) for i in sorted({int(f) for f in file_ids}))
+        digest = hashlib.sha256(ids.encode('utf-8')).hexdigest()[:16]
+        return f"{JobService.order_key_prefix(order_id)}{digest}"
+
+    @staticmethod
+    def submit_conversion(order_id, file_ids):
+        """提交订单文件转换任务
+
+        相同订单和文件集合的任务正在排队或执行时，返回已有任务而不重复提交。
+
+        Args:
+            order_id: 订单ID
+            file_ids: 文件ID列表
+
+        Returns:
+            (任务字典, 是否新建) 二元组
+        """
+        file_ids = sorted({int(f) for f in file_ids})
+        return job_queue.enqueue(
+            JOB_CONVERT_FILES,
+            {'order_id': int(order_id), 'file_ids': file_ids},
+            idempotency_key=JobService.conversion_key(order_id, file_ids),
+            max_attempts=config.JOB_MAX_ATTEMPTS,
+        )
+
+    @staticmethod
+    def get_job(job_id):
+        """获取任务状态
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            任务字典，不存在返回None
+        """
+        return job_queue.get(job_id)
+
+    @staticmethod
+    def conversion_type(file):
+        """根据扩展名判断上传文件的转换类型
+
+        Args:
+            file: 上传的文件对象
+
+        Returns:
+            pdf、docx、pptx、image、archive，不支持的类型返回None
+        """
+        path = file.file_path.lower()
+        if path.endswith('.pdf'):
+            return 'pdf'
+        if path.endswith(('.docx', '.doc')):
+            return 'docx'
+        if path.endswith(('.pptx', '.ppt')):
+            return 'pptx'
+        if path.endswith(('.jpg', '.jpeg', '.png', '.bmp', '.gif')):
+            return 'image'
+        if FileService.is_archive_file(file.file_path):
+            return 'archive'
+        return None
+
+    @staticmethod
+    def convert_files(order_id, file_ids, done=None, on_progress=None):
+        """转换订单中的文件（任务执行体，需要在应用上下文中调用）
+
+        普通文件通过 /api/convert-batch 分批并发转换，转换记录在一个事务中保存；
+        压缩包逐个解压处理。每个文件的成败单独记录。
+
+        Args:
+            order_id: 订单ID
+            file_ids: 文件ID列表
+            done: 之前尝试中已完成的文件ID（重试时跳过）
+            on_progress: 进度更新回调，参数为进度字典；每批普通文件和每个压缩包完成后调用，
+                抛出异常时停止后续转换
+
+        Returns:
+            进度字典，包含total、done、failed、skipped、errors
+        """
+        progress = {
+            'total': len(file_ids),
+            'done': list(done or []),
+            'failed': [],
+            'skipped': [],
+            'errors': {},
+        }
+
+        # 整个任务只解析一次订单，沿转换流程传递
+        order = OrderService.get_order_context(order_id)
+
+        batch_files = []
+        archives = []
+        for file_id in file_ids:
+            if file_id in progress['done']:
+                continue
+
+            file = FileService.get_uploaded_file(int(file_id))
+
+            # 确保文件存在且属于当前订单
+            if not file or file.order_id != order_id:
+                progress['skipped'].append(file_id)
+                continue
+
+            file_type = JobService.conversion_type(file)
+            if file_type is None:
+                progress['skipped'].append(file_id)
+            elif file_type == 'archive':
+                archives.append(file)
+            else:
+                batch_files.append((file, file_type))
+
+        # 本地文件丢失（如工作目录被清空）时先从归档服务按哈希恢复
+        FileService.restore_uploaded_files([file for file, _ in batch_files] + archives)
+
+        # 普通文件批量转换
+        if batch_files:
+            _, results = FileService.convert_uploaded_files(batch_files, order=order)
+            for file, _ in batch_files:
+                result = results.get(file.id) or {}
+                if result.get('success'):
+                    progress['done'].append(file.id)
+                else:
+                    progress['failed'].append(file.id)
+                    progress['errors'][str(file.id)] = result.get('error') or '转换失败'
+            if on_progress:
+                on_progress(progress)
+
+        # 压缩包逐个处理
+        for file in archives:
+            # 压缩包未完整处理（超出限制或解压中断）时已转换的文件保留记录，但整体记为失败
+            converted, error = FileService.extract_and_convert_archive(file, order=order)
+            if converted and not error:
+                progress['done'].append(file.id)
+            else:
+                progress['failed'].append(file.id)
+                progress['errors'][str(file.id)] = error or '压缩包处理失败或未生成转换文件'
+            if on_progress:
+                on_progress(progress)
+
+        return progress
+
+    @staticmethod
+    def run_job(job):
+        """执行一个已领取的任务
+
+        Args:
+            job: 任务字典（locked_by为领取任务的worker）
+
+        Raises:
+            JobError: 有文件转换失败，需要重试
+            LeaseLostError: 租约已被其他worker回收，已停止执行
+        """
+        if job['kind'] != JOB_CONVERT_FILES:
+            raise ValueError(f"未知的任务类型: {job['kind']}")
+
+        payload = job['payload']
+        previous = job.get('result') or {}
+
+        # 执行期间由后台线程持续续约，单个批次或压缩包耗时超过租约超时也不会被其他worker回收
+        with LeaseKeeper(job['id'], job['locked_by'], config.JOB_HEARTBEAT_INTERVAL) as lease:
+            progress = JobService.convert_files(
+                payload['order_id'],
+                payload['file_ids'],
+                done=previous.get('done'),
+                on_progress=lease.update,
+            )
+        if progress['failed']:
+            details = '; '.join(f"文件{file_id}: {error}" for file_id, error in progress['errors'].items())
+            raise JobError(progress, f"{len(progress['failed'])}个文件转换失败 ({details})")
+        return progress
+
+    @staticmethod
+    def run_inline(order_id, file_ids):
+        """在当前请求中同步转换（任务队列关闭时使用）
+
+        Returns:
+            进度字典
+        """
+        progress = JobService.convert_files(int(order_id), sorted({int(f) for f in file_ids}))
+        BundleService.schedule_build(int(order_id))
+        return progress
+
+    @staticmethod
+    def on_job_finished(job):
+        """任务结束（成功或最终失败）后，若订单已没有排队或执行中的转换任务，在后台生成订单ZIP包"""
+        order_id = job['payload'].get('order_id')
+        if order_id is None:
+            return
+        if job_queue.active_count(JobService.order_key_prefix(order_id)) == 0:
+            BundleService.schedule_build(order_id)
+
+    @staticmethod
+    def work_once(worker_id):
+        """领取并执行一个任务（需要在应用上下文中调用）
+
+        转换服务不可用（健康检查失败或熔断中）时不领取任务，任务保留在队列中，
+        不消耗重试次数，服务恢复后继续处理。
+
+        Returns:
+            执行了任务返回True，队列为空或暂停领取时返回False
+        """
+        global _deferring
+        if not health_monitor.is_available(CONVERT_SERVICE):
+            if not _deferring:
+                _deferring = True
+                current_app.logger.warning(f"转换服务不可用，暂停领取任务: {worker_id}")
+            return False
+        if _deferring:
+            _deferring = False
+            current_app.logger.info(f"转换服务已恢复，继续领取任务: {worker_id}")
+
+        job = job_queue.claim(worker_id)
+        if job is None:
+            return False
+
+        current_app.logger.info(f"开始执行任务: id={job['id']}, 第{job['attempts']}次尝试")
+        try:
+            progress = JobService.run_job(job)
+            # 租约失效时任务已由其他worker接管，由它负责收尾
+            if job_queue.complete(job['id'], worker_id, progress):
+                current_app.logger.info(f"任务完成: id={job['id']}, 转换{len(progress['done'])}个文件")
+                JobService.on_job_finished(job)
+        except LeaseLostError as e:
+            # 任务已由其他worker接管，不再记录结果
+            current_app.logger.warning(f"停止执行任务: {str(e)}")
+        except JobError as e:
+            # 保留已完成的文件，重试时只处理失败的文件
+            partial, message = e.args
+            if job_queue.fail(
+                job['id'], worker_id, message, config.JOB_BACKOFF_BASE,
+                result={'done': partial['done'], 'errors': partial['errors']}
+            ) is False:
+                JobService.on_job_finished(job)
+        except Exception as e:
+            current_app.logger.error(f"任务执行异常: id={job['id']}, 错误: {str(e)}")
+            if job_queue.fail(
+                job['id'], worker_id, str(e), config.JOB_BACKOFF_BASE, result=job.get('result')
+            ) is False:
+                JobService.on_job_finished(job)
+        finally:
+            # 释放本次任务使用的数据库会话和订单快照缓存（worker在同一应用上下文中循环执行任务）
+            from src.models import db
+            db.session.remove()
+            OrderService.forget_order_contexts()
+        return True
+
+    @staticmethod
+    def start_workers(count=None):
+        """启动worker进程池
+
+        使用spawn方式启动，每个worker独立创建应用实例和数据库连接。
+
+        Args:
+            count: worker数量，默认使用JOB_WORKERS
+
+        Returns:
+            启动的进程列表
+        """
+        count = config.JOB_WORKERS if count is None else count
+        ctx = multiprocessing.get_context('spawn')
+        workers = []
+        for index in range(count):
+            process = ctx.Process(target=worker_main, args=(index,), name=f'job-worker-{index}', daemon=True)
+            process.start()
+            workers.append(process)
+        logger.info(f"已启动 {len(workers)} 个任务worker进程")
+        return workers
+
+
+def worker_main(index=0):
+    """worker进程入口：创建应用实例后循环领取任务"""
+    from src.app import create_app
+
+    app = create_app()
+    worker_id = f"{os.uname().nodename if hasattr(os, 'uname') else 'worker'}-{os.getpid()}-{index}"
+
+    with app.app_context():
+        app.logger.info(f"任务worker已启动: {worker_id}")
+        while True:
+            try:
+                if not JobService.work_once(worker_id):
+                    time.sleep(POLL_INTERVAL)
+            except Exception as e:
+                app.logger.error(f"任务worker异常: {worker_id}, 错误: {str(e)}")
+                time.sleep(POLL_INTERVAL)
@@ -10,6 +10,7 @@ from flask import current_app
 from src.repositories.mail_repo import MailRepository
 from src.repositories.admin_repo import AdminRepository
 from src.repositories.order_repo import OrderRepository
+from src.repositories.file_repo import FileRepository
 from src.services.file_service import FileService
 
 class MailService:
@@ -70,12 +71,12 @@ class MailService:
             if not os.path.exists(attachment.file_path):
                 continue
             
-            # 获取文件大小和类型
-            file_size = os.path.getsize(attachment.file_path)
-            file_type = FileService.detect_file_type(attachment.file_path)
+            # 获取文件大小和类型（优先使用附件记录中的值）
+            file_size = attachment.file_size or os.path.getsize(attachment.file_path)
+            file_type = attachment.file_type or FileService.detect_file_type(attachment.file_path)
             
-            # 计算文件哈希值
-            file_hash = FileService.calculate_file_hash(attachment.file_path)
+            # 复用附件入库时已计算的哈希值，缺失时才重新计算
+            file_hash = attachment.file_hash or FileService.calculate_file_hash(attachment.file_path)
             
             # 创建上传文件记录
             # 使用存档路径，这样即使工作目录被清空，还能恢复文件
@@ -1,6 +1,13 @@
+import datetime
+
+from flask import current_app, session
+
 from src.repositories.order_repo import OrderRepository
 from src.repositories.file_repo import FileRepository
 
+# 分页游标中时间戳的格式
+CURSOR_TIME_FORMAT = '%Y%m%d%H%M%S%f'
+
 class OrderService:
     """订单服务类，处理与订单相关的业务逻辑"""
     
@@ -9,6 +16,28 @@ class OrderService:
         """根据ID获取订单"""
         return OrderRepository.get_by_id(order_id)
     
+    @staticmethod
+    def can_view_order(order):
+        """当前登录用户是否可以查看订单
+        
+        管理员可以查看所有订单；其他用户只能查看自己创建的订单和没有创建者的订单。
+        """
+        if not order:
+            return False
+        if session.get('is_admin'):
+            return True
+        return order.user_id is None or order.user_id == session.get('admin_id')
+    
+    @staticmethod
+    def get_order_context(order_id):
+        """获取订单快照（ID和订单号），同一请求/任务内每个订单只查询一次"""
+        return OrderRepository.get_context(order_id)
+    
+    @staticmethod
+    def forget_order_contexts():
+        """清除当前请求/任务内缓存的订单快照"""
+        OrderRepository.forget_context()
+    
     @staticmethod
     def get_order_by_number(order_number):
         """根据订单号获取订单"""
@@ -19,6 +48,59 @@ class OrderService:
         """获取所有订单"""
         return OrderRepository.get_all_orders()
     
+    @staticmethod
+    def encode_cursor(order):
+        """将订单编码为分页游标字符串（创建时间-ID）"""
+        return f"{order.created_at.strftime(CURSOR_TIME_FORMAT)}-{order.id}"
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        """解析分页游标
+        
+        Returns:
+            (created_at, id) 二元组，游标无效返回None
+        """
+        try:
+            created_at, order_id = cursor.rsplit('-', 1)
+            return datetime.datetime.strptime(created_at, CURSOR_TIME_FORMAT), int(order_id)
+        except (AttributeError, ValueError):
+            return None
+    
+    @staticmethod
+    def list_orders(after=None, before=None, status=None, creator=None, note_search=None, limit=None):
+        """分页获取订单列表（按创建时间倒序，键集分页）
+        
+        Args:
+            after: 下一页游标字符串
+            before: 上一页游标字符串
+            status: 按状态筛选
+            creator: 按创建者ID筛选
+            note_search: 按备注关键词筛选
+            limit: 每页数量，默认使用ORDER_LIST_PAGE_SIZE
+            
+        Returns:
+            包含orders、next_cursor、prev_cursor的字典，没有下一页/上一页时对应游标为None
+        """
+        limit = limit or current_app.config.get('ORDER_LIST_PAGE_SIZE', 50)
+        try:
+            user_id = int(creator) if creator else None
+        except ValueError:
+            user_id = None
+        
+        orders, has_next, has_prev = OrderRepository.list_orders(
+            limit,
+            after=OrderService.decode_cursor(after) if after else None,
+            before=OrderService.decode_cursor(before) if before else None,
+            status=status or None,
+            user_id=user_id,
+            note_search=(note_search or '').strip() or None,
+        )
+        return {
+            'orders': orders,
+            'next_cursor': OrderService.encode_cursor(orders[-1]) if orders and has_next else None,
+            'prev_cursor': OrderService.encode_cursor(orders[0]) if orders and has_prev else None,
+        }
+    
     @staticmethod
     def get_active_order(user_id=None):
         """获取活跃订单"""
@@ -52,8 +134,10 @@ class OrderService:
     @staticmethod
     def delete_order(order_id):
         """删除订单及其相关文件"""
-        # 先删除订单关联的文件记录
+        # 先删除订单关联的文件记录和ZIP包
         FileRepository.delete_uploaded_files_by_order(order_id)
+        from src.services.bundle_service import BundleService
+        BundleService.invalidate(order_id)
         
         # 再删除订单本身
         return OrderRepository.delete_order(order_id)
@@ -0,0 +1,147 @@
+import os
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+import src.settings as config
+from src.repositories.outbox_repo import OutboxRepository
+from src.utils.archive_client import archive_client, SERVICE_NAME as ARCHIVE_SERVICE
+from src.utils.health_monitor import health_monitor
+
+logger = logging.getLogger(__name__)
+
+# 事件类型：转换文件重命名
+EVENT_RENAME = 'rename'
+
+# 当前进程的dispatcher是否因归档服务不可用而暂停投递（仅用于在状态变化时记录日志）
+_deferring = False
+
+
+class OutboxService:
+    """归档服务事件发件箱服务类
+
+    业务代码调用 add_events 在自己的事务中写入事件；单个dispatcher进程按写入顺序
+    领取到期事件，分批并发投递到归档服务的 /events:batch，成功后删除，失败后退避重试。
+    进程在投递成功但删除前崩溃时事件会被重新投递，归档服务按event_id去重。
+    """
+
+    @staticmethod
+    def add_events(event_type, payloads):
+        """在当前事务中写入事件（不提交）
+
+        Args:
+            event_type: 事件类型
+            payloads: 事件内容列表
+        """
+        if current_app.config.get('ARCHIVE_OUTBOX_ENABLED', True) and payloads:
+            OutboxRepository.add_events(event_type, payloads)
+
+    @staticmethod
+    def stats():
+        """发件箱积压统计（队列深度和延迟）"""
+        return OutboxRepository.stats()
+
+    @staticmethod
+    def deliver(batch):
+        """投递一批事件（在线程池中执行，只做网络调用，不访问数据库）
+
+        Args:
+            batch: 事件字典列表
+
+        Returns:
+            错误信息，投递成功返回None
+        """
+        try:
+            response = archive_client.send_events(batch)
+        except Exception as e:
+            return f"投递请求失败: {str(e)}"
+        if response.status_code != 200:
+            return f"归档服务返回错误: {response.status_code} - {response.text[:200]}"
+        return None
+
+    @staticmethod
+    def dispatch_once():
+        """领取并投递一轮到期事件（需要在应用上下文中调用）
+
+        每轮最多领取 ARCHIVE_OUTBOX_BATCH_SIZE * ARCHIVE_OUTBOX_CONCURRENCY 个事件，
+        按 ARCHIVE_OUTBOX_BATCH_SIZE 分批，以 ARCHIVE_OUTBOX_CONCURRENCY 的并发度发送。
+        归档服务不可用（健康检查失败或熔断中）时不投递，也不消耗重试次数。
+
+        Returns:
+            投递成功的事件数，没有到期事件或暂停投递时返回0
+        """
+        global _deferring
+        if not health_monitor.is_available(ARCHIVE_SERVICE):
+            if not _deferring:
+                _deferring = True
+                current_app.logger.warning("归档服务不可用，暂停投递发件箱事件")
+            return 0
+        if _deferring:
+            _deferring = False
+            current_app.logger.info("归档服务已恢复，继续投递发件箱事件")
+
+        batch_size = max(current_app.config.get('ARCHIVE_OUTBOX_BATCH_SIZE', 100), 1)
+        concurrency = max(current_app.config.get('ARCHIVE_OUTBOX_CONCURRENCY', 2), 1)
+
+        events = OutboxRepository.get_due(batch_size * concurrency)
+        if not events:
+            return 0
+
+        batches = [events[start:start + batch_size] for start in range(0, len(events), batch_size)]
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(batches))) as executor:
+            errors = list(executor.map(
+                OutboxService.deliver, [[event.to_event() for event in batch] for batch in batches]
+            ))
+
+        delivered = [event.id for batch, error in zip(batches, errors) if not error for event in batch]
+        failures = [(batch, error) for batch, error in zip(batches, errors) if error]
+        for batch, error in failures:
+            current_app.logger.error(f"发件箱事件投递失败: {len(batch)} 个事件, 错误: {error}")
+        OutboxRepository.record_delivery(
+            delivered, failures,
+            current_app.config.get('ARCHIVE_OUTBOX_BACKOFF_BASE', 2),
+            current_app.config.get('ARCHIVE_OUTBOX_BACKOFF_MAX', 300),
+        )
+
+        current_app.logger.info(f"发件箱投递: 成功 {len(delivered)}/{len(events)} 个事件, {len(batches)} 批")
+        return len(delivered)
+
+    @staticmethod
+    def start_dispatcher():
+        """启动dispatcher进程
+
+        使用spawn方式启动，独立创建应用实例和数据库连接。每个部署只应启动一个dispatcher。
+
+        Returns:
+            启动的进程
+        """
+        ctx = multiprocessing.get_context('spawn')
+        process = ctx.Process(target=dispatcher_main, name='archive-outbox-dispatcher', daemon=True)
+        process.start()
+        logger.info(f"已启动归档发件箱dispatcher进程: pid={process.pid}")
+        return process
+
+
+def dispatcher_main():
+    """dispatcher进程入口：创建应用实例后循环投递事件"""
+    from src.app import create_app
+    from src.models import db
+
+    app = create_app()
+    poll_interval = config.ARCHIVE_OUTBOX_POLL_INTERVAL
+
+    with app.app_context():
+        app.logger.info(f"归档发件箱dispatcher已启动: pid={os.getpid()}")
+        while True:
+            try:
+                delivered = OutboxService.dispatch_once()
+            except Exception as e:
+                app.logger.error(f"归档发件箱dispatcher异常: {str(e)}")
+                delivered = 0
+            finally:
+                db.session.remove()
+            if not delivered:
+                time.sleep(poll_interval)
@@ -0,0 +1,210 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from src.repositories.file_repo import FileRepository
+from src.services.order_service import OrderService
+from src.utils.artifact_cache import artifact_cache, ArtifactFetchError
+from src.utils.convert_client import convert_client
+from src.utils.hash_cache import hash_cache
+
+# 缩略图支持的格式及对应的MIME类型
+RENDITION_FORMATS = {
+    'webp': 'image/webp',
+    'png': 'image/png',
+}
+
+# 按渲染键加锁的分段数，同一缩略图的并发未命中只渲染一次
+_LOCK_STRIPES = 64
+_stripes = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+
+# 后台预生成线程池（按进程创建）
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+class RenditionService:
+    """缩略图服务类
+
+    缩略图按 (源文件内容哈希, 尺寸, 格式) 缓存在磁盘上，内容不变时永不失效。
+    转换完成后在后台预生成，访问时未命中则即时生成。
+    """
+
+    @staticmethod
+    def sizes():
+        """允许的缩略图尺寸（长边像素）"""
+        return sorted(current_app.config.get('RENDITION_SIZES', (256, 512)))
+
+    @staticmethod
+    def default_format():
+        """预生成和客户端支持时使用的缩略图格式"""
+        fmt = current_app.config.get('RENDITION_FORMAT', 'webp')
+        return fmt if fmt in RENDITION_FORMATS else 'png'
+
+    @staticmethod
+    def normalize_size(size):
+        """将请求的尺寸对齐到不小于它的最小允许尺寸（超出时取最大尺寸）"""
+        sizes = RenditionService.sizes()
+        for allowed in sizes:
+            if size <= allowed:
+                return allowed
+        return sizes[-1]
+
+    @staticmethod
+    def rendition_path(content_hash, size, fmt):
+        """缩略图缓存路径"""
+        rendition_dir = current_app.config.get('RENDITION_DIR') or os.path.join(
+            os.path.dirname(current_app.config['CONVERTED_FOLDER']), 'renditions'
+        )
+        return os.path.join(rendition_dir, content_hash[:2], f"{content_hash}_{size}.{fmt}")
+
+    @staticmethod
+    def source_for(converted_file):
+        """获取转换文件的本地副本及其内容哈希
+
+        优先使用本地存储路径，否则通过转换产物缓存从convert-svc获取。
+
+        Args:
+            converted_file: 转换文件对象
+
+        Returns:
+            (本地文件路径, 内容SHA-256) 二元组，获取失败返回 (None, None)
+        """
+        file_path = converted_file.file_path or ''
+        storage_path = converted_file.storage_path if hasattr(converted_file, 'storage_path') else None
+        for local_path in (storage_path, file_path):
+            if local_path and not local_path.startswith(('http://', 'https://')) and os.path.exists(local_path):
+                return local_path, hash_cache.get_hash(local_path)
+
+        if '/files/' in file_path:
+            candidates = [convert_client.relative_path(file_path)]
+        else:
+            name = os.path.basename(file_path) or converted_file.filename
+            order = OrderService.get_order(converted_file.order_id) if converted_file.order_id else None
+            candidates = ([f"{order.order_number}/{name}"] if order else []) + [name]
+
+        convert_svc_url = current_app.config.get('CONVERT_SVC_URL', 'http://localhost:8081')
+        for relative_path in candidates:
+            file_url = f"{convert_svc_url}/files/{relative_path}"
+            try:
+                entry = artifact_cache.get_or_fetch(
+                    relative_path,
+                    lambda headers, url=file_url: convert_client.get(url, stream=True, headers=headers)
+                )
+                return entry['path'], entry['etag']
+            except ArtifactFetchError:
+                continue
+        return None, None
+
+    @staticmethod
+    def render(source_path, target_path, size, fmt):
+        """生成缩略图
+
+        使用Image.thumbnail的reducing_gap：JPEG在解码时按draft缩小，
+        其他格式先用reduce()整数倍缩小，再进行高质量重采样。
+
+        Args:
+            source_path: 源图片路径
+            target_path: 缩略图输出路径
+            size: 长边像素
+            fmt: 输出格式（webp或png）
+        """
+        from PIL import Image
+
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        tmp_path = f"{target_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with Image.open(source_path) as img:
+                img.thumbnail((size, size), Image.LANCZOS, reducing_gap=2.0)
+                if img.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+                    img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+                if fmt == 'webp':
+                    img.save(tmp_path, 'WEBP', quality=80, method=4)
+                else:
+                    img.save(tmp_path, 'PNG', optimize=False, compress_level=6)
+            os.replace(tmp_path, target_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def get_rendition(converted_file, size, fmt='webp'):
+        """获取转换文件的缩略图，未命中时即时生成
+
+        Args:
+            converted_file: 转换文件对象
+            size: 长边像素（会对齐到允许的尺寸）
+            fmt: 输出格式
+
+        Returns:
+            (缩略图路径, ETag) 二元组，源文件不可用返回 (None, None)
+        """
+        size = RenditionService.normalize_size(int(size))
+        fmt = fmt if fmt in RENDITION_FORMATS else 'png'
+
+        source_path, content_hash = RenditionService.source_for(converted_file)
+        if not source_path or not content_hash:
+            return None, None
+
+        target_path = RenditionService.rendition_path(content_hash, size, fmt)
+        etag = f"{content_hash[:32]}-{size}-{fmt}"
+        if os.path.exists(target_path):
+            return target_path, etag
+
+        with _stripes[hash(target_path) % _LOCK_STRIPES]:
+            if not os.path.exists(target_path):
+                RenditionService.render(source_path, target_path, size, fmt)
+                current_app.logger.info(f"已生成缩略图: {converted_file.filename} -> {size}px {fmt}")
+        return target_path, etag
+
+    @staticmethod
+    def pregenerate(file_ids):
+        """为转换文件生成默认格式的各尺寸缩略图（需要在应用上下文中调用）
+
+        Args:
+            file_ids: 转换文件ID列表
+        """
+        for file_id in file_ids:
+            converted_file = FileRepository.get_converted_file(file_id)
+            if not converted_file:
+                continue
+            try:
+                for size in RenditionService.sizes():
+                    RenditionService.get_rendition(converted_file, size, RenditionService.default_format())
+            except Exception as e:
+                current_app.logger.error(f"预生成缩略图失败: {converted_file.filename}, 错误: {str(e)}")
+
+    @staticmethod
+    def schedule_pregenerate(file_ids):
+        """在后台线程中预生成缩略图
+
+        Args:
+            file_ids: 转换文件ID列表
+
+        Returns:
+            已提交返回True，预生成关闭或没有文件返回False
+        """
+        global _executor, _executor_pid
+
+        if not file_ids or not current_app.config.get('RENDITION_PREGENERATE', True):
+            return False
+
+        app = current_app._get_current_object()
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rendition')
+                _executor_pid = os.getpid()
+            _executor.submit(_pregenerate_in_background, app, list(file_ids))
+        return True
+
+
+def _pregenerate_in_background(app, file_ids):
+    """后台线程入口：在应用上下文中预生成缩略图"""
+    try:
+        with app.app_context():
+            RenditionService.pregenerate(file_ids)
+    except Exception as e:
+        app.logger.error(f"预生成缩略图失败: {str(e)}")
@@ -22,16 +22,46 @@ if ENV == 'testing':
 elif ENV == 'production':
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or f'sqlite:///{os.path.join(BASE_DIR, "app.db")}'
 else:  # development
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DEV_DATABASE_URL') or f'sqlite:///{os.path.join(BASE_DIR, "app_dev.db")}'
+    SQLALCHEMY_DATABASE_URI = (os.environ.get('DEV_DATABASE_URL') or os.environ.get('DATABASE_URL')
+                               or f'sqlite:///{os.path.join(BASE_DIR, "app_dev.db")}')
+
+# 部分平台提供的 postgres:// 地址需改为SQLAlchemy识别的 postgresql://
+if SQLALCHEMY_DATABASE_URI.startswith('postgres://'):
+    SQLALCHEMY_DATABASE_URI = 'postgresql://' + SQLALCHEMY_DATABASE_URI[len('postgres://'):]
 
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+# 数据库连接池配置（SQLite文件库与PostgreSQL，内存SQLite使用默认单连接）
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 10)
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW') or 20)
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT') or 30)  # 等待空闲连接的最长时间（秒）
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE') or 1800)  # PostgreSQL连接最长复用时间（秒）
+
+# SQLite连接参数（每个连接建立时通过PRAGMA设置）
+SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE') or 'WAL'
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS') or 'NORMAL'
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS') or 10000)  # 写锁等待时间（毫秒）
+SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB') or 65536)  # 每个连接的页缓存大小
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE') or 256 * 1024 * 1024)  # 内存映射读取上限（字节）
+
+# 生产环境Web服务器配置（gunicorn prefork，FLASK_ENV不是development时使用）
+WEB_WORKERS = int(os.environ.get('WEB_WORKERS') or 0)  # 0表示按CPU核数计算（2*核数+1）
+WEB_THREADS = int(os.environ.get('WEB_THREADS') or 4)  # 每个worker的处理线程数
+WEB_MAX_REQUESTS = int(os.environ.get('WEB_MAX_REQUESTS') or 1000)  # worker处理多少请求后重启以回收内存，0表示不重启
+WEB_MAX_REQUESTS_JITTER = int(os.environ.get('WEB_MAX_REQUESTS_JITTER') or 100)  # 随机错开重启，避免所有worker同时重启
+WEB_TIMEOUT = int(os.environ.get('WEB_TIMEOUT') or 180)  # worker无响应多久后被重启（秒）
+WEB_GRACEFUL_TIMEOUT = int(os.environ.get('WEB_GRACEFUL_TIMEOUT') or 30)  # 重载/停止时等待请求处理完成的时间（秒）
+REQUEST_METRICS_DIR = os.environ.get('REQUEST_METRICS_DIR') or os.path.join(BASE_DIR, 'request_metrics')
+
 # 文件上传配置
 UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
 CONVERTED_FOLDER = os.path.join(BASE_DIR, 'converted')
 ARCHIVE_FOLDER = os.path.join(BASE_DIR, 'archive')
 MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH') or 100 * 1024 * 1024)  # 默认100MB
 
+# 文件哈希缓存配置（按 device/inode/size/mtime 缓存SHA-256）
+HASH_CACHE_DB = os.environ.get('HASH_CACHE_DB') or os.path.join(BASE_DIR, 'hash_cache.db')
+
 # 会话配置
 SESSION_TYPE = os.environ.get('SESSION_TYPE') or 'filesystem'
 SESSION_PERMANENT = False
@@ -64,4 +94,97 @@ ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL') or 'admin@example.com'
 
 # 微服务配置
 CONVERT_SVC_URL = os.environ.get('CONVERT_SVC_URL', 'http://localhost:8081')
-ARCHIVE_SVC_URL = os.environ.get('ARCHIVE_SVC_URL', 'http://localhost:8088/api/v1/archive') 
\ No newline at end of file
+ARCHIVE_SVC_URL = os.environ.get('ARCHIVE_SVC_URL', 'http://localhost:8088/api/v1/archive')
+
+# 转换服务HTTP连接池配置（进程内共享一个Session）
+CONVERT_POOL_CONNECTIONS = int(os.environ.get('CONVERT_POOL_CONNECTIONS') or 10)
+CONVERT_POOL_MAXSIZE = int(os.environ.get('CONVERT_POOL_MAXSIZE') or 20)
+CONVERT_KEEP_ALIVE = os.environ.get('CONVERT_KEEP_ALIVE', 'true').lower() in ('true', '1', 'yes')
+CONVERT_CONNECT_TIMEOUT = float(os.environ.get('CONVERT_CONNECT_TIMEOUT') or 3)
+# 各端点的读取超时（秒）
+CONVERT_TIMEOUT_HEALTH = float(os.environ.get('CONVERT_TIMEOUT_HEALTH') or 5)
+CONVERT_TIMEOUT_CONVERT = float(os.environ.get('CONVERT_TIMEOUT_CONVERT') or 60)
+CONVERT_TIMEOUT_BATCH = float(os.environ.get('CONVERT_TIMEOUT_BATCH') or 120)
+CONVERT_TIMEOUT_RENAME = float(os.environ.get('CONVERT_TIMEOUT_RENAME') or 10)
+CONVERT_TIMEOUT_FILES = float(os.environ.get('CONVERT_TIMEOUT_FILES') or 30)
+# 批量转换配置：每批文件数与同时进行的批次数（每批超时为CONVERT_TIMEOUT_BATCH）
+CONVERT_BATCH_SIZE = int(os.environ.get('CONVERT_BATCH_SIZE') or 4)
+CONVERT_BATCH_CONCURRENCY = int(os.environ.get('CONVERT_BATCH_CONCURRENCY') or 4)
+
+# 依赖服务健康监控与熔断配置
+HEALTH_MONITOR_ENABLED = os.environ.get('HEALTH_MONITOR_ENABLED', 'true').lower() in ('true', '1', 'yes')
+HEALTH_CHECK_INTERVAL = float(os.environ.get('HEALTH_CHECK_INTERVAL') or 10)  # 后台探测间隔（秒）
+HEALTH_CHECK_TTL = float(os.environ.get('HEALTH_CHECK_TTL') or 30)  # 健康状态缓存有效期（秒）
+HEALTH_PROBE_TIMEOUT = float(os.environ.get('HEALTH_PROBE_TIMEOUT') or 2)  # 单次探测超时（秒）
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD') or 3)  # 连续失败多少次后熔断
+CIRCUIT_RECOVERY_TIMEOUT = float(os.environ.get('CIRCUIT_RECOVERY_TIMEOUT') or 30)  # 熔断后多久进入半开（秒）
+
+# 归档服务客户端配置（进程内共享一个连接池Session）
+ARCHIVE_POOL_MAXSIZE = int(os.environ.get('ARCHIVE_POOL_MAXSIZE') or 10)
+ARCHIVE_CONNECT_TIMEOUT = float(os.environ.get('ARCHIVE_CONNECT_TIMEOUT') or 3)
+ARCHIVE_TIMEOUT_EVENTS = float(os.environ.get('ARCHIVE_TIMEOUT_EVENTS') or 10)
+ARCHIVE_TIMEOUT_UPLOAD = float(os.environ.get('ARCHIVE_TIMEOUT_UPLOAD') or 300)  # 流式上传一个文件的读取超时（秒）
+ARCHIVE_TIMEOUT_LOOKUP = float(os.environ.get('ARCHIVE_TIMEOUT_LOOKUP') or 5)  # 哈希预检等查询的读取超时（秒）
+ARCHIVE_TIMEOUT_DOWNLOAD = float(os.environ.get('ARCHIVE_TIMEOUT_DOWNLOAD') or 60)  # 流式下载时两次读取之间的超时（秒）
+ARCHIVE_UPLOAD_WORKERS = int(os.environ.get('ARCHIVE_UPLOAD_WORKERS') or 2)  # 后台推送上传文件和本地归档复制的线程数（每个进程）
+# 并发的按哈希查询在短暂等待窗口内合并为一个 /files/hash:batch 请求
+ARCHIVE_HASH_BATCH_MAX_SIZE = int(os.environ.get('ARCHIVE_HASH_BATCH_MAX_SIZE') or 100)  # 每个批量查询请求的最大哈希数
+ARCHIVE_HASH_BATCH_LINGER_MS = float(os.environ.get('ARCHIVE_HASH_BATCH_LINGER_MS') or 5)  # 等待合并的时间窗口（毫秒），仅在已有批量请求进行中时等待
+
+# 归档服务事件发件箱：事件与业务数据在同一事务中写入，由单个dispatcher进程批量投递（至少一次）
+ARCHIVE_OUTBOX_ENABLED = os.environ.get('ARCHIVE_OUTBOX_ENABLED', 'true').lower() in ('true', '1', 'yes')
+ARCHIVE_OUTBOX_BATCH_SIZE = int(os.environ.get('ARCHIVE_OUTBOX_BATCH_SIZE') or 100)  # 每个请求投递的事件数
+ARCHIVE_OUTBOX_CONCURRENCY = int(os.environ.get('ARCHIVE_OUTBOX_CONCURRENCY') or 2)  # 同时进行的投递请求数
+ARCHIVE_OUTBOX_POLL_INTERVAL = float(os.environ.get('ARCHIVE_OUTBOX_POLL_INTERVAL') or 1)  # 发件箱为空时的轮询间隔（秒）
+ARCHIVE_OUTBOX_BACKOFF_BASE = float(os.environ.get('ARCHIVE_OUTBOX_BACKOFF_BASE') or 2)  # 重试退避基数（秒）
+ARCHIVE_OUTBOX_BACKOFF_MAX = float(os.environ.get('ARCHIVE_OUTBOX_BACKOFF_MAX') or 300)  # 最长退避（秒）
+
+# 就绪检查（/readyz）：为真时依赖服务不可用也返回503，默认只标记为降级
+READINESS_REQUIRE_SERVICES = os.environ.get('READINESS_REQUIRE_SERVICES', 'false').lower() in ('true', '1', 'yes')
+
+# 后台转换任务队列配置（SQLite持久化，worker进程池执行）
+JOB_QUEUE_ENABLED = os.environ.get('JOB_QUEUE_ENABLED', 'true').lower() in ('true', '1', 'yes')
+JOB_QUEUE_DB = os.environ.get('JOB_QUEUE_DB') or os.path.join(BASE_DIR, 'job_queue.db')
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS') or 2)  # 随应用启动的worker进程数，0表示由外部单独启动
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS') or 3)
+JOB_BACKOFF_BASE = float(os.environ.get('JOB_BACKOFF_BASE') or 5)  # 重试退避基数（秒）
+JOB_LEASE_TIMEOUT = float(os.environ.get('JOB_LEASE_TIMEOUT') or 600)  # running任务无心跳多久后视为worker崩溃（秒）
+JOB_HEARTBEAT_INTERVAL = float(os.environ.get('JOB_HEARTBEAT_INTERVAL') or 30)  # 执行中任务的续约间隔（秒），应远小于租约超时
+
+# 转换结果缓存配置（按 源文件哈希/类型/DPI/转换器版本 复用已生成的PNG）
+CONVERSION_CACHE_ENABLED = os.environ.get('CONVERSION_CACHE_ENABLED', 'true').lower() in ('true', '1', 'yes')
+CONVERSION_CACHE_DB = os.environ.get('CONVERSION_CACHE_DB') or os.path.join(BASE_DIR, 'conversion_cache.db')
+CONVERSION_CACHE_MAX_ENTRIES = int(os.environ.get('CONVERSION_CACHE_MAX_ENTRIES') or 10000)
+CONVERSION_CACHE_MAX_ARTIFACTS = int(os.environ.get('CONVERSION_CACHE_MAX_ARTIFACTS') or 200000)  # 缓存引用的PNG总数上限
+CONVERTER_VERSION = os.environ.get('CONVERTER_VERSION') or '1'  # 转换器渲染逻辑变化时递增，使旧缓存失效
+
+# 压缩包流式解压配置（所有嵌套层级合计，防止压缩炸弹）
+ARCHIVE_MAX_MEMBERS = int(os.environ.get('ARCHIVE_MAX_MEMBERS') or 5000)
+ARCHIVE_MAX_TOTAL_SIZE = int(os.environ.get('ARCHIVE_MAX_TOTAL_SIZE') or 2 * 1024 * 1024 * 1024)  # 默认2GB
+ARCHIVE_MAX_DEPTH = int(os.environ.get('ARCHIVE_MAX_DEPTH') or 3)
+ARCHIVE_NESTED_MEMORY_LIMIT = int(os.environ.get('ARCHIVE_NESTED_MEMORY_LIMIT') or 32 * 1024 * 1024)  # 不超过此大小的嵌套ZIP在内存中处理
+
+# 批量下载（流式ZIP）配置
+DOWNLOAD_ZIP_PREFETCH = int(os.environ.get('DOWNLOAD_ZIP_PREFETCH') or 4)  # 并发预取的远程文件数
+DOWNLOAD_ZIP_MEMORY_PER_FILE = int(os.environ.get('DOWNLOAD_ZIP_MEMORY_PER_FILE') or 8 * 1024 * 1024)  # 每个预取文件的内存上限，超出部分暂存磁盘
+
+# 订单ZIP包缓存：转换全部结束后在后台生成，下载时直接发送
+BUNDLE_ENABLED = os.environ.get('BUNDLE_ENABLED', 'true').lower() in ('true', '1', 'yes')
+BUNDLE_FOLDER = os.environ.get('BUNDLE_FOLDER') or os.path.join(BASE_DIR, 'bundles')
+
+# /files 转换产物本地缓存（以内容哈希作为ETag，支持304和Range）
+ARTIFACT_CACHE_ENABLED = os.environ.get('ARTIFACT_CACHE_ENABLED', 'true').lower() in ('true', '1', 'yes')
+ARTIFACT_CACHE_DIR = os.environ.get('ARTIFACT_CACHE_DIR') or os.path.join(BASE_DIR, 'artifact_cache')
+ARTIFACT_CACHE_MAX_BYTES = int(os.environ.get('ARTIFACT_CACHE_MAX_BYTES') or 1024 * 1024 * 1024)  # 默认1GB
+ARTIFACT_CACHE_TTL = float(os.environ.get('ARTIFACT_CACHE_TTL') or 60)  # 超过此时间后向convert-svc重新验证（秒）
+ARTIFACT_CACHE_BROWSER_MAX_AGE = int(os.environ.get('ARTIFACT_CACHE_BROWSER_MAX_AGE') or 0)  # 浏览器缓存时间，0表示每次用ETag验证
+
+# 缩略图配置（按 内容哈希/尺寸/格式 缓存，转换完成后后台预生成）
+RENDITION_DIR = os.environ.get('RENDITION_DIR') or os.path.join(BASE_DIR, 'renditions')
+RENDITION_SIZES = tuple(int(s) for s in (os.environ.get('RENDITION_SIZES') or '256,512').split(','))
+RENDITION_FORMAT = os.environ.get('RENDITION_FORMAT') or 'webp'
+RENDITION_PREGENERATE = os.environ.get('RENDITION_PREGENERATE', 'true').lower() in ('true', '1', 'yes')
+RENDITION_BROWSER_MAX_AGE = int(os.environ.get('RENDITION_BROWSER_MAX_AGE') or 300)
+
+# 订单列表每页数量（键集分页）
+ORDER_LIST_PAGE_SIZE = int(os.environ.get('ORDER_LIST_PAGE_SIZE') or 50)
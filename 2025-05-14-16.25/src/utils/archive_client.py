@@ -0,0 +1,165 @@
+import os
+import logging
+
+import src.settings as config
+from src.utils.http_pool import PooledTransport
+from src.utils.health_monitor import health_monitor
+from src.utils.multipart_stream import MultipartFileStream
+from src.utils.micro_batch import MicroBatcher
+
+# 健康监控和熔断器中使用的服务名称
+SERVICE_NAME = 'archive-svc'
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveClient:
+    """文件归档服务客户端
+
+    所有请求通过进程内共享的连接池Session发送，线程安全。
+    """
+
+    def __init__(self, base_url=None, pool_maxsize=None, timeouts=None):
+        """初始化客户端
+
+        Args:
+            base_url: 归档服务的基础URL（含 /api/v1/archive），如果为None则从环境变量或配置获取
+            pool_maxsize: 最大连接数，默认使用ARCHIVE_POOL_MAXSIZE
+            timeouts: 端点读取超时覆盖，键为events/upload/lookup/download
+        """
+        self.base_url = base_url or os.environ.get('ARCHIVE_SVC_URL', config.ARCHIVE_SVC_URL)
+
+        endpoint_timeouts = {
+            'events': config.ARCHIVE_TIMEOUT_EVENTS,
+            'upload': config.ARCHIVE_TIMEOUT_UPLOAD,
+            'lookup': config.ARCHIVE_TIMEOUT_LOOKUP,
+            'download': config.ARCHIVE_TIMEOUT_DOWNLOAD,
+        }
+        endpoint_timeouts.update(timeouts or {})
+
+        self.transport = PooledTransport(
+            pool_connections=1,
+            pool_maxsize=pool_maxsize or config.ARCHIVE_POOL_MAXSIZE,
+            connect_timeout=config.ARCHIVE_CONNECT_TIMEOUT,
+            timeouts=endpoint_timeouts,
+            default_timeout=config.ARCHIVE_TIMEOUT_EVENTS,
+            on_result=lambda success: health_monitor.report(SERVICE_NAME, success),
+            before_request=lambda: health_monitor.acquire(SERVICE_NAME),
+        )
+
+    def get(self, path, endpoint=None, **kwargs):
+        """通过连接池发送GET请求
+
+        Args:
+            path: 以/开头的服务路径
+            endpoint: 端点名称，用于选择超时
+
+        Returns:
+            requests.Response对象
+        """
+        return self.transport.get(f"{self.base_url}{path}", endpoint=endpoint, **kwargs)
+
+    def post(self, path, endpoint=None, **kwargs):
+        """通过连接池发送POST请求
+
+        Args:
+            path: 以/开头的服务路径
+            endpoint: 端点名称，用于选择超时
+
+        Returns:
+            requests.Response对象
+        """
+        return self.transport.post(f"{self.base_url}{path}", endpoint=endpoint, **kwargs)
+
+    def send_events(self, events):
+        """批量投递事件，归档服务按event_id去重，重复投递是安全的
+
+        Args:
+            events: 事件字典列表，每项包含 event_id、event_type、occurred_at、payload
+
+        Returns:
+            requests.Response对象
+        """
+        return self.post('/events:batch', endpoint='events', json={"events": events})
+
+    def have_hashes(self, hashes):
+        """批量检查SHA-256是否已归档，在传输文件内容之前调用
+
+        Args:
+            hashes: SHA-256哈希值列表
+
+        Returns:
+            requests.Response对象，响应中 existing 为已归档哈希到 {id, file_path} 的映射，missing 为未归档的哈希
+        """
+        return self.post('/files/have-hashes', endpoint='lookup', json={"hashes": list(hashes)})
+
+    def get_files_by_hash(self, hashes):
+        """根据SHA-256批量获取归档文件（一个请求）
+
+        Args:
+            hashes: SHA-256哈希值列表
+
+        Returns:
+            requests.Response对象，响应中 files 为哈希到文件信息的映射，missing 为未找到的哈希
+        """
+        return self.post('/files/hash:batch', endpoint='lookup', json={"hashes": list(hashes)})
+
+    def download(self, file_id):
+        """流式下载归档文件，调用方读取完毕后必须关闭响应（with response: ...）
+
+        Args:
+            file_id: 归档文件ID
+
+        Returns:
+            stream=True的requests.Response对象
+        """
+        return self.get(f'/files/{file_id}/download', endpoint='download', stream=True)
+
+    def upload_file(self, file_path, filename=None, category='general', description=None,
+                    tags=None, sha256=None):
+        """以流式multipart上传文件到 /files，文件按块读取，不整体载入内存
+
+        Args:
+            file_path: 本地文件路径
+            filename: 归档使用的文件名，默认使用file_path的文件名
+            category: 文件分类
+            description: 文件描述
+            tags: 文件标签列表
+            sha256: 已计算的文件SHA-256，归档服务据此直接返回已存在的文件并校验上传内容
+
+        Returns:
+            requests.Response对象
+        """
+        body = MultipartFileStream(
+            file_path,
+            fields=[('category', category), ('description', description), ('tags', tags), ('sha256', sha256)],
+            filename=filename,
+        )
+        return self.post('/files', endpoint='upload', data=body, headers={'Content-Type': body.content_type})
+
+
+# 创建全局客户端实例
+archive_client = ArchiveClient()
+
+
+def fetch_files_by_hash(hashes):
+    """批量查询哈希对应的归档文件
+
+    Args:
+        hashes: SHA-256哈希值列表（不超过归档服务的单次上限）
+
+    Returns:
+        已找到的哈希值到文件信息字典的映射，请求失败时抛出异常
+    """
+    response = archive_client.get_files_by_hash(hashes)
+    if response.status_code != 200:
+        raise RuntimeError(f"归档服务返回错误: {response.status_code} - {response.text[:200]}")
+    return response.json().get('files') or {}
+
+
+# 并发的按哈希查询合并为批量请求
+hash_lookup_batcher = MicroBatcher(
+    fetch_files_by_hash,
+    max_batch_size=config.ARCHIVE_HASH_BATCH_MAX_SIZE,
+    linger=config.ARCHIVE_HASH_BATCH_LINGER_MS / 1000,
+)
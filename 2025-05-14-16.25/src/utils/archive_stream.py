@@ -0,0 +1,240 @@
+"""压缩包流式解压模块
+
+逐个成员流式解压ZIP/RAR：解压的同时计算SHA-256并嗅探文件头，无需二次读取；
+可转换的成员写入工作目录后立即交给调用方（可以边解压边提交转换），
+不支持的成员只读取文件头即跳过。嵌套ZIP在内存上限内直接在内存中打开，
+超出上限或嵌套RAR才落盘。按成员数和解压总大小限制防止压缩炸弹。
+"""
+
+import io
+import os
+import hashlib
+import logging
+import zipfile
+
+from src.utils.ingest import INGEST_CHUNK_SIZE, HEADER_SIZE
+
+logger = logging.getLogger(__name__)
+
+# 可转换的成员类型
+CONVERTIBLE_TYPES = ('pdf', 'docx', 'pptx', 'image')
+
+# 压缩包类型
+ARCHIVE_TYPES = ('zip', 'rar')
+
+# ZIP通用标志位：文件名使用UTF-8编码
+_ZIP_UTF8_FLAG = 0x800
+
+
+class ArchiveLimitError(Exception):
+    """压缩包超出成员数或解压大小限制（疑似压缩炸弹）"""
+
+
+class _Budget:
+    """整个压缩包（含所有嵌套层）共享的解压配额"""
+
+    def __init__(self, max_members, max_total_size):
+        self.max_members = max_members
+        self.max_total_size = max_total_size
+        self.members = 0
+        self.total_size = 0
+
+    def check_declared(self, infos, name):
+        """按压缩包目录中声明的成员数和大小预先检查，尽早拒绝明显的压缩炸弹"""
+        members = self.members + len(infos)
+        declared = self.total_size + sum(info.file_size for info in infos)
+        if members > self.max_members:
+            raise ArchiveLimitError(f"压缩包成员数超出限制: {name}, {members} > {self.max_members}")
+        if declared > self.max_total_size:
+            raise ArchiveLimitError(f"压缩包解压后大小超出限制: {name}, {declared} > {self.max_total_size} 字节")
+
+    def add_member(self):
+        self.members += 1
+        if self.members > self.max_members:
+            raise ArchiveLimitError(f"压缩包成员数超出限制: {self.max_members}")
+
+    def add_bytes(self, size):
+        self.total_size += size
+        if self.total_size > self.max_total_size:
+            raise ArchiveLimitError(f"压缩包解压后大小超出限制: {self.max_total_size} 字节")
+
+
+def decode_member_name(info):
+    """还原ZIP成员的原始文件名
+
+    未设置UTF-8标志的ZIP文件名被zipfile按cp437解码，依次尝试按utf-8、gbk还原。
+
+    Args:
+        info: ZipInfo或RarInfo对象
+
+    Returns:
+        文件名字符串
+    """
+    if not isinstance(info, zipfile.ZipInfo) or info.flag_bits & _ZIP_UTF8_FLAG:
+        return info.filename
+    for encoding in ('utf-8', 'gbk'):
+        try:
+            return info.filename.encode('cp437').decode(encoding)
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            continue
+    return info.filename
+
+
+def safe_filename(name):
+    """替换文件名中的非法字符"""
+    for char in r'<>:"/\|?*':
+        name = name.replace(char, '_')
+    return name
+
+
+def _should_skip(name):
+    """跳过隐藏文件和系统文件（如 .DS_Store、__MACOSX 下的资源文件）"""
+    basename = os.path.basename(name.rstrip('/\\'))
+    return (not basename or basename.startswith('.') or basename.startswith('__')
+            or '__MACOSX/' in name.replace('\\', '/'))
+
+
+def _open_archive(source, archive_type):
+    if archive_type == 'zip':
+        return zipfile.ZipFile(source, 'r')
+    # rarfile只在处理RAR时导入
+    import rarfile
+    return rarfile.RarFile(source, 'r')
+
+
+def _copy_stream(stream, first_chunk, outputs, hasher, budget, chunk_size):
+    """将已读取的首块和剩余数据写入输出，同时计算哈希并累计解压大小"""
+    chunk = first_chunk
+    while chunk:
+        budget.add_bytes(len(chunk))
+        hasher.update(chunk)
+        for out in outputs:
+            out.write(chunk)
+        chunk = stream.read(chunk_size)
+
+
+def iter_archive(source, work_dir, detect, archive_type='zip', archive_hash=None,
+                 max_members=None, max_total_size=None, max_depth=None,
+                 nested_memory_limit=None, chunk_size=INGEST_CHUNK_SIZE):
+    """流式遍历压缩包（含嵌套压缩包）中的可转换文件
+
+    每个可转换成员解压到work_dir后立即产出，调用方可以在后续成员解压的同时
+    提交转换。产出顺序与压缩包目录顺序一致，嵌套压缩包的成员在该压缩包位置展开。
+
+    Args:
+        source: 压缩包路径或可读的二进制文件对象
+        work_dir: 解压工作目录（调用方负责清理）
+        detect: 文件类型检测函数，签名为 detect(文件名, header=文件头字节)
+        archive_type: 顶层压缩包类型，zip或rar
+        archive_hash: 顶层压缩包的SHA-256（作为其成员的parent_hash）
+        max_members: 所有层级的成员总数上限，默认ARCHIVE_MAX_MEMBERS
+        max_total_size: 所有层级的解压总字节数上限，默认ARCHIVE_MAX_TOTAL_SIZE
+        max_depth: 最大嵌套深度（顶层为0），默认ARCHIVE_MAX_DEPTH
+        nested_memory_limit: 嵌套ZIP不超过此大小时在内存中处理，默认ARCHIVE_NESTED_MEMORY_LIMIT
+        chunk_size: 流式读取块大小
+
+    Yields:
+        成员字典，包含 path（解压后路径）、name（压缩包内文件名）、sha256、
+        file_type、size、depth、index（在所属压缩包中的序号，从1开始）、
+        parent_hash（所属压缩包哈希）、archive_name（所属嵌套压缩包在顶层中的路径，顶层为None）
+
+    Raises:
+        ArchiveLimitError: 超出成员数或解压大小限制
+    """
+    import src.settings as config
+
+    budget = _Budget(
+        max_members if max_members is not None else config.ARCHIVE_MAX_MEMBERS,
+        max_total_size if max_total_size is not None else config.ARCHIVE_MAX_TOTAL_SIZE,
+    )
+    options = {
+        'work_dir': work_dir,
+        'detect': detect,
+        'budget': budget,
+        'max_depth': max_depth if max_depth is not None else config.ARCHIVE_MAX_DEPTH,
+        'nested_memory_limit': (nested_memory_limit if nested_memory_limit is not None
+                                else config.ARCHIVE_NESTED_MEMORY_LIMIT),
+        'chunk_size': chunk_size,
+        'sequence': [0],
+    }
+    yield from _iter_level(source, archive_type, archive_hash, None, 0, options)
+
+
+def _iter_level(source, archive_type, archive_hash, archive_name, depth, options):
+    """遍历一层压缩包"""
+    budget = options['budget']
+    work_dir = options['work_dir']
+    chunk_size = options['chunk_size']
+    label = archive_name or (source if isinstance(source, str) else '<stream>')
+
+    with _open_archive(source, archive_type) as archive:
+        infos = [info for info in archive.infolist() if not info.is_dir()]
+        budget.check_declared(infos, label)
+
+        index = 0
+        for info in infos:
+            budget.add_member()
+            name = decode_member_name(info)
+            if _should_skip(name):
+                logger.info(f"跳过隐藏/系统文件: {name}")
+                continue
+
+            index += 1
+            basename = safe_filename(os.path.basename(name.replace('\\', '/')))
+            with archive.open(info) as stream:
+                first_chunk = stream.read(chunk_size)
+                file_type = options['detect'](basename, header=first_chunk[:HEADER_SIZE])
+
+                if file_type in ARCHIVE_TYPES and depth >= options['max_depth']:
+                    logger.warning(f"达到最大嵌套深度 {options['max_depth']}，跳过压缩包: {name}")
+                    continue
+                if file_type not in CONVERTIBLE_TYPES and file_type not in ARCHIVE_TYPES:
+                    logger.info(f"跳过不支持的文件类型: {name} ({file_type})")
+                    continue
+
+                # 工作目录中的文件名加全局序号，避免不同目录/层级的同名文件冲突
+                options['sequence'][0] += 1
+                target = os.path.join(work_dir, f"{options['sequence'][0]:05d}_{basename}")
+                hasher = hashlib.sha256()
+
+                # 较小的嵌套ZIP直接在内存中打开，无需落盘
+                in_memory = file_type == 'zip' and info.file_size <= options['nested_memory_limit']
+                if in_memory:
+                    buffer = io.BytesIO()
+                    _copy_stream(stream, first_chunk, [buffer], hasher, budget, chunk_size)
+                    buffer.seek(0)
+                else:
+                    try:
+                        with open(target, 'wb') as out:
+                            _copy_stream(stream, first_chunk, [out], hasher, budget, chunk_size)
+                    except Exception:
+                        if os.path.exists(target):
+                            os.remove(target)
+                        raise
+
+            sha256 = hasher.hexdigest()
+            if file_type in ARCHIVE_TYPES:
+                nested_name = f"{archive_name}/{name}" if archive_name else name
+                logger.info(f"发现嵌套压缩包: {nested_name}, 深度 {depth + 1}, "
+                            f"{'内存中' if in_memory else '临时文件'}处理")
+                try:
+                    yield from _iter_level(buffer if in_memory else target, file_type, sha256,
+                                           nested_name, depth + 1, options)
+                finally:
+                    if in_memory:
+                        buffer.close()
+                    elif os.path.exists(target):
+                        os.remove(target)
+                continue
+
+            yield {
+                'path': target,
+                'name': name,
+                'sha256': sha256,
+                'file_type': file_type,
+                'size': os.path.getsize(target),
+                'depth': depth,
+                'index': index,
+                'parent_hash': archive_hash,
+                'archive_name': archive_name,
+            }
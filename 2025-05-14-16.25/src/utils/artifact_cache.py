@@ -0,0 +1,323 @@
+"""转换产物本地缓存模块
+
+在convert-svc前面为 /files/<path> 提供有大小上限的本地磁盘缓存：
+文件内容保存在缓存目录中，元数据（内容SHA-256、大小、类型、上游Last-Modified）
+保存在SQLite中。内容哈希作为强ETag，由send_file处理304和Range请求。
+条目超过TTL后使用If-Modified-Since向上游重新验证；同一文件的并发未命中
+只发起一次上游请求（进程内按键加锁）。
+"""
+
+import os
+import time
+import uuid
+import sqlite3
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 下载块大小
+ARTIFACT_CHUNK_SIZE = 64 * 1024
+
+# 按键加锁的分段数
+_LOCK_STRIPES = 64
+
+
+class ArtifactFetchError(Exception):
+    """上游返回错误状态码，且没有可用的缓存副本"""
+
+    def __init__(self, status_code, message=None):
+        super().__init__(message or f"上游返回状态码 {status_code}")
+        self.status_code = status_code
+
+
+class ArtifactCache:
+    """基于本地磁盘和SQLite的转换产物缓存"""
+
+    def __init__(self, cache_dir=None, max_bytes=None, ttl=None):
+        """初始化缓存
+
+        Args:
+            cache_dir: 缓存目录，为None时使用settings.ARTIFACT_CACHE_DIR
+            max_bytes: 缓存文件总大小上限（字节），为None时使用settings.ARTIFACT_CACHE_MAX_BYTES
+            ttl: 条目无需向上游验证即可使用的时间（秒），为None时使用settings.ARTIFACT_CACHE_TTL
+        """
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stripes = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+        self._stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'coalesced': 0, 'stale_served': 0, 'evictions': 0}
+
+    def _config(self, name):
+        import src.settings as config
+        return getattr(config, name)
+
+    @property
+    def cache_dir(self):
+        """缓存目录（延迟解析，便于配置覆盖）"""
+        if self._cache_dir is None:
+            self._cache_dir = self._config('ARTIFACT_CACHE_DIR')
+        return self._cache_dir
+
+    @property
+    def max_bytes(self):
+        if self._max_bytes is None:
+            self._max_bytes = self._config('ARTIFACT_CACHE_MAX_BYTES')
+        return self._max_bytes
+
+    @property
+    def ttl(self):
+        if self._ttl is None:
+            self._ttl = self._config('ARTIFACT_CACHE_TTL')
+        return self._ttl
+
+    def _connect(self):
+        """获取当前线程（和进程）专用的SQLite连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and getattr(self._local, 'pid', None) == os.getpid():
+            return conn
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(self.cache_dir, 'artifacts.db'), timeout=5)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS artifacts (
+                cache_key TEXT PRIMARY KEY,
+                blob VARCHAR(64) NOT NULL,
+                etag VARCHAR(64) NOT NULL,
+                size INTEGER NOT NULL,
+                content_type VARCHAR(128),
+                last_modified VARCHAR(64),
+                fetched_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_artifacts_last_used ON artifacts (last_used_at)')
+        conn.commit()
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._stats[name] += n
+
+    def _blob_path(self, blob):
+        return os.path.join(self.cache_dir, blob[:2], blob)
+
+    def lookup(self, key):
+        """查询缓存条目
+
+        Returns:
+            条目字典（含本地文件路径path），不存在或文件已丢失返回None
+        """
+        row = self._connect().execute('SELECT * FROM artifacts WHERE cache_key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry['path'] = self._blob_path(entry['blob'])
+        if not os.path.exists(entry['path']):
+            self.invalidate(key)
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        """条目是否在TTL内，无需向上游验证"""
+        return time.time() - entry['fetched_at'] < self.ttl
+
+    def get_or_fetch(self, key, fetcher):
+        """获取缓存条目，未命中或过期时通过fetcher向上游获取
+
+        同一键的并发请求只有一个会访问上游，其余等待其结果。
+
+        Args:
+            key: 缓存键（convert-svc下的相对路径）
+            fetcher: 上游请求函数，签名为 fetcher(headers)，返回流式响应对象
+
+        Returns:
+            条目字典
+
+        Raises:
+            ArtifactFetchError: 上游返回错误且没有可用的缓存副本
+        """
+        entry = self.lookup(key)
+        if entry and self.is_fresh(entry):
+            self._count('hits')
+            self._touch(key)
+            return entry
+
+        with self._stripes[hash(key) % _LOCK_STRIPES]:
+            # 等待期间其他线程可能已经完成获取
+            refreshed = self.lookup(key)
+            if refreshed and self.is_fresh(refreshed):
+                self._count('coalesced')
+                self._touch(key)
+                return refreshed
+            return self._fetch(key, refreshed, fetcher)
+
+    def _fetch(self, key, entry, fetcher):
+        """向上游获取或重新验证条目（调用方持有该键的锁）"""
+        headers = {}
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            response = fetcher(headers)
+        except Exception as e:
+            if entry:
+                # 上游不可用时使用旧副本
+                logger.warning(f"上游不可用，使用过期缓存: {key}, 错误: {str(e)}")
+                self._count('stale_served')
+                return entry
+            raise
+
+        try:
+            if response.status_code == 304 and entry:
+                self._count('revalidated')
+                now = time.time()
+                conn = self._connect()
+                conn.execute(
+                    'UPDATE artifacts SET fetched_at = ?, last_used_at = ? WHERE cache_key = ?', (now, now, key)
+                )
+                conn.commit()
+                entry['fetched_at'] = now
+                return entry
+
+            if response.status_code != 200:
+                if entry and response.status_code >= 500:
+                    self._count('stale_served')
+                    return entry
+                if entry:
+                    self.invalidate(key)
+                raise ArtifactFetchError(response.status_code)
+
+            self._count('misses')
+            return self._store(
+                key,
+                response.iter_content(chunk_size=ARTIFACT_CHUNK_SIZE),
+                response.headers.get('Content-Type'),
+                response.headers.get('Last-Modified'),
+                previous=entry,
+            )
+        finally:
+            response.close()
+
+    def _store(self, key, chunks, content_type, last_modified, previous=None):
+        """写入缓存文件（边下载边计算内容哈希）并更新元数据"""
+        blob = uuid.uuid4().hex
+        path = self._blob_path(blob)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, 'wb') as out:
+                for chunk in chunks:
+                    if chunk:
+                        hasher.update(chunk)
+                        out.write(chunk)
+                        size += len(chunk)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO artifacts (cache_key, blob, etag, size, content_type, last_modified, '
+            'fetched_at, last_used_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (key, blob, hasher.hexdigest(), size, content_type, last_modified, now, now)
+        )
+        conn.commit()
+        if previous:
+            self._remove_blob(previous['blob'])
+        self._evict(conn, keep=key)
+        return self.lookup(key)
+
+    def _touch(self, key):
+        try:
+            conn = self._connect()
+            conn.execute('UPDATE artifacts SET last_used_at = ? WHERE cache_key = ?', (time.time(), key))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"更新缓存使用时间失败: {str(e)}")
+
+    def _remove_blob(self, blob):
+        try:
+            os.remove(self._blob_path(blob))
+        except OSError:
+            pass
+
+    def _evict(self, conn, keep=None):
+        """超出总大小上限时，淘汰最久未使用的条目（不淘汰keep）"""
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM artifacts').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = []
+        for row in conn.execute('SELECT cache_key, blob, size FROM artifacts ORDER BY last_used_at').fetchall():
+            if total <= self.max_bytes:
+                break
+            if row['cache_key'] == keep:
+                continue
+            evicted.append(row)
+            total -= row['size']
+
+        conn.executemany('DELETE FROM artifacts WHERE cache_key = ?', [(row['cache_key'],) for row in evicted])
+        conn.commit()
+        # 已打开文件的读取不受删除影响
+        for row in evicted:
+            self._remove_blob(row['blob'])
+        self._count('evictions', len(evicted))
+        logger.info(f"转换产物缓存淘汰 {len(evicted)} 个文件")
+
+    def invalidate(self, key):
+        """删除缓存条目（如文件被重命名或删除）"""
+        conn = self._connect()
+        row = conn.execute('SELECT blob FROM artifacts WHERE cache_key = ?', (key,)).fetchone()
+        if row is None:
+            return
+        conn.execute('DELETE FROM artifacts WHERE cache_key = ?', (key,))
+        conn.commit()
+        self._remove_blob(row['blob'])
+
+    def invalidate_prefix(self, prefix):
+        """删除以指定前缀开头的所有缓存条目（如整个订单目录）"""
+        conn = self._connect()
+        rows = conn.execute(
+            'SELECT cache_key, blob FROM artifacts WHERE substr(cache_key, 1, ?) = ?', (len(prefix), prefix)
+        ).fetchall()
+        if not rows:
+            return
+        conn.executemany('DELETE FROM artifacts WHERE cache_key = ?', [(row['cache_key'],) for row in rows])
+        conn.commit()
+        for row in rows:
+            self._remove_blob(row['blob'])
+
+    def stats(self):
+        """返回缓存统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+        try:
+            entries, total = self._connect().execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts'
+            ).fetchone()
+        except sqlite3.Error:
+            entries, total = None, None
+        stats['entries'] = entries
+        stats['bytes'] = total
+        stats['max_bytes'] = self.max_bytes
+        lookups = stats['hits'] + stats['coalesced'] + stats['revalidated'] + stats['misses']
+        served_locally = stats['hits'] + stats['coalesced'] + stats['revalidated']
+        stats['hit_rate'] = round(served_locally / lookups, 4) if lookups else 0.0
+        return stats
+
+
+# 进程级共享实例
+artifact_cache = ArtifactCache()
@@ -0,0 +1,216 @@
+"""转换结果缓存模块
+
+以 (源文件SHA-256, 文件类型, DPI, 转换器版本) 为键，记录convert-svc生成的PNG文件列表
+（相对于转换目录的路径）。命中时由convert-svc将已有PNG链接到新订单目录，
+无需重新渲染。缓存按条目数和PNG总数限制大小，超出时按最近使用时间淘汰。
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ConversionCache:
+    """基于SQLite的转换结果缓存"""
+
+    def __init__(self, db_path=None, max_entries=None, max_artifacts=None):
+        """初始化缓存
+
+        Args:
+            db_path: SQLite缓存文件路径，为None时使用settings.CONVERSION_CACHE_DB
+            max_entries: 最大缓存条目数，为None时使用settings.CONVERSION_CACHE_MAX_ENTRIES
+            max_artifacts: 所有条目包含的PNG文件总数上限，为None时使用settings.CONVERSION_CACHE_MAX_ARTIFACTS
+        """
+        self._db_path = db_path
+        self._max_entries = max_entries
+        self._max_artifacts = max_artifacts
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stale': 0, 'stores': 0, 'evictions': 0}
+
+    def _config(self, name):
+        import src.settings as config
+        return getattr(config, name)
+
+    @property
+    def db_path(self):
+        """缓存数据库路径（延迟解析，便于配置覆盖）"""
+        if self._db_path is None:
+            self._db_path = self._config('CONVERSION_CACHE_DB')
+        return self._db_path
+
+    @property
+    def max_entries(self):
+        if self._max_entries is None:
+            self._max_entries = self._config('CONVERSION_CACHE_MAX_ENTRIES')
+        return self._max_entries
+
+    @property
+    def max_artifacts(self):
+        if self._max_artifacts is None:
+            self._max_artifacts = self._config('CONVERSION_CACHE_MAX_ARTIFACTS')
+        return self._max_artifacts
+
+    def _connect(self):
+        """获取当前线程（和进程）专用的SQLite连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and getattr(self._local, 'pid', None) == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS conversions (
+                cache_key VARCHAR(128) PRIMARY KEY,
+                files TEXT NOT NULL,
+                file_count INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_conversions_last_used ON conversions (last_used_at)')
+        conn.commit()
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._stats[name] += n
+
+    @staticmethod
+    def make_key(sha256, file_type, dpi=None, converter_version=None):
+        """生成缓存键
+
+        Args:
+            sha256: 源文件SHA-256
+            file_type: 文件类型 (pdf, docx, pptx, image)
+            dpi: 输出DPI（图片转换不使用DPI，传None）
+            converter_version: 转换器版本，为None时使用settings.CONVERTER_VERSION
+
+        Returns:
+            缓存键字符串
+        """
+        if converter_version is None:
+            import src.settings as config
+            converter_version = config.CONVERTER_VERSION
+        return f"{sha256}:{file_type}:{dpi or 0}:{converter_version}"
+
+    def get(self, key):
+        """查询缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            PNG文件相对路径列表，未命中返回None
+        """
+        try:
+            conn = self._connect()
+            row = conn.execute('SELECT files FROM conversions WHERE cache_key = ?', (key,)).fetchone()
+            if row:
+                conn.execute(
+                    'UPDATE conversions SET last_used_at = ?, hits = hits + 1 WHERE cache_key = ?',
+                    (time.time(), key)
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"读取转换缓存失败: {str(e)}")
+            row = None
+
+        if row is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return json.loads(row[0])
+
+    def put(self, key, files):
+        """写入缓存并按需淘汰
+
+        Args:
+            key: 缓存键
+            files: PNG文件相对路径列表
+        """
+        if not files:
+            return
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO conversions (cache_key, files, file_count, created_at, last_used_at, hits) '
+                'VALUES (?, ?, ?, ?, ?, 0)',
+                (key, json.dumps(files), len(files), now, now)
+            )
+            conn.commit()
+            self._count('stores')
+            self._evict(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"写入转换缓存失败: {str(e)}")
+
+    def _evict(self, conn):
+        """超出条目数或PNG总数上限时，淘汰最久未使用的条目"""
+        entries, artifacts = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(file_count), 0) FROM conversions'
+        ).fetchone()
+        if entries <= self.max_entries and artifacts <= self.max_artifacts:
+            return
+
+        evicted = []
+        for cache_key, file_count in conn.execute(
+            'SELECT cache_key, file_count FROM conversions ORDER BY last_used_at'
+        ).fetchall():
+            if entries <= self.max_entries and artifacts <= self.max_artifacts:
+                break
+            evicted.append((cache_key,))
+            entries -= 1
+            artifacts -= file_count
+
+        conn.executemany('DELETE FROM conversions WHERE cache_key = ?', evicted)
+        conn.commit()
+        self._count('evictions', len(evicted))
+        logger.info(f"转换缓存淘汰 {len(evicted)} 个条目")
+
+    def invalidate(self, key):
+        """删除失效的缓存条目（如源PNG已被删除或重命名）
+
+        Args:
+            key: 缓存键
+        """
+        try:
+            conn = self._connect()
+            conn.execute('DELETE FROM conversions WHERE cache_key = ?', (key,))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"删除转换缓存失败: {str(e)}")
+        self._count('stale')
+
+    def stats(self):
+        """返回缓存统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+        try:
+            entries, artifacts = self._connect().execute(
+                'SELECT COUNT(*), COALESCE(SUM(file_count), 0) FROM conversions'
+            ).fetchone()
+        except sqlite3.Error:
+            entries, artifacts = None, None
+        stats['entries'] = entries
+        stats['artifacts'] = artifacts
+        stats['max_entries'] = self.max_entries
+        stats['max_artifacts'] = self.max_artifacts
+        lookups = stats['hits'] + stats['misses']
+        # 失效条目虽然查到了，但未能复用，不计入命中
+        effective_hits = stats['hits'] - stats['stale']
+        stats['hit_rate'] = round(effective_hits / lookups, 4) if lookups else 0.0
+        return stats
+
+
+# 进程级共享实例
+conversion_cache = ConversionCache()
@@ -1,38 +1,107 @@
 import os
 import requests
 import json
-from flask import current_app, flash
 import logging
 import urllib.parse
 import hashlib
 
+import src.settings as config
+from src.utils.http_pool import PooledTransport
+from src.utils.health_monitor import health_monitor
+
+# 健康监控和熔断器中使用的服务名称
+SERVICE_NAME = 'convert-svc'
+
 # 设置日志级别
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class ConvertClient:
-    """文件转换服务客户端"""
+    """文件转换服务客户端
     
-    def __init__(self, base_url=None):
+    所有请求通过进程内共享的连接池Session发送，线程安全，可在路由和服务之间复用。
+    """
+    
+    def __init__(self, base_url=None, pool_connections=None, pool_maxsize=None,
+                 keep_alive=None, timeouts=None):
         """初始化客户端
         
         Args:
             base_url: 转换服务的基础URL，如果为None则从环境变量或配置获取
+            pool_connections: 缓存的主机连接池数量，默认使用CONVERT_POOL_CONNECTIONS
+            pool_maxsize: 每个主机的最大连接数，默认使用CONVERT_POOL_MAXSIZE
+            keep_alive: 是否复用连接，默认使用CONVERT_KEEP_ALIVE
+            timeouts: 端点读取超时覆盖，键为health/convert/batch/rename/files
+        """
+        self.base_url = base_url or os.environ.get('CONVERT_SVC_URL', config.CONVERT_SVC_URL)
+        
+        endpoint_timeouts = {
+            'health': config.CONVERT_TIMEOUT_HEALTH,
+            'convert': config.CONVERT_TIMEOUT_CONVERT,
+            'batch': config.CONVERT_TIMEOUT_BATCH,
+            'rename': config.CONVERT_TIMEOUT_RENAME,
+            'files': config.CONVERT_TIMEOUT_FILES,
+        }
+        endpoint_timeouts.update(timeouts or {})
+        
+        self.transport = PooledTransport(
+            pool_connections=pool_connections or config.CONVERT_POOL_CONNECTIONS,
+            pool_maxsize=pool_maxsize or config.CONVERT_POOL_MAXSIZE,
+            keep_alive=config.CONVERT_KEEP_ALIVE if keep_alive is None else keep_alive,
+            connect_timeout=config.CONVERT_CONNECT_TIMEOUT,
+            timeouts=endpoint_timeouts,
+            default_timeout=config.CONVERT_TIMEOUT_FILES,
+            on_result=lambda success: health_monitor.report(SERVICE_NAME, success),
+            before_request=lambda: health_monitor.acquire(SERVICE_NAME),
+        )
+    
+    @property
+    def session(self):
+        """当前进程共享的requests.Session"""
+        return self.transport.session
+    
+    def get(self, url, endpoint='files', **kwargs):
+        """通过连接池发送GET请求（如下载转换后的文件）
+        
+        Args:
+            url: 完整URL或以/开头的服务路径
+            endpoint: 端点名称，用于选择超时
+            
+        Returns:
+            requests.Response对象
         """
-        self.base_url = base_url or os.environ.get('CONVERT_SVC_URL', 'http://localhost:8081')
+        if url.startswith('/'):
+            url = f"{self.base_url}{url}"
+        return self.transport.get(url, endpoint=endpoint, **kwargs)
+    
+    def post(self, url, endpoint='convert', **kwargs):
+        """通过连接池发送POST请求
+        
+        Args:
+            url: 完整URL或以/开头的服务路径
+            endpoint: 端点名称，用于选择超时
+            
+        Returns:
+            requests.Response对象
+        """
+        if url.startswith('/'):
+            url = f"{self.base_url}{url}"
+        return self.transport.post(url, endpoint=endpoint, **kwargs)
     
     def health_check(self):
-        """检查转换服务是否正常运行
+        """检查转换服务是否正常运行（由健康监控器定期调用，请求路径上读取监控器的缓存状态）
         
         Returns:
             服务正常运行返回True，否则返回False
         """
         try:
-            response = requests.get(f"{self.base_url}/health", timeout=5)
-            return response.status_code == 200 and response.json().get('status') == 'ok'
+            # 探测结果由健康监控器统一记录，这里不重复上报熔断器
+            response = self.get('/health', endpoint='health', report=False)
+            healthy = response.status_code == 200 and response.json().get('status') == 'ok'
         except Exception as e:
             logger.error(f"连接转换服务失败: {str(e)}")
-            return False
+            healthy = False
+        return healthy
     
     def generate_source_id(self, file_path, parent_id=None):
         """生成源文件标识符
@@ -98,7 +167,7 @@ class ConvertClient:
             # 记录请求负载
             logger.info(f"发送转换请求: {payload}")
             
-            response = requests.post(f"{self.base_url}/api/convert", json=payload, timeout=60)
+            response = self.post('/api/convert', endpoint='convert', json=payload)
             if response.status_code == 200:
                 result = response.json()
                 if result["success"]:
@@ -200,7 +269,7 @@ class ConvertClient:
             # 记录请求负载
             logger.info(f"发送批量转换请求，包含 {len(files)} 个文件")
             
-            response = requests.post(f"{self.base_url}/api/convert-batch", json=payload, timeout=120)
+            response = self.post('/api/convert-batch', endpoint='batch', json=payload)
             if response.status_code == 200:
                 result = response.json()
                 
@@ -285,5 +354,61 @@ class ConvertClient:
             "filename": filename
         }
 
-# 创建默认客户端实例
-convert_client = ConvertClient() 
\ No newline at end of file
+    def link_files(self, files, order_id=None):
+        """将已转换的PNG链接到订单目录（转换缓存命中时使用，不重新渲染）
+        
+        Args:
+            files: 已转换文件路径列表（相对于转换目录）
+            order_id: 目标订单号
+            
+        Returns:
+            链接成功返回新文件URL列表，任一源文件不存在或调用失败返回None
+        """
+        payload = {"files": files}
+        if order_id is not None:
+            payload["order_id"] = str(order_id)
+        
+        try:
+            response = self.post('/api/link', endpoint='convert', json=payload)
+            if response.status_code == 200:
+                result = response.json()
+                if result.get("success"):
+                    return [self.get_file_url(f) for f in result.get("files", [])]
+            logger.warning(f"链接已转换文件失败: {response.status_code}, {response.text}")
+        except Exception as e:
+            logger.error(f"调用链接服务失败: {str(e)}")
+        
+        return None
+    
+    def relative_path(self, file_url):
+        """从文件URL中提取相对于转换目录的路径
+        
+        Args:
+            file_url: get_file_url生成的文件URL
+            
+        Returns:
+            相对路径
+        """
+        if '/files/' in file_url:
+            return urllib.parse.unquote(file_url.split('/files/', 1)[1])
+        return os.path.basename(file_url)
+    
+    def rename_files(self, items, order_id=None):
+        """调用转换服务批量重命名已转换的文件（一次请求）
+        
+        Args:
+            items: [(原文件路径, 新文件名), ...]
+            order_id: 订单号（用于定位订单目录）
+            
+        Returns:
+            requests.Response对象，响应中的results与items顺序一致
+        """
+        payload = {
+            "items": [{"original_path": path, "new_name": name} for path, name in items]
+        }
+        if order_id is not None:
+            payload["order_id"] = str(order_id)
+        return self.post('/api/rename-batch', endpoint='rename', json=payload)
+
+# 创建默认客户端实例（进程级共享，路由和服务都应使用此实例）
+convert_client = ConvertClient()
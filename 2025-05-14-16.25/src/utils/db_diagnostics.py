@@ -0,0 +1,144 @@
+"""数据库诊断工具
+
+统计一段代码执行的SQL语句数，用于定位N+1查询和验证查询优化；
+捕获SQLite查询计划，用于发现缺少索引的全表扫描。
+
+用法:
+    with count_statements() as counter:
+        JobService.convert_files(order_id, file_ids)
+    print(counter.count, counter.count_table('orders'))
+
+    with capture_query_plans() as plans:
+        FileRepository.get_converted_files_by_order(1)
+    for plan in plans:
+        print(plan.statement, plan.table_scans())
+"""
+
+import re
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+
+# 需要检查查询计划的语句类型（INSERT没有WHERE条件，不涉及索引选择）
+_EXPLAINED_VERBS = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+
+# 查询计划中的全表扫描（SQLite 3.36起为 "SCAN t"，之前为 "SCAN TABLE t"）
+_TABLE_SCAN = re.compile(r'^SCAN (?:TABLE )?(?!CONSTANT ROW|SUBQUERY)(\w+)\b(?! USING)')
+
+
+class StatementCounter:
+    """SQL语句计数器（作为before_cursor_execute事件的监听函数）"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        """执行的语句总数"""
+        return len(self.statements)
+
+    def count_table(self, table, verb='SELECT'):
+        """统计访问指定表的某类语句数
+
+        Args:
+            table: 表名
+            verb: 语句类型（SELECT、INSERT、UPDATE、DELETE），为None时不限类型
+
+        Returns:
+            语句数
+        """
+        pattern = re.compile(r'\b(FROM|INTO|UPDATE|JOIN)\s+"?' + re.escape(table) + r'"?\b', re.IGNORECASE)
+        return sum(
+            1 for statement in self.statements
+            if pattern.search(statement)
+            and (verb is None or statement.lstrip().upper().startswith(verb.upper()))
+        )
+
+    def summary(self):
+        """按语句类型汇总"""
+        result = {}
+        for statement in self.statements:
+            verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+            result[verb] = result.get(verb, 0) + 1
+        return result
+
+
+@contextmanager
+def count_statements(engine=None):
+    """统计代码块内在指定引擎上执行的SQL语句
+
+    Args:
+        engine: SQLAlchemy引擎，为None时使用应用的db.engine（需要在应用上下文中调用）
+
+    Yields:
+        StatementCounter
+    """
+    if engine is None:
+        from src.models import db
+        engine = db.engine
+
+    counter = StatementCounter()
+    event.listen(engine, 'before_cursor_execute', counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter)
+
+
+class QueryPlan:
+    """一条语句的查询计划"""
+
+    def __init__(self, statement, parameters, rows):
+        self.statement = statement
+        self.parameters = parameters
+        # EXPLAIN QUERY PLAN 每行为 (id, parent, notused, detail)
+        self.details = [row[-1] for row in rows]
+
+    def table_scans(self):
+        """计划中未使用索引的全表扫描涉及的表名列表"""
+        return [match.group(1) for match in (_TABLE_SCAN.match(d) for d in self.details) if match]
+
+    def temp_sorts(self):
+        """计划中需要临时B树排序/分组的步骤"""
+        return [d for d in self.details if d.startswith('USE TEMP B-TREE')]
+
+
+@contextmanager
+def capture_query_plans(engine=None):
+    """捕获代码块内SELECT/UPDATE/DELETE语句的查询计划（仅SQLite）
+
+    每条语句执行前在同一连接的另一个游标上执行 EXPLAIN QUERY PLAN，原语句随后照常执行，
+    因此ORM能正常读取结果，后续语句也会被捕获；更新和删除会真正生效，调用方应使用一次性的数据库。
+
+    Args:
+        engine: SQLAlchemy引擎，为None时使用应用的db.engine（需要在应用上下文中调用）
+
+    Yields:
+        QueryPlan列表（代码块执行期间逐条追加）
+    """
+    if engine is None:
+        from src.models import db
+        engine = db.engine
+
+    plans = []
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+        if executemany or verb not in _EXPLAINED_VERBS:
+            return
+        explain = cursor.connection.cursor()
+        try:
+            explain.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            plans.append(QueryPlan(statement, parameters, explain.fetchall()))
+        finally:
+            explain.close()
+
+    event.listen(engine, 'before_cursor_execute', before)
+    try:
+        yield plans
+    finally:
+        event.remove(engine, 'before_cursor_execute', before)
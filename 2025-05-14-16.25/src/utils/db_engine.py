@@ -0,0 +1,94 @@
+"""数据库引擎配置模块
+
+按数据库类型生成SQLAlchemy引擎参数：
+  - SQLite文件库：连接池大小，以及每个连接建立时执行的PRAGMA
+    （WAL日志、synchronous=NORMAL、busy_timeout、页缓存、mmap），
+    使读请求不阻塞写入，并发写入排队等待而不是立即报 "database is locked"
+  - PostgreSQL等：连接池大小、溢出、回收时间和连接预检
+  - 内存SQLite：保持Flask-SQLAlchemy的默认设置（单连接StaticPool）
+"""
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def _setting(config, name, default):
+    value = config.get(name)
+    return default if value is None else value
+
+
+def is_memory_sqlite(url):
+    """是否为内存SQLite数据库"""
+    url = make_url(url)
+    return url.get_backend_name() == 'sqlite' and (
+        url.database in (None, '', ':memory:') or url.query.get('mode') == 'memory'
+    )
+
+
+def engine_options(config):
+    """生成SQLALCHEMY_ENGINE_OPTIONS
+
+    Args:
+        config: 配置映射（app.config或字典），需包含SQLALCHEMY_DATABASE_URI
+
+    Returns:
+        引擎参数字典
+    """
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if is_memory_sqlite(url):
+        return {}
+
+    options = {
+        'pool_size': _setting(config, 'DB_POOL_SIZE', 10),
+        'max_overflow': _setting(config, 'DB_MAX_OVERFLOW', 20),
+        'pool_timeout': _setting(config, 'DB_POOL_TIMEOUT', 30),
+    }
+    if url.get_backend_name() == 'sqlite':
+        # 连接由连接池在线程间复用
+        options['connect_args'] = {'check_same_thread': False}
+    else:
+        # 服务端数据库：定期回收连接，取出前检查连接是否仍然可用
+        options['pool_recycle'] = _setting(config, 'DB_POOL_RECYCLE', 1800)
+        options['pool_pre_ping'] = True
+    return options
+
+
+def sqlite_pragmas(config):
+    """每个SQLite连接建立时执行的PRAGMA语句列表"""
+    return [
+        f"PRAGMA journal_mode={_setting(config, 'SQLITE_JOURNAL_MODE', 'WAL')}",
+        f"PRAGMA synchronous={_setting(config, 'SQLITE_SYNCHRONOUS', 'NORMAL')}",
+        f"PRAGMA busy_timeout={int(_setting(config, 'SQLITE_BUSY_TIMEOUT_MS', 10000))}",
+        # 负数表示以KiB为单位
+        f"PRAGMA cache_size=-{int(_setting(config, 'SQLITE_CACHE_SIZE_KB', 65536))}",
+        f"PRAGMA mmap_size={int(_setting(config, 'SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+        'PRAGMA temp_store=MEMORY',
+    ]
+
+
+def configure_engine(engine, config):
+    """为引擎注册连接初始化（SQLite文件库执行PRAGMA），需在首次连接前调用
+
+    Args:
+        engine: SQLAlchemy引擎
+        config: 配置映射
+
+    Returns:
+        描述引擎配置的字符串（用于启动日志）
+    """
+    backend = engine.url.get_backend_name()
+    if backend != 'sqlite' or is_memory_sqlite(engine.url):
+        return f"{backend}, pool={engine.pool.status()}"
+
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    return f"sqlite, {'; '.join(p[len('PRAGMA '):] for p in pragmas)}, pool={engine.pool.status()}"
@@ -1,10 +1,9 @@
 import os
 import hashlib
 import tempfile
-from PIL import Image, ImageDraw, ImageFont
-import fitz  # PyMuPDF
-import docx
-from pptx import Presentation
+
+# PIL、PyMuPDF只在已弃用的本地转换函数中使用，在函数内按需导入，
+# 避免每个Web worker启动时都加载这些库
 
 # 添加缺失的函数
 def process_uploaded_file(file, upload_dir):
@@ -48,6 +47,8 @@ def create_info_image(filename, message, output_dir=None):
     Returns:
         生成的图片路径
     """
+    from PIL import Image, ImageDraw, ImageFont
+    
     # 设置图片尺寸和背景色
     width, height = 800, 600
     background_color = (255, 255, 255)
@@ -110,6 +111,8 @@ def convert_pdf_to_png(pdf_path, output_dir=None, dpi=300):
     # 获取文件名（不含扩展名）
     base_name = os.path.splitext(os.path.basename(pdf_path))[0]
     
+    import fitz  # PyMuPDF
+    
     # 打开PDF文件
     pdf_document = fitz.open(pdf_path)
     
@@ -273,6 +276,8 @@ def convert_image_to_png(image_path, output_dir=None):
     output_filename = f"{base_name}.png"
     output_path = os.path.join(output_dir, output_filename)
     
+    from PIL import Image
+    
     try:
         # 打开图片
         img = Image.open(image_path)
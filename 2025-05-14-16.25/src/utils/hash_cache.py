@@ -0,0 +1,188 @@
+"""文件哈希缓存模块
+
+以 (device, inode, size, mtime_ns) 作为内容版本键缓存SHA-256：
+进程内LRU作为一级缓存，SQLite文件作为持久化二级缓存，
+保证同一文件内容在变更前只计算一次哈希。
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# 计算哈希时的读取块大小
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def compute_sha256(file_path, chunk_size=HASH_CHUNK_SIZE):
+    """分块计算文件的SHA-256哈希值
+
+    Args:
+        file_path: 文件路径
+        chunk_size: 读取块大小
+
+    Returns:
+        文件哈希值（16进制字符串）
+    """
+    hasher = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class HashCache:
+    """基于文件元数据的SHA-256缓存"""
+
+    def __init__(self, db_path=None, max_entries=4096):
+        """初始化缓存
+
+        Args:
+            db_path: SQLite缓存文件路径，为None时使用settings.HASH_CACHE_DB
+            max_entries: 进程内LRU的最大条目数
+        """
+        self._db_path = db_path
+        self.max_entries = max_entries
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+
+    @property
+    def db_path(self):
+        """缓存数据库路径（延迟解析，便于测试和配置覆盖）"""
+        if self._db_path is None:
+            import src.settings as config
+            self._db_path = config.HASH_CACHE_DB
+        return self._db_path
+
+    def _connect(self):
+        """获取当前线程（和进程）专用的SQLite连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and getattr(self._local, 'pid', None) == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS file_hashes (
+                device INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 VARCHAR(64) NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (device, inode, size, mtime_ns)
+            )
+        ''')
+        conn.commit()
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _key(file_path):
+        """根据文件元数据生成缓存键"""
+        st = os.stat(file_path)
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _remember(self, key, value):
+        """写入进程内LRU"""
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def _store(self, key, value):
+        """写入持久化缓存"""
+        try:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO file_hashes '
+                '(device, inode, size, mtime_ns, sha256, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (*key, value, time.time())
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"写入哈希缓存失败: {str(e)}")
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get_hash(self, file_path):
+        """获取文件的SHA-256，命中缓存时不读取文件内容
+
+        Args:
+            file_path: 文件路径
+
+        Returns:
+            文件哈希值（16进制字符串）
+        """
+        key = self._key(file_path)
+
+        with self._lock:
+            value = self._lru.get(key)
+            if value is not None:
+                self._lru.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return value
+
+        try:
+            row = self._connect().execute(
+                'SELECT sha256 FROM file_hashes WHERE device=? AND inode=? AND size=? AND mtime_ns=?',
+                key
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"读取哈希缓存失败: {str(e)}")
+            row = None
+
+        if row:
+            self._count('disk_hits')
+            self._remember(key, row[0])
+            return row[0]
+
+        self._count('misses')
+        value = compute_sha256(file_path)
+
+        # 计算期间文件被修改时不缓存，避免记录过期的哈希
+        if self._key(file_path) == key:
+            self._remember(key, value)
+            self._store(key, value)
+        return value
+
+    def put(self, file_path, value):
+        """登记已知的文件哈希（如上传时流式计算得到的哈希）
+
+        Args:
+            file_path: 文件路径
+            value: 文件哈希值
+        """
+        if not value:
+            return
+        try:
+            key = self._key(file_path)
+        except OSError:
+            return
+        self._remember(key, value)
+        self._store(key, value)
+
+    def stats(self):
+        """返回缓存统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._lru)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((lookups - stats['misses']) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+# 进程级共享实例
+hash_cache = HashCache()
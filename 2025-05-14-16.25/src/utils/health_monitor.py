@@ -0,0 +1,386 @@
+"""依赖服务健康监控模块
+
+后台线程定期探测各微服务的健康状态并按TTL缓存结果，
+每个服务配有熔断器（closed/open/half_open），服务不可用时快速失败，
+请求路径上不再同步等待健康检查。
+"""
+
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """简单的熔断器
+
+    - closed: 正常放行，连续失败达到阈值后进入open
+    - open: 直接拒绝，经过recovery_timeout后进入half_open
+    - half_open: 放行一次试探请求，成功则closed，失败则重新open
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=3, recovery_timeout=30):
+        """初始化熔断器
+
+        Args:
+            name: 服务名称
+            failure_threshold: 触发熔断的连续失败次数
+            recovery_timeout: 熔断后进入半开状态前的等待时间（秒）
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_started_at = 0.0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def can_request(self):
+        """查看当前是否会放行请求（只读，不改变状态，也不占用半开状态的试探名额）
+
+        Returns:
+            会放行返回True，熔断中或试探请求进行中返回False
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                return now - self.opened_at >= self.recovery_timeout
+            return now - self.trial_started_at >= self.recovery_timeout
+
+    def allow_request(self):
+        """判断当前是否允许请求通过，半开状态下放行时占用唯一的试探名额
+
+        只应由实际发送请求的一方调用，只读的可用性检查使用can_request。
+
+        Returns:
+            允许返回True，熔断中返回False
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.OPEN:
+                if now - self.opened_at >= self.recovery_timeout:
+                    self.state = self.HALF_OPEN
+                    self.trial_started_at = now
+                    logger.info(f"熔断器半开，允许试探请求: {self.name}")
+                    return True
+                self.rejected += 1
+                return False
+
+            # 半开状态只放行一次试探，试探长时间无结果时允许重新试探
+            if now - self.trial_started_at >= self.recovery_timeout:
+                self.trial_started_at = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        """记录一次成功调用"""
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"熔断器关闭，服务恢复: {self.name}")
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        """记录一次失败调用"""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"熔断器打开: {self.name}, 连续失败 {self.failures} 次")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        """返回熔断器状态"""
+        with self._lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'failure_threshold': self.failure_threshold,
+                'recovery_timeout': self.recovery_timeout,
+            }
+
+
+class HealthMonitor:
+    """依赖服务健康监控器"""
+
+    def __init__(self, interval=10, ttl=30, failure_threshold=3, recovery_timeout=30):
+        """初始化监控器
+
+        Args:
+            interval: 后台探测间隔（秒）
+            ttl: 健康状态缓存有效期（秒），过期且后台线程未运行时按需探测
+            failure_threshold: 熔断器默认失败阈值
+            recovery_timeout: 熔断器默认恢复等待时间（秒）
+        """
+        self.interval = interval
+        self.ttl = ttl
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._probes = {}
+        self._breakers = {}
+        self._status = {}
+        self._refreshing = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._autostart = False
+        self._stop = threading.Event()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        """fork后在子进程中重建锁和线程状态
+
+        fork时父进程的探测线程可能正持有某个锁，子进程继承的锁将永远无法释放；
+        后台线程不会随fork复制，需要在子进程中重新启动。
+        """
+        self._lock = threading.Lock()
+        self._refreshing = {name: threading.Lock() for name in self._refreshing}
+        self._stop = threading.Event()
+        self._thread = None
+        for breaker in self._breakers.values():
+            breaker._lock = threading.Lock()
+
+    def register(self, name, probe, failure_threshold=None, recovery_timeout=None):
+        """注册需要监控的服务
+
+        Args:
+            name: 服务名称
+            probe: 无参探测函数，服务健康返回True
+            failure_threshold: 熔断失败阈值，默认使用监控器配置
+            recovery_timeout: 熔断恢复等待时间，默认使用监控器配置
+        """
+        with self._lock:
+            self._probes[name] = probe
+            self._refreshing[name] = threading.Lock()
+            if name not in self._breakers:
+                self._breakers[name] = CircuitBreaker(
+                    name,
+                    failure_threshold=failure_threshold or self.failure_threshold,
+                    recovery_timeout=recovery_timeout or self.recovery_timeout,
+                )
+
+    def breaker(self, name):
+        """获取服务的熔断器"""
+        return self._breakers.get(name)
+
+    def _probe(self, name):
+        """执行一次探测并更新缓存状态和熔断器"""
+        probe = self._probes.get(name)
+        if probe is None:
+            return None
+
+        start = time.monotonic()
+        error = None
+        try:
+            healthy = bool(probe())
+        except Exception as e:
+            healthy = False
+            error = str(e)
+        latency_ms = round((time.monotonic() - start) * 1000, 1)
+
+        status = {
+            'healthy': healthy,
+            'checked_at': time.time(),
+            'latency_ms': latency_ms,
+            'error': error,
+        }
+        with self._lock:
+            self._status[name] = status
+
+        if healthy:
+            self._breakers[name].record_success()
+        else:
+            self._breakers[name].record_failure()
+        return status
+
+    def refresh(self, name):
+        """立即探测服务（同一服务同时只有一个探测在进行）
+
+        Returns:
+            最新状态字典；若已有探测在进行则返回上次状态
+        """
+        lock = self._refreshing.get(name)
+        if lock is None:
+            return None
+        if not lock.acquire(blocking=False):
+            return self._status.get(name)
+        try:
+            return self._probe(name)
+        finally:
+            lock.release()
+
+    def refresh_all(self):
+        """并发探测全部已注册服务，总耗时取决于最慢的一个探测
+
+        Returns:
+            {服务名称: 状态字典}
+        """
+        names = list(self._probes)
+        results = {}
+
+        def run(name):
+            results[name] = self.refresh(name)
+
+        threads = [threading.Thread(target=run, args=(name,), name=f'health-probe-{name}', daemon=True)
+                   for name in names[1:]]
+        for thread in threads:
+            thread.start()
+        # 第一个服务在当前线程中探测
+        if names:
+            run(names[0])
+        for thread in threads:
+            thread.join()
+        return results
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh_all()
+            self._stop.wait(self.interval)
+
+    def is_running(self):
+        """当前进程中的后台探测线程是否在运行"""
+        return self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+
+    def start(self):
+        """启动后台探测线程（fork后的子进程中会重新启动）"""
+        with self._lock:
+            if self.is_running():
+                return
+            self._stop.clear()
+            self._autostart = True
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='health-monitor', daemon=True)
+            self._thread.start()
+        logger.info(f"健康监控已启动: pid={self._pid}, 间隔={self.interval}s, 服务={list(self._probes)}")
+
+    def stop(self, timeout=None):
+        """停止后台探测线程
+
+        Args:
+            timeout: 不为None时等待线程退出（最多等待timeout秒），如fork前确保没有进行中的探测
+        """
+        self._autostart = False
+        self._stop.set()
+        thread = self._thread
+        if timeout is not None and self.is_running():
+            thread.join(timeout)
+
+    def status(self, name):
+        """获取服务的缓存状态
+
+        状态过期且当前进程没有后台线程时：若监控器曾经启动过（如fork出的worker进程），
+        重新启动后台线程；否则同步刷新一次。
+
+        Returns:
+            状态字典，未探测过返回None
+        """
+        status = self._status.get(name)
+        stale = status is None or time.time() - status['checked_at'] > self.ttl
+        if stale and not self.is_running():
+            if self._autostart:
+                self.start()
+            else:
+                status = self.refresh(name)
+        return status
+
+    def is_available(self, name):
+        """判断服务当前是否可用（后台监控运行时只读取缓存，不等待网络）
+
+        熔断器打开时直接返回False；最近一次探测失败时同样返回False；
+        尚未探测过的服务视为可用，由实际调用结果驱动熔断器。
+        只查看熔断器状态，不占用半开状态的试探名额（由发送请求的传输层通过acquire占用）。
+
+        Args:
+            name: 服务名称
+
+        Returns:
+            可用返回True，否则返回False
+        """
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            return True
+        if not breaker.can_request():
+            return False
+        status = self.status(name)
+        if status is None:
+            return True
+        # 熔断器允许试探时放行，即使最近一次探测失败
+        return status['healthy'] or breaker.state != CircuitBreaker.CLOSED
+
+    def acquire(self, name):
+        """发送实际请求前调用：熔断器放行时返回True，半开状态下占用试探名额
+
+        Args:
+            name: 服务名称
+
+        Returns:
+            允许发送返回True，熔断中返回False
+        """
+        breaker = self._breakers.get(name)
+        return breaker is None or breaker.allow_request()
+
+    def report(self, name, success):
+        """记录一次实际调用的结果，驱动熔断器状态
+
+        Args:
+            name: 服务名称
+            success: 调用是否成功
+        """
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            return
+        if success:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+
+    def snapshot(self):
+        """返回所有服务的健康状态和熔断器状态"""
+        with self._lock:
+            names = list(self._probes)
+            statuses = dict(self._status)
+        return {
+            'monitor': {
+                'running': self.is_running(),
+                'interval': self.interval,
+                'ttl': self.ttl,
+            },
+            'services': {
+                name: {
+                    'status': statuses.get(name),
+                    'circuit': self._breakers[name].snapshot(),
+                }
+                for name in names
+            },
+        }
+
+
+def _build_monitor():
+    import src.settings as config
+    return HealthMonitor(
+        interval=config.HEALTH_CHECK_INTERVAL,
+        ttl=config.HEALTH_CHECK_TTL,
+        failure_threshold=config.CIRCUIT_FAILURE_THRESHOLD,
+        recovery_timeout=config.CIRCUIT_RECOVERY_TIMEOUT,
+    )
+
+
+# 进程级共享实例
+health_monitor = _build_monitor()
@@ -0,0 +1,126 @@
+"""HTTP连接池传输层，为各微服务客户端提供进程级共享的requests.Session"""
+
+import os
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """熔断器拒绝发送请求（服务熔断中，或半开状态下已有试探请求）"""
+
+
+class PooledTransport:
+    """基于requests.Session的连接池传输层
+
+    - 每个进程持有一个Session（fork后自动重建，避免子进程共享父进程的套接字）
+    - 连接池大小、keep-alive和按端点区分的超时均可配置
+    - Session的连接池本身是线程安全的，可在线程化的开发服务器中共享
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=20, keep_alive=True,
+                 connect_timeout=3, timeouts=None, default_timeout=30, on_result=None,
+                 before_request=None):
+        """初始化传输层
+
+        Args:
+            pool_connections: 缓存的主机连接池数量
+            pool_maxsize: 每个主机连接池的最大连接数（应不小于并发线程数）
+            keep_alive: 是否复用连接
+            connect_timeout: 建立连接的超时时间（秒）
+            timeouts: 端点名称到读取超时（秒）的映射
+            default_timeout: 未配置端点的读取超时（秒）
+            on_result: 请求结束后的回调，参数为是否成功（无异常且非5xx），用于驱动熔断器
+            before_request: 请求发送前的回调，返回False时不发送并抛出CircuitOpenError，
+                用于在半开状态下占用熔断器的试探名额
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+        self.connect_timeout = connect_timeout
+        self.timeouts = dict(timeouts or {})
+        self.default_timeout = default_timeout
+        self.on_result = on_result
+        self.before_request = before_request
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _build_session(self):
+        """创建带连接池的Session"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=False,
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['Connection'] = 'keep-alive' if self.keep_alive else 'close'
+        return session
+
+    @property
+    def session(self):
+        """当前进程的共享Session"""
+        pid = os.getpid()
+        if self._session is None or self._pid != pid:
+            with self._lock:
+                if self._session is None or self._pid != pid:
+                    self._session = self._build_session()
+                    self._pid = pid
+                    logger.info(f"创建HTTP连接池: pid={pid}, pool_maxsize={self.pool_maxsize}")
+        return self._session
+
+    def timeout_for(self, endpoint):
+        """获取端点的 (连接超时, 读取超时) 元组"""
+        return (self.connect_timeout, self.timeouts.get(endpoint, self.default_timeout))
+
+    def request(self, method, url, endpoint=None, **kwargs):
+        """发送请求，未显式指定timeout时使用端点配置的超时
+
+        Args:
+            method: HTTP方法
+            url: 请求URL
+            endpoint: 端点名称，用于选择超时
+            **kwargs: 传递给requests的其他参数，report=False时不经过熔断器（如健康探测）
+
+        Returns:
+            requests.Response对象
+
+        Raises:
+            CircuitOpenError: 熔断器拒绝发送
+        """
+        report = kwargs.pop('report', True)
+        if report and self.before_request is not None and not self.before_request():
+            raise CircuitOpenError(f"熔断中，未发送请求: {method} {url}")
+        report = report and self.on_result is not None
+        kwargs.setdefault('timeout', self.timeout_for(endpoint))
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            if report:
+                self.on_result(False)
+            raise
+        if report:
+            self.on_result(response.status_code < 500)
+        return response
+
+    def get(self, url, endpoint=None, **kwargs):
+        """发送GET请求"""
+        return self.request('GET', url, endpoint=endpoint, **kwargs)
+
+    def post(self, url, endpoint=None, **kwargs):
+        """发送POST请求"""
+        return self.request('POST', url, endpoint=endpoint, **kwargs)
+
+    def close(self):
+        """关闭当前进程的Session"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+            self._pid = None
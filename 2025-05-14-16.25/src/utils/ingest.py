@@ -0,0 +1,164 @@
+"""文件摄取工具模块，提供单次读取的流式写入、哈希与链接功能"""
+
+import os
+import errno
+import shutil
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 流式读取块大小（1MB），远大于原先的4KB以减少系统调用
+INGEST_CHUNK_SIZE = 1024 * 1024
+
+# 嗅探文件头所需的字节数（与FILE_TYPE_MAP中的检查函数一致）
+HEADER_SIZE = 8
+
+# Linux FICLONE ioctl，用于在支持写时复制的文件系统（btrfs/xfs）上创建reflink
+_FICLONE = 0x40049409
+
+
+def same_device(*paths):
+    """检查多个目录是否位于同一设备（同一文件系统）上
+
+    Args:
+        paths: 目录路径列表
+
+    Returns:
+        位于同一设备返回True，否则返回False
+    """
+    try:
+        return len({os.stat(p).st_dev for p in paths}) == 1
+    except OSError:
+        return False
+
+
+def _reflink(src, dst):
+    """尝试创建reflink（写时复制克隆）
+
+    Args:
+        src: 源文件路径
+        dst: 目标文件路径
+
+    Returns:
+        成功返回True，否则返回False
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return False
+
+    try:
+        with open(src, 'rb') as s, open(dst, 'wb') as d:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        shutil.copystat(src, dst)
+        return True
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
+
+
+def link_or_copy(src, dst):
+    """以最低成本在dst位置生成src的副本
+
+    依次尝试硬链接、reflink，最后回退到普通复制。
+
+    Args:
+        src: 源文件路径
+        dst: 目标文件路径
+
+    Returns:
+        实际使用的方式：'hardlink'、'reflink' 或 'copy'
+    """
+    if os.path.exists(dst):
+        os.remove(dst)
+
+    try:
+        os.link(src, dst)
+        return 'hardlink'
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EACCES):
+            raise
+
+    if _reflink(src, dst):
+        return 'reflink'
+
+    shutil.copy2(src, dst)
+    return 'copy'
+
+
+def stream_to_files(stream, paths, chunk_size=INGEST_CHUNK_SIZE):
+    """单次读取输入流，同时写入一个或多个目标文件并计算SHA-256
+
+    Args:
+        stream: 可读的二进制流（如werkzeug的FileStorage.stream）
+        paths: 目标文件路径列表
+        chunk_size: 每次读取的字节数
+
+    Returns:
+        (文件大小, SHA-256十六进制字符串, 文件头字节) 三元组
+    """
+    hasher = hashlib.sha256()
+    header = b''
+    size = 0
+
+    outputs = [open(path, 'wb') for path in paths]
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            if len(header) < HEADER_SIZE:
+                header += chunk[:HEADER_SIZE - len(header)]
+            hasher.update(chunk)
+            for out in outputs:
+                out.write(chunk)
+            size += len(chunk)
+    except Exception:
+        for out in outputs:
+            out.close()
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    else:
+        for out in outputs:
+            out.close()
+
+    return size, hasher.hexdigest(), header
+
+
+def ingest_stream(stream, file_path, copy_path=None, chunk_size=INGEST_CHUNK_SIZE):
+    """将上传流摄取到file_path，并在copy_path生成副本
+
+    上传流只读取一次：同一设备上先写入file_path，再以硬链接/reflink生成副本；
+    跨设备时无法链接，则在同一次读取中同时写入两个位置。
+
+    Args:
+        stream: 可读的二进制流
+        file_path: 主文件路径
+        copy_path: 副本路径（可选）
+        chunk_size: 每次读取的字节数
+
+    Returns:
+        包含file_size、file_hash、header、copy_method的字典
+    """
+    copy_method = None
+    if copy_path and not same_device(os.path.dirname(file_path), os.path.dirname(copy_path)):
+        size, file_hash, header = stream_to_files(stream, [file_path, copy_path], chunk_size)
+        copy_method = 'tee'
+    else:
+        size, file_hash, header = stream_to_files(stream, [file_path], chunk_size)
+        if copy_path:
+            try:
+                copy_method = link_or_copy(file_path, copy_path)
+            except OSError as e:
+                logger.error(f"生成副本失败: {file_path} -> {copy_path}, 错误: {str(e)}")
+
+    return {
+        'file_size': size,
+        'file_hash': file_hash,
+        'header': header,
+        'copy_method': copy_method,
+    }
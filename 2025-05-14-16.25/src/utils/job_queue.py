@@ -0,0 +1,328 @@
+"""基于SQLite的持久化任务队列
+
+无需外部服务：任务保存在本地SQLite文件中，多个worker进程通过
+BEGIN IMMEDIATE 事务原子地领取任务。支持失败重试（指数退避）、
+租约超时回收（worker崩溃后任务重新入队）和基于幂等键的重复提交去重。
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_SUCCEEDED = 'succeeded'
+STATUS_FAILED = 'failed'
+
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+
+class JobQueue:
+    """SQLite任务队列"""
+
+    def __init__(self, db_path=None, lease_timeout=None):
+        """初始化队列
+
+        Args:
+            db_path: SQLite文件路径，为None时使用settings.JOB_QUEUE_DB
+            lease_timeout: 任务租约超时（秒），超过此时间仍为running的任务视为worker已崩溃
+        """
+        self._db_path = db_path
+        self._lease_timeout = lease_timeout
+        self._local = threading.local()
+
+    @property
+    def db_path(self):
+        """队列数据库路径（延迟解析，便于配置覆盖）"""
+        if self._db_path is None:
+            import src.settings as config
+            self._db_path = config.JOB_QUEUE_DB
+        return self._db_path
+
+    @property
+    def lease_timeout(self):
+        """任务租约超时（秒）"""
+        if self._lease_timeout is None:
+            import src.settings as config
+            self._lease_timeout = config.JOB_LEASE_TIMEOUT
+        return self._lease_timeout
+
+    def _connect(self):
+        """获取当前线程（和进程）专用的SQLite连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and getattr(self._local, 'pid', None) == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id VARCHAR(32) PRIMARY KEY,
+                kind VARCHAR(64) NOT NULL,
+                idempotency_key VARCHAR(128) UNIQUE,
+                payload TEXT NOT NULL,
+                status VARCHAR(16) NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                run_after REAL NOT NULL,
+                locked_by VARCHAR(64),
+                locked_at REAL,
+                progress TEXT,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_jobs_status_run_after ON jobs (status, run_after)')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _to_dict(row):
+        """将数据库行转换为字典"""
+        if row is None:
+            return None
+        job = dict(row)
+        for field in ('payload', 'progress', 'result'):
+            if job.get(field):
+                job[field] = json.loads(job[field])
+        return job
+
+    def enqueue(self, kind, payload, idempotency_key=None, max_attempts=3):
+        """提交任务
+
+        相同幂等键的任务仍在排队或执行时直接返回已有任务；
+        已结束（成功或失败）的旧任务会释放幂等键，允许重新提交。
+
+        Args:
+            kind: 任务类型
+            payload: 任务参数（可JSON序列化）
+            idempotency_key: 幂等键
+            max_attempts: 最大尝试次数
+
+        Returns:
+            (任务字典, 是否新建) 二元组
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if idempotency_key:
+                row = conn.execute(
+                    'SELECT * FROM jobs WHERE idempotency_key = ?', (idempotency_key,)
+                ).fetchone()
+                if row is not None:
+                    if row['status'] in ACTIVE_STATUSES:
+                        conn.execute('COMMIT')
+                        return self._to_dict(row), False
+                    conn.execute(
+                        'UPDATE jobs SET idempotency_key = NULL WHERE id = ?', (row['id'],)
+                    )
+
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                'INSERT INTO jobs (id, kind, idempotency_key, payload, status, attempts, max_attempts, '
+                'run_after, created_at, updated_at) VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?, ?)',
+                (job_id, kind, idempotency_key, json.dumps(payload), STATUS_QUEUED,
+                 max_attempts, now, now, now)
+            )
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        logger.info(f"任务已入队: id={job_id}, kind={kind}, key={idempotency_key}")
+        return self._to_dict(row), True
+
+    def claim(self, worker_id):
+        """领取一个可执行的任务
+
+        同时回收租约超时的running任务（视为worker崩溃后重新领取）；
+        已用完尝试次数的超时任务直接标记为失败，不再领取。
+
+        Args:
+            worker_id: worker标识
+
+        Returns:
+            任务字典，没有可执行任务时返回None
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            expired = conn.execute(
+                'UPDATE jobs SET status = ?, error = ?, locked_by = NULL, locked_at = NULL, updated_at = ? '
+                'WHERE status = ? AND locked_at < ? AND attempts >= max_attempts',
+                (STATUS_FAILED, '租约超时（worker崩溃或无响应），已达到最大尝试次数', now,
+                 STATUS_RUNNING, now - self.lease_timeout)
+            ).rowcount
+            if expired:
+                logger.error(f"{expired} 个任务租约超时且已达到最大尝试次数，标记为失败")
+
+            row = conn.execute(
+                'SELECT * FROM jobs '
+                'WHERE (status = ? AND run_after <= ?) OR (status = ? AND locked_at < ?) '
+                'ORDER BY run_after, created_at LIMIT 1',
+                (STATUS_QUEUED, now, STATUS_RUNNING, now - self.lease_timeout)
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+
+            conn.execute(
+                'UPDATE jobs SET status = ?, attempts = attempts + 1, locked_by = ?, locked_at = ?, '
+                'updated_at = ? WHERE id = ?',
+                (STATUS_RUNNING, worker_id, now, now, row['id'])
+            )
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (row['id'],)).fetchone()
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return self._to_dict(row)
+
+    def heartbeat(self, job_id, worker_id, progress=None):
+        """续约并更新任务进度（只在租约仍属于该worker时生效）
+
+        Args:
+            job_id: 任务ID
+            worker_id: 领取任务的worker标识
+            progress: 进度信息（可JSON序列化）
+
+        Returns:
+            续约成功返回True，租约已被其他worker回收返回False
+        """
+        now = time.time()
+        if progress is None:
+            cursor = self._connect().execute(
+                'UPDATE jobs SET locked_at = ?, updated_at = ? WHERE id = ? AND status = ? AND locked_by = ?',
+                (now, now, job_id, STATUS_RUNNING, worker_id)
+            )
+        else:
+            cursor = self._connect().execute(
+                'UPDATE jobs SET locked_at = ?, updated_at = ?, progress = ? '
+                'WHERE id = ? AND status = ? AND locked_by = ?',
+                (now, now, json.dumps(progress), job_id, STATUS_RUNNING, worker_id)
+            )
+        return cursor.rowcount > 0
+
+    def complete(self, job_id, worker_id, result=None):
+        """标记任务成功
+
+        租约超时后任务可能已被其他worker重新领取，此时不覆盖其状态。
+
+        Args:
+            job_id: 任务ID
+            worker_id: 领取任务的worker标识
+            result: 任务结果（可JSON序列化）
+
+        Returns:
+            成功返回True，租约已失效（任务已被其他worker领取）返回False
+        """
+        now = time.time()
+        cursor = self._connect().execute(
+            'UPDATE jobs SET status = ?, result = ?, error = NULL, locked_by = NULL, locked_at = NULL, '
+            'updated_at = ? WHERE id = ? AND status = ? AND locked_by = ?',
+            (STATUS_SUCCEEDED, json.dumps(result), now, job_id, STATUS_RUNNING, worker_id)
+        )
+        if cursor.rowcount == 0:
+            logger.warning(f"任务租约已失效，丢弃本次结果: id={job_id}, worker={worker_id}")
+            return False
+        return True
+
+    def fail(self, job_id, worker_id, error, backoff_base=2.0, result=None):
+        """记录任务失败，未达到最大尝试次数时按指数退避重新排队
+
+        Args:
+            job_id: 任务ID
+            worker_id: 领取任务的worker标识
+            error: 错误信息
+            backoff_base: 退避基数（秒），第n次失败后等待 backoff_base * 2^(n-1) 秒
+            result: 部分结果（可JSON序列化）
+
+        Returns:
+            重新排队返回True，已达到最大尝试次数返回False，
+            租约已失效（任务已被其他worker领取）返回None
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = ? AND locked_by = ?',
+                (job_id, STATUS_RUNNING, worker_id)
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                logger.warning(f"任务租约已失效，丢弃本次失败记录: id={job_id}, worker={worker_id}, 错误: {error}")
+                return None
+
+            retry = row['attempts'] < row['max_attempts']
+            if retry:
+                delay = backoff_base * (2 ** (row['attempts'] - 1))
+                conn.execute(
+                    'UPDATE jobs SET status = ?, run_after = ?, error = ?, result = ?, locked_by = NULL, '
+                    'locked_at = NULL, updated_at = ? WHERE id = ?',
+                    (STATUS_QUEUED, now + delay, str(error), json.dumps(result), now, job_id)
+                )
+            else:
+                conn.execute(
+                    'UPDATE jobs SET status = ?, error = ?, result = ?, locked_by = NULL, locked_at = NULL, '
+                    'updated_at = ? WHERE id = ?',
+                    (STATUS_FAILED, str(error), json.dumps(result), now, job_id)
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        if retry:
+            logger.warning(f"任务失败，{delay:.1f}秒后重试: id={job_id}, 第{row['attempts']}次, 错误: {error}")
+        else:
+            logger.error(f"任务最终失败: id={job_id}, 共尝试{row['attempts']}次, 错误: {error}")
+        return retry
+
+    def get(self, job_id):
+        """根据ID获取任务
+
+        Returns:
+            任务字典，不存在返回None
+        """
+        row = self._connect().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def active_count(self, key_prefix):
+        """统计幂等键以指定前缀开头、仍在排队或执行中的任务数
+
+        Args:
+            key_prefix: 幂等键前缀（如某个订单的转换任务前缀）
+
+        Returns:
+            任务数量
+        """
+        row = self._connect().execute(
+            'SELECT COUNT(*) AS n FROM jobs WHERE status IN (?, ?) AND substr(idempotency_key, 1, ?) = ?',
+            (*ACTIVE_STATUSES, len(key_prefix), key_prefix)
+        ).fetchone()
+        return row['n']
+
+    def stats(self):
+        """按状态统计任务数量"""
+        rows = self._connect().execute('SELECT status, COUNT(*) AS n FROM jobs GROUP BY status').fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+
+# 进程级共享实例
+job_queue = JobQueue()
@@ -0,0 +1,111 @@
+"""请求合并（micro-batching）模块
+
+多个线程并发提交的单键查询在短暂的等待窗口内合并为一次批量调用。
+第一个进入空批次的线程作为leader执行批量调用，再把结果分发给同批次的其他线程；
+已有批量调用进行中时leader先等待窗口结束（或批次装满）以合并更多查询，
+没有并发时立即执行，单独的查询不增加延迟。不需要后台线程，fork后也可直接使用。
+"""
+
+import logging
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class _Batch:
+    """一个正在收集键的批次"""
+
+    def __init__(self):
+        self.futures = {}
+        self.closed = threading.Event()
+
+
+class MicroBatcher:
+    """把并发的单键查询合并为批量查询
+
+    用法：
+        batcher = MicroBatcher(fetch_many, max_batch_size=100, linger=0.005)
+        value = batcher.get(key)
+
+    fetch_many接收键列表，返回 {键: 值} 字典，缺少的键视为None；
+    fetch_many抛出异常时，同批次的所有调用方都收到该异常。
+    """
+
+    def __init__(self, fetch_many, max_batch_size=100, linger=0.005):
+        """初始化
+
+        Args:
+            fetch_many: 批量查询函数
+            max_batch_size: 每批最多的键数，装满后立即执行不再等待
+            linger: 等待合并的时间窗口（秒），仅在已有批量调用进行中时等待
+        """
+        self.fetch_many = fetch_many
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self.linger = max(float(linger), 0.0)
+        self._lock = threading.Lock()
+        self._pending = None
+        self._inflight = 0
+        self._stats = {'calls': 0, 'batches': 0, 'keys': 0}
+
+    def get(self, key, timeout=None):
+        """查询一个键，与同一时间窗口内的其他查询合并执行
+
+        Args:
+            key: 查询键
+            timeout: 等待结果的超时（秒），None表示一直等待
+
+        Returns:
+            查询结果，未找到返回None
+        """
+        with self._lock:
+            self._stats['calls'] += 1
+            batch = self._pending
+            leader = batch is None
+            if leader:
+                batch = self._pending = _Batch()
+                # 没有进行中的批量调用时说明当前没有并发，不必等待
+                linger = self.linger if self._inflight else 0
+            future = batch.futures.get(key)
+            if future is None:
+                future = batch.futures[key] = Future()
+            if len(batch.futures) >= self.max_batch_size:
+                # 批次已满，后续调用开始新的批次
+                self._pending = None
+                batch.closed.set()
+
+        if leader:
+            if linger:
+                batch.closed.wait(linger)
+            with self._lock:
+                if self._pending is batch:
+                    self._pending = None
+                self._inflight += 1
+            try:
+                self._execute(batch)
+            finally:
+                with self._lock:
+                    self._inflight -= 1
+
+        return future.result(timeout)
+
+    def _execute(self, batch):
+        """执行一个批次并分发结果"""
+        keys = list(batch.futures)
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['keys'] += len(keys)
+        try:
+            results = self.fetch_many(keys) or {}
+        except Exception as e:
+            logger.debug(f"批量查询失败: {len(keys)} 个键, 错误: {str(e)}")
+            for future in batch.futures.values():
+                future.set_exception(e)
+            return
+        for key, future in batch.futures.items():
+            future.set_result(results.get(key))
+
+    def stats(self):
+        """合并统计：calls为单键查询次数，batches为实际批量调用次数，keys为批量调用中的去重键数"""
+        with self._lock:
+            return dict(self._stats)
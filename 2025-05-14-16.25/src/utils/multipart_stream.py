@@ -0,0 +1,74 @@
+"""流式multipart/form-data请求体
+
+按块读取文件生成请求体，不把文件整体读入内存。请求体长度预先计算，
+requests会以Content-Length发送（而不是chunked编码），服务端可以提前拒绝过大的文件。
+"""
+
+import os
+import uuid
+
+from urllib3.fields import RequestField
+
+# 读取文件的块大小
+MULTIPART_CHUNK_SIZE = 1024 * 1024
+
+
+class MultipartFileStream:
+    """包含普通表单字段和一个文件字段的multipart请求体
+
+    用作requests的data参数：
+        body = MultipartFileStream(path, fields=[('category', 'uploads')])
+        session.post(url, data=body, headers={'Content-Type': body.content_type})
+
+    每次迭代都重新打开文件，请求失败后可以重试。
+    """
+
+    def __init__(self, file_path, fields=None, file_field='file', filename=None,
+                 file_content_type='application/octet-stream', chunk_size=MULTIPART_CHUNK_SIZE):
+        """初始化请求体
+
+        Args:
+            file_path: 要发送的文件路径
+            fields: [(字段名, 值)]，值为None的字段跳过，值为列表时重复该字段
+            file_field: 文件字段名
+            filename: 发送给服务端的文件名，默认使用file_path的文件名
+            file_content_type: 文件部分的Content-Type
+            chunk_size: 读取文件的块大小
+        """
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+
+        head = []
+        for name, value in fields or []:
+            for item in value if isinstance(value, (list, tuple)) else [value]:
+                if item is not None:
+                    head.append(self._part_header(RequestField(name, None)))
+                    head.append(str(item).encode('utf-8') + b'\r\n')
+        file_part = RequestField(file_field, None, filename=filename or os.path.basename(file_path))
+        head.append(self._part_header(file_part, file_content_type))
+
+        self._head = b''.join(head)
+        self._tail = f'\r\n--{self.boundary}--\r\n'.encode('ascii')
+        self._file_size = os.path.getsize(file_path)
+
+    def _part_header(self, field, content_type=None):
+        """生成一个部分的分隔符和头部"""
+        field.make_multipart(content_type=content_type)
+        return f'--{self.boundary}\r\n'.encode('ascii') + field.render_headers().encode('utf-8')
+
+    def __len__(self):
+        return len(self._head) + self._file_size + len(self._tail)
+
+    def __iter__(self):
+        # 不提供read()：urllib3按迭代得到的块直接发送，而不是以8KB为单位调用read()
+        yield self._head
+        with open(self.file_path, 'rb') as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        yield self._tail
+
@@ -0,0 +1,194 @@
+"""Web worker请求统计模块
+
+每个进程在内存中累计请求数、错误数、耗时和正在处理的请求数，
+并定期把快照写入统计目录下的 worker-<pid>.json。多进程部署（gunicorn prefork）时
+任一worker都可以汇总读取所有worker的快照；已退出进程的快照在读取时清理。
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def _max_rss_kb():
+    """进程峰值常驻内存（KB），不支持的平台返回None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS以字节为单位，Linux以KB为单位
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def _pid_alive(pid):
+    if os.name != 'posix':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class RequestMetrics:
+    """进程级请求统计"""
+
+    def __init__(self, metrics_dir=None, flush_interval=1.0):
+        """初始化统计
+
+        Args:
+            metrics_dir: 快照目录，为None时使用settings.REQUEST_METRICS_DIR
+            flush_interval: 两次写入快照的最小间隔（秒）
+        """
+        self._metrics_dir = metrics_dir
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._started_at = time.time()
+        self._last_flush = 0.0
+        self._stats = {'requests': 0, 'errors': 0, 'in_flight': 0, 'total_seconds': 0.0, 'max_seconds': 0.0}
+        self._statuses = {}
+
+    @property
+    def metrics_dir(self):
+        """快照目录（延迟解析，便于配置覆盖）"""
+        if self._metrics_dir is None:
+            import src.settings as config
+            self._metrics_dir = config.REQUEST_METRICS_DIR
+        return self._metrics_dir
+
+    def _check_pid(self):
+        # fork后的子进程从零开始统计，不继承父进程的计数
+        if self._pid != os.getpid():
+            self._reset()
+
+    def request_started(self):
+        """请求开始"""
+        with self._lock:
+            self._check_pid()
+            self._stats['in_flight'] += 1
+
+    def request_finished(self, status_code, duration):
+        """请求结束
+
+        Args:
+            status_code: 响应状态码
+            duration: 处理耗时（秒）
+        """
+        with self._lock:
+            self._check_pid()
+            stats = self._stats
+            stats['in_flight'] = max(0, stats['in_flight'] - 1)
+            stats['requests'] += 1
+            if status_code >= 500:
+                stats['errors'] += 1
+            stats['total_seconds'] += duration
+            stats['max_seconds'] = max(stats['max_seconds'], duration)
+            key = f"{status_code // 100}xx"
+            self._statuses[key] = self._statuses.get(key, 0) + 1
+            due = time.time() - self._last_flush >= self.flush_interval
+            if due:
+                self._last_flush = time.time()
+        if due:
+            self.flush()
+
+    def snapshot(self):
+        """当前进程的统计快照"""
+        with self._lock:
+            self._check_pid()
+            stats = dict(self._stats)
+            statuses = dict(self._statuses)
+            started_at = self._started_at
+        requests = stats['requests']
+        return {
+            'pid': os.getpid(),
+            'started_at': started_at,
+            'uptime_seconds': round(time.time() - started_at, 1),
+            'requests': requests,
+            'errors': stats['errors'],
+            'in_flight': stats['in_flight'],
+            'avg_ms': round(stats['total_seconds'] / requests * 1000, 2) if requests else 0.0,
+            'max_ms': round(stats['max_seconds'] * 1000, 2),
+            'statuses': statuses,
+            'max_rss_kb': _max_rss_kb(),
+            'updated_at': time.time(),
+        }
+
+    def _path(self, pid):
+        return os.path.join(self.metrics_dir, f"worker-{pid}.json")
+
+    def flush(self):
+        """把当前进程的快照写入统计目录"""
+        snapshot = self.snapshot()
+        path = self._path(snapshot['pid'])
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"写入请求统计失败: {path}, 错误: {str(e)}")
+
+    def remove(self, pid):
+        """删除指定进程的快照（worker退出时调用）"""
+        try:
+            os.remove(self._path(pid))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"删除请求统计失败: pid={pid}, 错误: {str(e)}")
+
+    def collect(self):
+        """汇总所有存活worker的快照
+
+        Returns:
+            {'workers': [快照, ...], 'total': {...}}，当前进程使用内存中的最新数据
+        """
+        current = self.snapshot()
+        workers = {current['pid']: current}
+        try:
+            names = os.listdir(self.metrics_dir)
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            if not (name.startswith('worker-') and name.endswith('.json')):
+                continue
+            try:
+                pid = int(name[len('worker-'):-len('.json')])
+            except ValueError:
+                continue
+            if pid in workers:
+                continue
+            if not _pid_alive(pid):
+                self.remove(pid)
+                continue
+            try:
+                with open(os.path.join(self.metrics_dir, name), encoding='utf-8') as f:
+                    workers[pid] = json.load(f)
+            except (OSError, ValueError):
+                continue
+
+        items = sorted(workers.values(), key=lambda w: w['pid'])
+        total = {
+            'workers': len(items),
+            'requests': sum(w['requests'] for w in items),
+            'errors': sum(w['errors'] for w in items),
+            'in_flight': sum(w['in_flight'] for w in items),
+        }
+        return {'workers': items, 'total': total}
+
+
+# 进程级共享实例
+request_metrics = RequestMetrics()
@@ -0,0 +1,177 @@
+"""流式ZIP生成模块
+
+边生成边输出ZIP：每写入一块数据就把已生成的字节交给调用方（如HTTP响应），
+不在磁盘上生成完整的ZIP文件。PNG等已压缩格式以STORED方式存储，不再重复压缩。
+远程文件由线程池在写入方之前并发预取，每个预取中的文件在内存中最多占用
+max_memory_per_file字节，超出部分暂存到临时文件。
+"""
+
+import os
+import time
+import logging
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# 本地文件读取和远程下载的块大小
+ZIP_CHUNK_SIZE = 64 * 1024
+
+# 已经压缩过的格式，直接存储不再压缩
+STORED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.zip', '.rar', '.gz', '.pdf')
+
+
+class _Sink:
+    """不可seek的输出缓冲区，zipfile写入后由生成器取走数据"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _zip_info(arcname, mtime=None, size=0):
+    """构造ZIP条目信息，已压缩格式使用STORED"""
+    zinfo = zipfile.ZipInfo(arcname, date_time=time.localtime(mtime or time.time())[:6])
+    ext = os.path.splitext(arcname)[1].lower()
+    zinfo.compress_type = zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+    zinfo.external_attr = 0o644 << 16
+    # 仅用于判断是否需要ZIP64，写入时会按实际数据重新计算
+    zinfo.file_size = size
+    return zinfo
+
+
+def _fetch_remote(fetch, url, max_memory, chunk_size):
+    """下载远程文件到SpooledTemporaryFile（内存超限后转存临时文件）
+
+    Returns:
+        (文件对象, 文件大小) 二元组
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    try:
+        response = fetch(url)
+        try:
+            if response.status_code != 200:
+                raise IOError(f"状态码 {response.status_code}")
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                spool.write(chunk)
+        finally:
+            response.close()
+        size = spool.tell()
+        spool.seek(0)
+        return spool, size
+    except Exception:
+        spool.close()
+        raise
+
+
+def _discard(future):
+    """关闭已预取但未写入ZIP的文件"""
+    if not future.cancelled() and future.exception() is None:
+        future.result()[0].close()
+
+
+def stream_zip(entries, fetch=None, prefetch=4, max_memory_per_file=8 * 1024 * 1024,
+               chunk_size=ZIP_CHUNK_SIZE, on_added=None, on_error=None):
+    """流式生成ZIP
+
+    Args:
+        entries: 条目字典列表，每项包含arcname（ZIP内文件名），
+                 以及path（本地文件路径）或url（远程文件地址）之一
+        fetch: 远程下载函数，签名为 fetch(url)，返回支持iter_content/close的流式响应
+        prefetch: 远程文件的并发预取数量
+        max_memory_per_file: 每个预取中的文件在内存中最多占用的字节数
+        chunk_size: 读取块大小
+        on_added: 条目写入完成时的回调，参数为 (条目, 来源描述)
+        on_error: 条目失败（跳过）时的回调，参数为 (条目, 异常)
+
+    Yields:
+        ZIP数据块（bytes）
+    """
+    entries = list(entries)
+    remote = [i for i, entry in enumerate(entries) if entry.get('url')]
+    sink = _Sink()
+    executor = ThreadPoolExecutor(max_workers=max(prefetch, 1)) if remote and fetch else None
+    futures = {}
+    next_remote = 0
+
+    def schedule(position):
+        """提交当前位置之后的预取，保持最多prefetch个远程文件在途"""
+        nonlocal next_remote
+        while executor and next_remote < len(remote) and len(futures) < prefetch:
+            index = remote[next_remote]
+            if index < position:
+                next_remote += 1
+                continue
+            futures[index] = executor.submit(
+                _fetch_remote, fetch, entries[index]['url'], max_memory_per_file, chunk_size
+            )
+            next_remote += 1
+
+    try:
+        with zipfile.ZipFile(sink, 'w', allowZip64=True) as zf:
+            for position, entry in enumerate(entries):
+                schedule(position)
+                source = None
+                try:
+                    if entry.get('url'):
+                        future = futures.pop(position, None)
+                        if future is None:
+                            raise IOError("未配置远程下载函数")
+                        source, size = future.result()
+                        mtime = None
+                        origin = entry['url']
+                    else:
+                        source = open(entry['path'], 'rb')
+                        stat = os.fstat(source.fileno())
+                        size, mtime = stat.st_size, stat.st_mtime
+                        origin = entry['path']
+                except Exception as e:
+                    if on_error:
+                        on_error(entry, e)
+                    else:
+                        logger.error(f"ZIP条目获取失败，已跳过: {entry.get('arcname')}, 错误: {str(e)}")
+                    continue
+
+                try:
+                    with zf.open(_zip_info(entry['arcname'], mtime, size), 'w') as dest:
+                        while True:
+                            chunk = source.read(chunk_size)
+                            if not chunk:
+                                break
+                            dest.write(chunk)
+                            data = sink.drain()
+                            if data:
+                                yield data
+                finally:
+                    source.close()
+
+                if on_added:
+                    on_added(entry, origin)
+                data = sink.drain()
+                if data:
+                    yield data
+
+        # 中央目录
+        data = sink.drain()
+        if data:
+            yield data
+    finally:
+        # 客户端断开或出错时，取消尚未开始的预取并释放已下载的文件
+        for future in futures.values():
+            if not future.cancel():
+                future.add_done_callback(_discard)
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
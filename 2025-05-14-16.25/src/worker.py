@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""独立运行后台转换任务worker
+
+用法:
+    python -m src.worker          # 启动JOB_WORKERS个worker进程
+    python -m src.worker 4        # 启动4个worker进程
+"""
+
+import sys
+import logging
+
+import src.settings as config
+from src.services.job_service import JobService
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else max(config.JOB_WORKERS, 1)
+    workers = JobService.start_workers(count)
+    try:
+        for process in workers:
+            process.join()
+    except KeyboardInterrupt:
+        for process in workers:
+            process.terminate()
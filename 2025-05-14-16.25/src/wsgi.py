@@ -0,0 +1,49 @@
+"""生产环境WSGI入口
+
+    gunicorn -c gunicorn.conf.py src.wsgi:app
+
+gunicorn以preload方式在主进程中导入本模块：创建应用、初始化数据库并预热缓存后
+再fork出worker进程，worker共享这些已加载的代码和模板。fork后每个worker通过
+post_fork丢弃继承的数据库连接并重新启动进程内的后台线程。
+"""
+
+from src.run import app, logger, ensure_directories_exist, init_database, check_external_services
+from src.models import db
+
+
+def warm_up():
+    """fork前预热：编译全部模板，关闭主进程持有的数据库连接并停止健康监控线程"""
+    compiled = 0
+    for name in app.jinja_env.list_templates():
+        try:
+            app.jinja_env.get_template(name)
+            compiled += 1
+        except Exception as e:
+            logger.warning(f"模板预编译失败: {name}, 错误: {str(e)}")
+    logger.info(f"已预编译 {compiled} 个模板")
+
+    # 连接不能跨进程共享，worker按需重新建立
+    with app.app_context():
+        db.engine.dispose()
+
+    # 主进程只负责fork，不在探测进行中fork；探测线程在每个worker的post_fork中启动
+    from src.utils.health_monitor import health_monitor
+    health_monitor.stop(timeout=app.config['HEALTH_PROBE_TIMEOUT'] + 1)
+
+
+def post_fork():
+    """worker进程fork后调用"""
+    with app.app_context():
+        # 丢弃从主进程继承的连接（不关闭，避免影响其他进程）
+        db.engine.dispose(close=False)
+
+    from src.utils.health_monitor import health_monitor
+    if app.config['HEALTH_MONITOR_ENABLED'] and not app.config['TESTING']:
+        # 后台线程不会随fork复制，在每个worker中重新启动
+        health_monitor.start()
+
+
+ensure_directories_exist()
+check_external_services()
+init_database()
+warm_up()
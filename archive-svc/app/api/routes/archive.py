@@ -1,5 +1,7 @@
 import os
+import uuid
 import shutil
+import hashlib
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, status, Response
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -15,19 +17,30 @@ from app.api.schemas import (
     FileListResponse,
     FileUploadResponse,
     FileDetailResponse,
+    FileEventBatchRequest,
+    FileEventBatchResponse,
+    HaveHashesRequest,
+    HaveHashesResponse,
+    ArchivedHash,
+    HashBatchRequest,
+    HashBatchResponse,
     ErrorResponse,
 )
 from app.models import get_db
 from app.core.archive_repo import (
     archive_file_repo,
     archive_file_version_repo,
+    file_event_repo,
 )
-from app.utils.hash_utils import calculate_file_hash, find_files_by_hash
+from app.utils.hash_utils import find_files_by_hash
 from app.utils.file_utils import save_upload_file, get_file_content
 from app.config import settings
 
 router = APIRouter()
 
+# 接收上传文件时每次读取的块大小
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 @router.post(
     "/files",
@@ -39,30 +52,53 @@ async def upload_file(
     category: str = Form("general"),
     description: Optional[str] = Form(None),
     tags: Optional[List[str]] = Form(None),
+    sha256: Optional[str] = Form(None),
     db: AsyncSession = Depends(get_db),
 ):
     """
     上传并归档文件
+    
+    客户端提供sha256时，若已归档相同内容的文件则直接返回，不再写入临时文件；
+    否则边写入临时文件边计算哈希，并校验与客户端提供的哈希一致。
     """
+    sha256 = sha256.lower() if sha256 else None
+    
+    # 检查文件是否已存在（基于客户端提供的哈希）
+    if sha256:
+        existing_file = await archive_file_repo.get_by_hash(db, sha256)
+        if existing_file:
+            return FileUploadResponse(
+                success=True,
+                message="文件已存在于归档中",
+                file=ArchiveFileResponse.from_orm(existing_file),
+            )
+    
     try:
         # 确保临时目录存在
         temp_dir = Path(settings.TEMP_DIR)
         temp_dir.mkdir(parents=True, exist_ok=True)
         
-        # 临时文件路径
-        temp_path = temp_dir / file.filename
+        # 临时文件路径（加随机前缀，避免同名文件并发上传时互相覆盖）
+        temp_path = temp_dir / f"{uuid.uuid4().hex}_{Path(file.filename).name}"
         
-        # 保存上传的文件到临时目录
+        # 分块保存上传的文件到临时目录，同时计算哈希
         try:
-            content = await file.read()
+            hashers = {algo: hashlib.new(algo) for algo in settings.HASH_ALGORITHMS if hasattr(hashlib, algo)}
             async with aiofiles.open(temp_path, "wb") as f:
-                await f.write(content)
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    await f.write(chunk)
+                    for hasher in hashers.values():
+                        hasher.update(chunk)
+            hashes = {algo: hasher.hexdigest() for algo, hasher in hashers.items()}
             
-            # 计算文件哈希
-            hashes = await calculate_file_hash(temp_path)
+            if sha256 and hashes.get("sha256") != sha256:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="上传内容的SHA-256与提供的哈希不一致",
+                )
             
             # 检查文件是否已存在（基于哈希）
-            if hashes.get("sha256"):
+            if hashes.get("sha256") and not sha256:
                 existing_file = await archive_file_repo.get_by_hash(db, hashes["sha256"])
                 if existing_file:
                     # 文件已存在，返回现有文件信息
@@ -116,6 +152,8 @@ async def upload_file(
             if temp_path.exists():
                 temp_path.unlink()
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -248,6 +286,88 @@ async def get_file_by_hash(
         )
 
 
+@router.post(
+    "/files/hash:batch",
+    response_model=HashBatchResponse,
+    responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}},
+)
+async def get_files_by_hashes(
+    request: HashBatchRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    根据SHA-256批量获取归档文件（一次IN查询）
+    
+    未找到的哈希在missing中返回，不作为错误。
+    """
+    if len(request.hashes) > settings.HASH_CHECK_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"单次最多查询{settings.HASH_CHECK_MAX_SIZE}个哈希",
+        )
+    
+    try:
+        hashes = list(dict.fromkeys(hash_value.lower() for hash_value in request.hashes))
+        existing = await archive_file_repo.get_existing_by_sha256(db, hashes)
+        
+        return HashBatchResponse(
+            success=True,
+            message="批量获取文件成功",
+            files={
+                hash_value: ArchiveFileResponse.from_orm(file)
+                for hash_value, file in existing.items()
+            },
+            missing=[hash_value for hash_value in hashes if hash_value not in existing],
+        )
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"批量获取文件失败: {str(e)}",
+        )
+
+
+@router.post(
+    "/files/have-hashes",
+    response_model=HaveHashesResponse,
+    responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}},
+)
+async def have_hashes(
+    request: HaveHashesRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    批量检查SHA-256是否已归档
+    
+    上游在传输文件内容之前调用，已归档的文件直接使用返回的文件ID，不再上传。
+    """
+    if len(request.hashes) > settings.HASH_CHECK_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"单次最多检查{settings.HASH_CHECK_MAX_SIZE}个哈希",
+        )
+    
+    try:
+        hashes = list(dict.fromkeys(hash_value.lower() for hash_value in request.hashes))
+        existing = await archive_file_repo.get_existing_by_sha256(db, hashes)
+        
+        return HaveHashesResponse(
+            success=True,
+            message="哈希检查完成",
+            existing={
+                hash_value: ArchivedHash(id=file.id, file_path=file.file_path)
+                for hash_value, file in existing.items()
+            },
+            missing=[hash_value for hash_value in hashes if hash_value not in existing],
+        )
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"哈希检查失败: {str(e)}",
+        )
+
+
 @router.put(
     "/files/{file_id}",
     response_model=FileDetailResponse,
@@ -391,4 +511,56 @@ async def download_file(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"下载文件失败: {str(e)}",
-        ) 
\ No newline at end of file
+        )
+
+
+@router.post(
+    "/events:batch",
+    response_model=FileEventBatchResponse,
+    responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}},
+)
+async def receive_events(
+    request: FileEventBatchRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    批量接收上游系统的文件事件（如重命名）
+    
+    上游按至少一次语义投递，同一event_id可能重复到达，已保存的事件直接跳过。
+    整批在一个事务中保存，失败时上游整批重试。
+    """
+    if len(request.events) > settings.EVENT_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"单次最多投递{settings.EVENT_BATCH_MAX_SIZE}个事件",
+        )
+    
+    try:
+        events = []
+        for event in request.events:
+            payload = event.payload or {}
+            events.append({
+                "event_id": event.event_id,
+                "event_type": event.event_type,
+                "source_file_id": payload.get("file_id"),
+                "order_id": payload.get("order_id"),
+                "payload": payload,
+                "occurred_at": event.occurred_at.replace(tzinfo=None) if event.occurred_at else None,
+            })
+        
+        accepted = await file_event_repo.create_many_ignore_existing(db, events)
+        
+        return FileEventBatchResponse(
+            success=True,
+            message="事件接收成功",
+            received=len(events),
+            accepted=accepted,
+            duplicates=len(events) - accepted,
+        )
+    
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"保存事件失败: {str(e)}",
+        )
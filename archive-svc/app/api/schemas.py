@@ -152,4 +152,55 @@ class FileUploadResponse(ResponseBase):
 class FileDetailResponse(ResponseBase):
     """文件详情响应模型"""
     file: ArchiveFileResponse
-    versions: Optional[List[ArchiveFileVersionResponse]] = None 
\ No newline at end of file
+    versions: Optional[List[ArchiveFileVersionResponse]] = None
+
+
+# 文件事件模型
+class FileEventIn(BaseModel):
+    """上游投递的文件事件"""
+    event_id: str
+    event_type: str
+    occurred_at: Optional[datetime] = None
+    payload: Dict[str, Any] = {}
+
+
+class FileEventBatchRequest(BaseModel):
+    """批量投递文件事件请求模型"""
+    events: List[FileEventIn]
+
+
+class FileEventBatchResponse(ResponseBase):
+    """批量投递文件事件响应模型"""
+    received: int
+    accepted: int
+    duplicates: int
+
+
+# 哈希预检模型
+class HaveHashesRequest(BaseModel):
+    """哈希预检请求模型"""
+    hashes: List[str]
+
+
+class ArchivedHash(BaseModel):
+    """已归档哈希对应的文件"""
+    id: int
+    file_path: str
+
+
+class HaveHashesResponse(ResponseBase):
+    """哈希预检响应模型"""
+    existing: Dict[str, ArchivedHash]
+    missing: List[str]
+
+
+# 批量哈希查询模型
+class HashBatchRequest(BaseModel):
+    """批量哈希查询请求模型"""
+    hashes: List[str]
+
+
+class HashBatchResponse(ResponseBase):
+    """批量哈希查询响应模型"""
+    files: Dict[str, ArchiveFileResponse]
+    missing: List[str]
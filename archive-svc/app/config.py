@@ -39,9 +39,13 @@ class Settings(BaseSettings):
     TEMP_DIR: str = Field("./storage/temp", env="TEMP_DIR")
     MAX_ARCHIVE_SIZE: int = 1024 * 1024 * 100  # 100MB
     
+    # 事件配置
+    EVENT_BATCH_MAX_SIZE: int = 1000  # 单次批量投递的最大事件数
+    
     # 哈希配置
     HASH_ALGORITHMS: List[str] = ["sha256", "md5"]
     DEFAULT_HASH_ALGORITHM: str = "sha256"
+    HASH_CHECK_MAX_SIZE: int = 1000  # 单次哈希预检或批量哈希查询的最大哈希数
     
     # CORS配置
     ALLOWED_HOSTS: List[str] = ["*"]
@@ -3,6 +3,7 @@ from app.core.archive_repo import (
     archive_file_repo,
     archive_file_version_repo,
     file_tag_repo,
+    file_event_repo,
 )
 from app.core.security import create_access_token, verify_password, get_password_hash
 
@@ -11,6 +12,7 @@ __all__ = [
     "archive_file_repo",
     "archive_file_version_repo",
     "file_tag_repo",
+    "file_event_repo",
     "create_access_token",
     "verify_password",
     "get_password_hash",
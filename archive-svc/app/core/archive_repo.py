@@ -3,7 +3,7 @@ from sqlalchemy import select, or_, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.repository import BaseRepository
-from app.models.archive import ArchiveFile, ArchiveFileVersion, FileTag
+from app.models.archive import ArchiveFile, ArchiveFileVersion, FileTag, FileEvent
 
 
 class ArchiveFileRepository(BaseRepository[ArchiveFile]):
@@ -33,6 +33,32 @@ class ArchiveFileRepository(BaseRepository[ArchiveFile]):
         )
         return result.scalars().first()
     
+    async def get_existing_by_sha256(
+        self, db: AsyncSession, hash_values: List[str]
+    ) -> Dict[str, ArchiveFile]:
+        """
+        批量检查SHA-256是否已归档（一次IN查询）
+        
+        Args:
+            db: 数据库会话
+            hash_values: SHA-256哈希值列表
+            
+        Returns:
+            已归档的哈希值到文件对象的映射，同一哈希有多个文件时取ID最小的
+        """
+        if not hash_values:
+            return {}
+        result = await db.execute(
+            select(self.model).filter(
+                self.model.sha256_hash.in_(list(set(hash_values))),
+                self.model.is_deleted == False,
+            ).order_by(self.model.id)
+        )
+        existing = {}
+        for file in result.scalars().all():
+            existing.setdefault(file.sha256_hash, file)
+        return existing
+    
     async def search_files(
         self,
         db: AsyncSession,
@@ -177,7 +203,46 @@ class FileTagRepository(BaseRepository[FileTag]):
         return await self.get_by(db, name=name)
 
 
+class FileEventRepository(BaseRepository[FileEvent]):
+    """文件事件仓库"""
+    
+    def __init__(self):
+        super().__init__(FileEvent)
+    
+    async def create_many_ignore_existing(
+        self, db: AsyncSession, events: List[Dict[str, Any]]
+    ) -> int:
+        """
+        批量保存事件，已保存过的event_id跳过（上游至少一次投递，重复投递是正常的）
+        
+        Args:
+            db: 数据库会话
+            events: 事件数据列表
+            
+        Returns:
+            新保存的事件数
+        """
+        event_ids = list({event["event_id"] for event in events})
+        result = await db.execute(
+            select(self.model.event_id).filter(self.model.event_id.in_(event_ids))
+        )
+        seen = set(result.scalars().all())
+        
+        new_events = []
+        for event in events:
+            if event["event_id"] in seen:
+                continue
+            seen.add(event["event_id"])
+            new_events.append(self.model(**event))
+        
+        if new_events:
+            db.add_all(new_events)
+            await db.commit()
+        return len(new_events)
+
+
 # 创建仓库实例
 archive_file_repo = ArchiveFileRepository()
 archive_file_version_repo = ArchiveFileVersionRepository()
-file_tag_repo = FileTagRepository() 
\ No newline at end of file
+file_tag_repo = FileTagRepository()
+file_event_repo = FileEventRepository()
@@ -1,5 +1,5 @@
 from app.models.base import Base, BaseModel, get_db, init_db
-from app.models.archive import ArchiveFile, ArchiveFileVersion, FileTag
+from app.models.archive import ArchiveFile, ArchiveFileVersion, FileTag, FileEvent
 
 __all__ = [
     "Base",
@@ -9,4 +9,5 @@ __all__ = [
     "ArchiveFile",
     "ArchiveFileVersion",
     "FileTag",
+    "FileEvent",
 ] 
\ No newline at end of file
@@ -75,4 +75,20 @@ class FileTag(BaseModel):
     color = Column(String(7), nullable=True)  # HEX颜色代码，如 #FF0000
     
     def __repr__(self):
-        return f"<FileTag(id={self.id}, name='{self.name}')>" 
\ No newline at end of file
+        return f"<FileTag(id={self.id}, name='{self.name}')>"
+
+
+class FileEvent(BaseModel):
+    """上游系统投递的文件事件（如重命名），按event_id去重"""
+    
+    __tablename__ = "file_events"
+    
+    event_id = Column(String(64), nullable=False, unique=True, index=True)
+    event_type = Column(String(32), nullable=False, index=True)
+    source_file_id = Column(Integer, nullable=True, index=True)  # 上游系统中的文件ID
+    order_id = Column(Integer, nullable=True, index=True)
+    payload = Column(JSON, nullable=True)
+    occurred_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<FileEvent(id={self.id}, event_id='{self.event_id}', event_type='{self.event_type}')>"
@@ -6,7 +6,9 @@ import (
 	"convert-svc/pkg/converter"
 	"crypto/sha256"
 	"encoding/hex"
+	"errors"
 	"fmt"
+	"io"
 	"net/http"
 	"os"
 	"path/filepath"
@@ -84,6 +86,12 @@ func (s *Server) setupRoutes() {
 
 		// 文件重命名API
 		api.POST("/rename", s.renameFile)
+
+		// 批量重命名API（资料分类时一次请求重命名整个订单的文件）
+		api.POST("/rename-batch", s.renameBatch)
+
+		// 复用已转换文件API（转换缓存命中时将已有PNG链接到新订单目录）
+		api.POST("/link", s.linkFiles)
 	}
 
 	// 添加根路径健康检查，与启动脚本兼容
@@ -357,9 +365,11 @@ func (s *Server) convertBatch(c *gin.Context) {
 		case ext == ".pptx" || ext == ".ppt":
 			convertedFiles, err = converter.ConvertPptxToPNG(fileReq.FilePath, fileReq.OutputDir, fileReq.DPI, sourceID, parentID)
 		case ext == ".jpg" || ext == ".jpeg" || ext == ".png" || ext == ".gif" || ext == ".bmp":
-			file, err := converter.ConvertImageToPNG(fileReq.FilePath, fileReq.OutputDir, sourceID, parentID)
-			if err == nil {
+			file, imgErr := converter.ConvertImageToPNG(fileReq.FilePath, fileReq.OutputDir, sourceID, parentID)
+			if imgErr == nil {
 				convertedFiles = []string{file}
+			} else {
+				err = imgErr
 			}
 		default:
 			results[fileReq.FilePath] = map[string]interface{}{
@@ -521,11 +531,7 @@ func (s *Server) renameFile(c *gin.Context) {
 	}
 
 	// 构建完整路径
-	originalPath := req.OriginalPath
-	if !strings.HasPrefix(originalPath, s.config.Storage.ConvertedDir) {
-		// 如果提供的是相对路径，转换为绝对路径
-		originalPath = filepath.Join(s.config.Storage.ConvertedDir, originalPath)
-	}
+	originalPath := s.resolveConvertedPath(req.OriginalPath)
 
 	// 检查原始文件是否存在
 	if _, err := os.Stat(originalPath); os.IsNotExist(err) {
@@ -565,13 +571,33 @@ func (s *Server) renameFile(c *gin.Context) {
 		return
 	}
 
-	// 获取相对路径（用于URL）
-	relPath, err := filepath.Rel(s.config.Storage.ConvertedDir, newPath)
+	// 获取相对路径和新URL
+	relPath, newURL := s.fileURL(newPath)
+
+	// 返回成功响应
+	c.JSON(http.StatusOK, FileRenameResponse{
+		Success: true,
+		Message: "文件重命名成功",
+		NewPath: relPath,
+		NewURL:  newURL,
+	})
+}
+
+// resolveConvertedPath 将相对于转换目录的路径转换为绝对路径
+func (s *Server) resolveConvertedPath(path string) string {
+	if strings.HasPrefix(path, s.config.Storage.ConvertedDir) {
+		return path
+	}
+	return filepath.Join(s.config.Storage.ConvertedDir, path)
+}
+
+// fileURL 返回转换目录中文件的相对路径和访问URL
+func (s *Server) fileURL(path string) (string, string) {
+	relPath, err := filepath.Rel(s.config.Storage.ConvertedDir, path)
 	if err != nil {
-		relPath = filepath.Base(newPath)
+		relPath = filepath.Base(path)
 	}
 
-	// 构建新URL
 	serverAddress := s.config.Server.Address
 	if serverAddress[0] == ':' {
 		// 如果地址只包含端口号，添加默认主机名
@@ -581,13 +607,266 @@ func (s *Server) renameFile(c *gin.Context) {
 		serverAddress = "http://" + serverAddress
 	}
 
-	newURL := fmt.Sprintf("%s/files/%s", serverAddress, relPath)
+	return relPath, fmt.Sprintf("%s/files/%s", serverAddress, relPath)
+}
 
-	// 返回成功响应
-	c.JSON(http.StatusOK, FileRenameResponse{
+// FileRenameItem 批量重命名中的单个文件
+type FileRenameItem struct {
+	OriginalPath string `json:"original_path" binding:"required"` // 原始文件路径（相对于转换目录）
+	NewName      string `json:"new_name" binding:"required"`      // 新文件名（不含目录）
+}
+
+// FileRenameBatchRequest 批量重命名请求结构体
+type FileRenameBatchRequest struct {
+	Items   []FileRenameItem `json:"items" binding:"required,dive"`
+	OrderId string           `json:"order_id,omitempty"` // 可选的订单ID
+}
+
+// FileRenameResult 批量重命名中单个文件的结果，顺序与请求一致
+type FileRenameResult struct {
+	OriginalPath string `json:"original_path"`
+	Success      bool   `json:"success"`
+	NewPath      string `json:"new_path,omitempty"`
+	NewURL       string `json:"new_url,omitempty"`
+	Error        string `json:"error,omitempty"`
+}
+
+// FileRenameBatchResponse 批量重命名响应结构体
+type FileRenameBatchResponse struct {
+	Success bool               `json:"success"` // 全部文件重命名成功
+	Message string             `json:"message"`
+	Results []FileRenameResult `json:"results,omitempty"`
+	Error   string             `json:"error,omitempty"`
+}
+
+// renameBatch 批量重命名处理程序
+//
+// 分两阶段执行：先把所有源文件移到临时名称，再移到目标名称，
+// 批次内的文件互换名称（如重新分类后序号变化）时不会互相覆盖。
+// 每个文件单独返回结果，单个文件失败不影响其他文件。
+func (s *Server) renameBatch(c *gin.Context) {
+	var req FileRenameBatchRequest
+	if err := c.ShouldBindJSON(&req); err != nil {
+		c.JSON(http.StatusBadRequest, FileRenameBatchResponse{
+			Success: false,
+			Message: "请求格式错误",
+			Error:   err.Error(),
+		})
+		return
+	}
+
+	type pendingRename struct {
+		index   int
+		srcPath string
+		tmpPath string
+		dstPath string
+	}
+
+	rootDir := s.config.Storage.ConvertedDir
+	batchID := uuid.New().String()[:8]
+	results := make([]FileRenameResult, len(req.Items))
+	targets := make(map[string]bool, len(req.Items))
+	var pending []pendingRename
+
+	// 第一阶段：校验并移到临时名称
+	for i, item := range req.Items {
+		results[i].OriginalPath = item.OriginalPath
+
+		srcPath := s.resolveConvertedPath(item.OriginalPath)
+		if rel, err := filepath.Rel(rootDir, srcPath); err != nil || strings.HasPrefix(rel, "..") {
+			results[i].Error = "路径超出转换目录"
+			continue
+		}
+		if item.NewName != filepath.Base(item.NewName) || item.NewName == "." || item.NewName == ".." {
+			results[i].Error = "新文件名不能包含目录"
+			continue
+		}
+
+		dstPath := filepath.Join(filepath.Dir(srcPath), item.NewName)
+		if targets[dstPath] {
+			results[i].Error = "批次内新文件名重复"
+			continue
+		}
+		if _, err := os.Stat(srcPath); err != nil {
+			results[i].Error = "原始文件不存在"
+			continue
+		}
+
+		tmpPath := filepath.Join(filepath.Dir(srcPath), fmt.Sprintf(".rename-%s-%d", batchID, i))
+		if err := os.Rename(srcPath, tmpPath); err != nil {
+			results[i].Error = "重命名失败: " + err.Error()
+			continue
+		}
+		targets[dstPath] = true
+		pending = append(pending, pendingRename{index: i, srcPath: srcPath, tmpPath: tmpPath, dstPath: dstPath})
+	}
+
+	// 第二阶段：移到目标名称（与单个重命名一致，覆盖批次外的同名文件）
+	for _, p := range pending {
+		if err := os.Rename(p.tmpPath, p.dstPath); err != nil {
+			// 恢复原文件名
+			os.Rename(p.tmpPath, p.srcPath)
+			results[p.index].Error = "重命名失败: " + err.Error()
+			continue
+		}
+		relPath, newURL := s.fileURL(p.dstPath)
+		results[p.index].Success = true
+		results[p.index].NewPath = relPath
+		results[p.index].NewURL = newURL
+	}
+
+	succeeded := 0
+	for _, r := range results {
+		if r.Success {
+			succeeded++
+		}
+	}
+
+	c.JSON(http.StatusOK, FileRenameBatchResponse{
+		Success: succeeded == len(results),
+		Message: fmt.Sprintf("已重命名%d/%d个文件", succeeded, len(results)),
+		Results: results,
+	})
+}
+
+// FileLinkRequest 文件链接请求结构体
+type FileLinkRequest struct {
+	Files   []string `json:"files" binding:"required"` // 已转换文件路径（相对于转换目录）
+	OrderId string   `json:"order_id,omitempty"`       // 目标订单ID，为空时链接到转换目录根目录
+}
+
+// FileLinkResponse 文件链接响应结构体
+type FileLinkResponse struct {
+	Success bool     `json:"success"`
+	Message string   `json:"message"`
+	Files   []string `json:"files,omitempty"` // 链接后的文件路径，格式与转换接口返回一致
+	Error   string   `json:"error,omitempty"`
+}
+
+// maxLinkNameAttempts 目标文件名被占用时最多尝试的候选文件名数
+const maxLinkNameAttempts = 1000
+
+// linkOrCopy 优先使用硬链接，跨设备等情况下回退到复制；目标已存在时返回os.ErrExist，不覆盖
+func linkOrCopy(src, dst string) error {
+	err := os.Link(src, dst)
+	if err == nil || errors.Is(err, os.ErrExist) {
+		return err
+	}
+
+	in, err := os.Open(src)
+	if err != nil {
+		return err
+	}
+	defer in.Close()
+
+	out, err := os.OpenFile(dst, os.O_WRONLY|os.O_CREATE|os.O_EXCL, 0644)
+	if err != nil {
+		return err
+	}
+	if _, err := io.Copy(out, in); err != nil {
+		out.Close()
+		os.Remove(dst)
+		return err
+	}
+	return out.Close()
+}
+
+// linkUnique 将src链接到dir下的同名文件。目标已是同一文件时直接复用（reused为true）；
+// 被其他文件占用时依次尝试 name_1、name_2… 等未占用的文件名，不覆盖已有文件
+func linkUnique(src string, srcInfo os.FileInfo, dir string) (dst string, reused bool, err error) {
+	name := filepath.Base(src)
+	ext := filepath.Ext(name)
+	stem := strings.TrimSuffix(name, ext)
+
+	for i := 0; i < maxLinkNameAttempts; i++ {
+		dst = filepath.Join(dir, name)
+		if i > 0 {
+			dst = filepath.Join(dir, fmt.Sprintf("%s_%d%s", stem, i, ext))
+		}
+		if dstInfo, statErr := os.Stat(dst); statErr == nil {
+			if os.SameFile(srcInfo, dstInfo) {
+				return dst, true, nil
+			}
+			continue
+		}
+		err = linkOrCopy(src, dst)
+		if errors.Is(err, os.ErrExist) {
+			// 检查之后被并发请求占用，换下一个文件名
+			continue
+		}
+		return dst, false, err
+	}
+	return "", false, fmt.Errorf("没有可用的目标文件名: %s", name)
+}
+
+// linkFiles 将已转换的文件链接到目标订单目录，全部成功或全部失败
+func (s *Server) linkFiles(c *gin.Context) {
+	var req FileLinkRequest
+	if err := c.ShouldBindJSON(&req); err != nil {
+		c.JSON(http.StatusBadRequest, FileLinkResponse{
+			Success: false,
+			Message: "请求格式错误",
+			Error:   err.Error(),
+		})
+		return
+	}
+
+	rootDir := s.config.Storage.ConvertedDir
+	outputDir := rootDir
+	if req.OrderId != "" {
+		outputDir = filepath.Join(rootDir, req.OrderId)
+	}
+	if err := os.MkdirAll(outputDir, 0755); err != nil {
+		c.JSON(http.StatusInternalServerError, FileLinkResponse{
+			Success: false,
+			Message: "创建输出目录失败",
+			Error:   err.Error(),
+		})
+		return
+	}
+
+	var linked []string
+	var created []string
+	fail := func(status int, message string, err error) {
+		// 回滚本次请求中新建的链接
+		for _, path := range created {
+			os.Remove(path)
+		}
+		c.JSON(status, FileLinkResponse{
+			Success: false,
+			Message: message,
+			Error:   err.Error(),
+		})
+	}
+
+	for _, relPath := range req.Files {
+		srcPath := filepath.Join(rootDir, relPath)
+		if rel, err := filepath.Rel(rootDir, srcPath); err != nil || strings.HasPrefix(rel, "..") {
+			fail(http.StatusBadRequest, "非法的文件路径", fmt.Errorf("路径超出转换目录: %s", relPath))
+			return
+		}
+
+		srcInfo, err := os.Stat(srcPath)
+		if err != nil {
+			fail(http.StatusNotFound, "源文件不存在", err)
+			return
+		}
+
+		// 目标已是同一文件（如同一订单重复处理）时直接复用；同名的其他文件不会被覆盖，改用新文件名
+		dstPath, reused, err := linkUnique(srcPath, srcInfo, outputDir)
+		if err != nil {
+			fail(http.StatusInternalServerError, "链接文件失败", err)
+			return
+		}
+		if !reused {
+			created = append(created, dstPath)
+		}
+		linked = append(linked, dstPath)
+	}
+
+	c.JSON(http.StatusOK, FileLinkResponse{
 		Success: true,
-		Message: "文件重命名成功",
-		NewPath: relPath,
-		NewURL:  newURL,
+		Message: "文件链接成功",
+		Files:   linked,
 	})
 }
@@ -35,8 +35,15 @@ func ConvertImageToPNG(imagePath, outputDir string, sourceID, parentID string) (
 		log.Printf("为文件 %s 生成唯一ID: %s", filepath.Base(imagePath), sourceID)
 	}
 
+	// 在输出目录下创建独立的临时目录，避免并发转换同名文件时互相覆盖
+	tmpDir, err := os.MkdirTemp(outputDir, "tmp_image_")
+	if err != nil {
+		return "", fmt.Errorf("创建临时目录失败: %w", err)
+	}
+	defer os.RemoveAll(tmpDir)
+
 	// 创建临时输出文件名
-	tmpOutputPNG := filepath.Join(outputDir, "tmp_"+baseName+".png")
+	tmpOutputPNG := filepath.Join(tmpDir, "tmp_"+baseName+".png")
 
 	// 使用ImageMagick转换图片
 	// 需要安装ImageMagick: sudo apt-get install imagemagick
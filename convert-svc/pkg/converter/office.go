@@ -20,13 +20,27 @@ func ConvertOfficeToPDF(officePath, outputDir string) (string, error) {
 	baseName = strings.TrimSuffix(baseName, filepath.Ext(baseName))
 	outputPDF := filepath.Join(outputDir, baseName+".pdf")
 
+	// 每次转换使用独立的临时输出目录和LibreOffice用户配置目录，
+	// 否则并发运行的多个LibreOffice实例会争用同一配置而失败
+	tmpDir, err := os.MkdirTemp(outputDir, "tmp_office_")
+	if err != nil {
+		return "", fmt.Errorf("创建临时目录失败: %w", err)
+	}
+	defer os.RemoveAll(tmpDir)
+
+	profileDir, err := filepath.Abs(filepath.Join(tmpDir, "profile"))
+	if err != nil {
+		return "", fmt.Errorf("创建LibreOffice配置目录失败: %w", err)
+	}
+
 	// 使用LibreOffice将Office文档转换为PDF
 	// 需要安装LibreOffice: sudo apt-get install libreoffice
 	cmd := exec.Command(
 		"libreoffice",
+		"-env:UserInstallation=file://"+filepath.ToSlash(profileDir),
 		"--headless",
 		"--convert-to", "pdf",
-		"--outdir", outputDir,
+		"--outdir", tmpDir,
 		officePath,
 	)
 
@@ -35,9 +49,13 @@ func ConvertOfficeToPDF(officePath, outputDir string) (string, error) {
 		return "", fmt.Errorf("Office转PDF失败: %w, 输出: %s", err, string(output))
 	}
 
-	// 检查生成的PDF文件是否存在
-	if _, err := os.Stat(outputPDF); os.IsNotExist(err) {
-		return "", fmt.Errorf("转换后的PDF文件不存在: %s", outputPDF)
+	// 检查生成的PDF文件是否存在，并移动到输出目录
+	tmpPDF := filepath.Join(tmpDir, baseName+".pdf")
+	if _, err := os.Stat(tmpPDF); os.IsNotExist(err) {
+		return "", fmt.Errorf("转换后的PDF文件不存在: %s", tmpPDF)
+	}
+	if err := os.Rename(tmpPDF, outputPDF); err != nil {
+		return "", fmt.Errorf("移动PDF文件失败 %s -> %s: %w", tmpPDF, outputPDF, err)
 	}
 
 	return outputPDF, nil
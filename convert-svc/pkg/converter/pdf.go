@@ -36,8 +36,15 @@ func ConvertPDFToPNG(pdfPath, outputDir string, dpi int, sourceID, parentID stri
 		log.Printf("为PDF文件 %s 生成唯一ID: %s", filepath.Base(pdfPath), sourceID)
 	}
 
+	// 在输出目录下创建独立的临时目录，避免同一订单并发转换时临时文件互相覆盖
+	tmpDir, err := os.MkdirTemp(outputDir, "tmp_convert_")
+	if err != nil {
+		return nil, fmt.Errorf("创建临时目录失败: %w", err)
+	}
+	defer os.RemoveAll(tmpDir)
+
 	// 创建临时输出前缀（使用pdftoppm时需要）
-	tmpPrefix := filepath.Join(outputDir, "tmp_convert")
+	tmpPrefix := filepath.Join(tmpDir, "tmp_convert")
 
 	// 使用pdftoppm命令行工具将PDF转换为PNG
 	// 需要安装poppler-utils: sudo apt-get install poppler-utils
@@ -55,7 +62,7 @@ func ConvertPDFToPNG(pdfPath, outputDir string, dpi int, sourceID, parentID stri
 	}
 
 	// 查找生成的临时文件
-	pattern := filepath.Join(outputDir, "tmp_convert-*.png")
+	pattern := filepath.Join(tmpDir, "tmp_convert-*.png")
 	tmpFiles, err := filepath.Glob(pattern)
 	if err != nil {
 		return nil, fmt.Errorf("查找生成的PNG文件失败: %w", err)
@@ -63,7 +70,7 @@ func ConvertPDFToPNG(pdfPath, outputDir string, dpi int, sourceID, parentID stri
 
 	// 如果没有找到文件，可能是单页PDF，检查不带页码的文件
 	if len(tmpFiles) == 0 {
-		singlePattern := filepath.Join(outputDir, "tmp_convert.png")
+		singlePattern := filepath.Join(tmpDir, "tmp_convert.png")
 		singleMatches, err := filepath.Glob(singlePattern)
 		if err != nil {
 			return nil, fmt.Errorf("查找生成的单页PNG文件失败: %w", err)